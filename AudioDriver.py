@@ -12,106 +12,311 @@
 #              https://www.creativecommons.org
 #-------------------------------------------------------------------------------
 
-import smbus
+import i2cbus
 import time
+import contextlib
+import bisect
+import math
+import errno
+import logging
+import regmap
 a    = 0x7D                                         ## Per LM45450 specs.
-b    = smbus.SMBus(3)                               ## i2c dev 3 (bitbanged)
+b    = i2cbus.SMBus(3)                              ## i2c dev 3 (bitbanged)
+log  = logging.getLogger('doublezero.audio')
 dBH  = -15                                          ## Default headphone volume.
 dBS  = -15                                          ## Default speaker volume.
-muted          = false                              ## State var: if outpt muted
-equalized      = false                              ## State var: if eq on
-movieMode      = false                              ## State var: if freq=48kHz
+muted          = False                              ## State var: if outpt muted
+equalized      = False                              ## State var: if eq on
+movieMode      = False                              ## State var: if freq=48kHz
 u,v,w,x,y,z    = 0x00,0x00,0x00,0x00,0x00,0x00      ## Equalizer defaults.
 defaults       = [0x49,0x21,0x21,0x00,0x00,0x00,0x00,0x09,0x09]
 lastEql        = [u,v,w,x,y,z]
 defaults.extend(lastEql)
 
 class Register:                                     ## Register read/write fx
+    ## Write-through shadow of the 16 LM49450 registers. Reads are served from
+    ## the shadow (loaded from the chip in one block the first time), writes
+    ## of the value already there are dropped, and changed registers are sent
+    ## as one auto-increment block: at once, or at the end of a batch().
+    ## A batch(check=True) reads the block back in the same transfer, and
+    ## sends it again once if it does not match. The block also covers the
+    ## unchanged registers between the dirty ones, so any of those not known
+    ## yet are loaded from the chip first rather than sent as 0x00.
+    shadow  = bytearray(0x10)                       ## Last value of each reg
+    valid   = 0x0000                                ## Bit n: shadow[n] known
+    dirty   = 0x0000                                ## Bit n: shadow[n] unsent
+    depth   = 0                                     ## Open batch() blocks
+    check   = False                                 ## Read back at the flush
+    def load():                                     ## Fill unknown regs
+        chip = b.read_i2c_block_data(a,0x00,0x10)
+        for i in range(0x10):
+            if not (Register.valid | Register.dirty) & (1<<i):
+                Register.shadow[i] = chip[i]
+        Register.valid = 0xFFFF
     def read(regAddrs):
-        result = hex(b.i2c_smbus_read_byte_data(a,regAddrs))
+        if not Register.valid & (1<<regAddrs):
+            Register.load()
+        result = Register.shadow[regAddrs]
         return result
     def write(regAddr,byteVal):
-        b.i2c_smbus_write_byte_data(a,regAddr,byteVal)
+        bit = 1<<regAddr
+        if Register.valid & bit and Register.shadow[regAddr] == byteVal:
+            return                                  ## Already on the chip
+        Register.shadow[regAddr] = byteVal
+        Register.valid |= bit
+        Register.dirty |= bit
+        if not Register.depth:
+            Register.flush()
+    def update(regAddr,mask,bits):                  ## Set the bits under mask
+        Register.write(regAddr,(Register.read(regAddr) & ~mask) | (bits & mask))
+    def set(field,value):                           ## A regmap.lm49450 field
+        reg,lsb,mask = regmap.lm49450.field[field]
+        Register.update(reg,mask<<lsb,value<<lsb)
+    def flush(check=False):                         ## Send dirty regs, 1 block
+        if not Register.dirty:
+            return
+        lo = (Register.dirty & -Register.dirty).bit_length() - 1
+        hi = Register.dirty.bit_length()
+        if ((1<<hi) - (1<<lo)) & ~Register.valid:   ## Gaps not known yet
+            Register.load()
+        data = list(Register.shadow[lo:hi])
+        if not check:
+            b.write_i2c_block_data(a,lo,data)
+            Register.dirty = 0
+            return
+        for attempt in range(2):                    ## Write, then read back
+            back = i2cbus.read(a,hi-lo)
+            b.i2c_rdwr(i2cbus.write(a,[lo]+data),i2cbus.write(a,[lo]),back)
+            if list(back) == data:
+                Register.dirty = 0
+                return
+        Register.valid,Register.dirty = 0x0000,0x0000 ## Chip state unknown
+        raise OSError(errno.EIO,'LM49450 0x%02X-0x%02X did not read back'
+                      % (lo,hi-1))
+    @contextlib.contextmanager
+    def batch(check=False):                         ## Hold writes until exit
+        Register.depth += 1
+        Register.check  = Register.check or check
+        try:
+            yield
+        finally:
+            Register.depth -= 1
+            if not Register.depth:
+                check,Register.check = Register.check,False
+                Register.flush(check)
 class Volume:                                       ## Mute and volume functions
+    ## HP (0x07) and LS (0x08) are 5 bit registers. hpTable and spTable hold
+    ## the gain in dB at which codes 1-31 start (code 0 mutes): 1.5 dB steps at
+    ## the top, 3 dB steps below that, and the square-root fit at the bottom,
+    ## dB = -(k + 12*(6.5-code)**2)/16 with k = 405 (HP) or 309 (LS). A level
+    ## maps to a code with one bisect and a code back to dB by indexing, with
+    ## no float edge cases at the step boundaries.
+    hpTable = ([-48.0,-40.5,-34.5] + [-30.0 + 3*i for i in range(6)] +
+               [-13.5 + 1.5*i for i in range(22)])  ## -48 dB ... +18 dB
+    spTable = ([-42.0,-34.5,-28.5] + [-24.0 + 3*i for i in range(6)] +
+               [-7.5 + 1.5*i for i in range(22)])   ## -42 dB ... +24 dB
+    def code(table,dB):                             ## dB -> register code
+        return bisect.bisect_right(table,dB)
+    def level(table,code):                          ## Register code -> dB
+        return table[code-1] if code else float('-inf')
     def headphone(dBh):                             ## Controls headphone volume
-        if dBh < -57:                               ## given decibels desired.
-            HP = 0x1F&int(0)                        ## HP is a 5 bit register.
-        elif dBh < -24:
-            HP = 0x1F&int(6.5 + (0.288675*sqrt(-16*dBh - 405)))
-        elif dBh < -13.5:
-            HP = 0x1F&int(4 + ((dBh + 30)/3))
-        elif dBh > 18:
-            dBh = 18
-            HP = 0x1F&int(((dBh + 15)*(2/3)) + 9)
-        else:
-            HP = 0x1F&int(((dBh + 15)*(2/3)) + 9)
-        Register.write(0x07,HP)
-        dBH = dBh
+        global dBH
+        Register.write(0x07,Volume.code(Volume.hpTable,dBh))
+        dBH = min(dBh,Volume.hpTable[-1])
     def speaker(dBs):                               ## Controls speaker volume
-        if dBs < -42:                               ## given decibels desired.
-            LS = 0x1F&int(0)                        ## LS is a 5 bit register.
-        elif dBs < -18:
-            LS = 0x1F&int(6.5 + ((sqrt(-16*dBs - 309))/(2*sqrt(3))))
-        elif dBs < -7.5:
-            LS = 0x1F&int(6 + ((dBs + 18)/3))
-        elif dBs > 24:
-            dBs = 24
-            LS = 0x1F&int(((dBs + 9)*(2/3)) + 9)
-        else:
-            LS = 0x1F&int(((dBs + 9)*(2/3)) + 9)
-        Register.write(0x08,LS)
-        dBS = dBs
+        global dBS
+        Register.write(0x08,Volume.code(Volume.spTable,dBs))
+        dBS = min(dBs,Volume.spTable[-1])
     def mute(mute):                                 ## Sets/clears bit 2 of 0x00
-        if mute == true:
-            Register.write(0x00,((0xFB&(Register.read(0x00)))|0x04))
-        else:
-            Register.write(0x00,(0xFB&(Register.read(0x00))))
+        Register.set('Mute',1 if mute == True else 0)
 class EQ:                                           ## EQ lvl, EQ & freq on/off
         def switch(equalize):                       ## Sets/clears bit 4 of 0x00
-            if equalize == true:
-                Register.write(0x00,((0xEF&(Register.read(0x00)))|0x10))
-            else:
-                Register.write(0x00,(0xEF&Register.read(0x00)))
+            Register.set('EqEn',1 if equalize == True else 0)
         def level(band,lvl):                        ## Sets eq by band and level
              Register.write(0x09+band,lvl)
+        def levels(lvls):                           ## All six bands, one block
+            with Register.batch():
+                for band,lvl in enumerate(lvls):
+                    EQ.level(band,lvl)
+        ## Rate (0x00 bits 6:5), clock divisor (0x01), charge pump divisor
+        ## (0x02): 44.1 kHz Rate 2, divisors 17, 17; 48 kHz Rate 0, 8, 37.
+        clocks = {False:(2,0x21,0x21),True:(0,0x0F,0x49)}
         def freq(movie):                            ## Sets regs for 44.1/48kHz
-            if movie == false:                      ## Next line sets b5,6 = 0,1
-                Register.write(0x00,((0x9F&(Register.read(0x00)))|0x40))
-                Register.write(0x01,0x21)           ## Sets clock divisor = 17
-                Register.write(0x02,0x21)           ## Sets chargepump dv = 17
-            else:                                   ## Next line sets b5.6 = 0,0
-                Register.write(0x00,((0x9F&(Register.read(0x00)))|0x00))
-                Register.write(0x01,0x0F)           ## Sets clock divisor = 8
-                Register.write(0x01,0x49)           ## Sets chargepump dv = 37
+            rate,clock,pump = EQ.clocks[bool(movie)]
+            with Register.batch():                  ## 0x00-0x02 in one block
+                Register.set('Rate',rate)
+                Register.write(0x01,clock)
+                Register.write(0x02,pump)
+
+class Profile:                                      ## Named register images
+    ## A profile is a set of Service settings (mute, equalize, movie, dBh,
+    ## dBs, eqLevels) compiled once into an image of registers 0x00-0x0E and
+    ## a mask of the bits it leaves alone: whatever a profile does not set
+    ## (the volumes, unless it names them; mute) stays as it is. use() puts
+    ## the image into the shadow in one batch, so only the span of registers
+    ## that differ is sent, as one auto-increment block that is read back in
+    ## the same transfer. Going to the profile already set sends nothing.
+    ## EQ levels are band codes, as EQ.level takes them.
+    settings = {'music':dict(movie=False,equalize=False),
+                'movie':dict(movie=True,equalize=False),   ## 48 kHz
+                'voice':dict(movie=False,equalize=True,
+                             eqLevels=[0x00,0x00,0x04,0x04,0x02,0x00])}
+    images   = {}                                   ## Name: (image, keep)
+    def compile(s):                                 ## Settings -> image, keep
+        image = bytearray(defaults)
+        keep  = bytearray(len(defaults))
+        rate,image[0x01],image[0x02] = EQ.clocks[bool(s.get('movie'))]
+        image[0x00] = regmap.lm49450.value('MODE')(MODE=image[0x00],Rate=rate,
+                      EqEn=1 if s.get('equalize') else 0,
+                      Mute=1 if s.get('mute') else 0)
+        if 'mute' not in s:
+            keep[0x00] = regmap.lm49450.mask('Mute')[1]
+        for reg,key,table in ((0x07,'dBh',Volume.hpTable),
+                              (0x08,'dBs',Volume.spTable)):
+            if key in s:
+                image[reg] = Volume.code(table,s[key])
+            else:
+                keep[reg]  = 0xFF
+        image[0x09:0x0F] = bytes(s.get('eqLevels',[0x00]*6))
+        return bytes(image),bytes(keep)
+    def define(name,**s):                           ## Add or replace a profile
+        Profile.settings[name] = s
+        Profile.images[name]   = Profile.compile(s)
+    def custom(eqLevels,**s):                       ## The 'custom' EQ profile
+        Profile.define('custom',equalize=True,eqLevels=eqLevels,**s)
+    def use(name):
+        image,keep = Profile.images[name]
+        with Register.batch(check=True):
+            for reg,(val,k) in enumerate(zip(image,keep)):
+                if k:
+                    val = (val & ~k) | (Register.read(reg) & k)
+                Register.write(reg,val)
+Profile.images.update((name,Profile.compile(s))
+                      for name,s in Profile.settings.items())
+
+class Ramp:                                         ## Volume fades
+    ## Fades one volume register along a straight line in dB. Instead of
+    ## writing every tick, plan() works out when the line crosses each code
+    ## boundary, rounds that up to the tick grid, and keeps at least one tick
+    ## between writes, so the gain only ever moves one code at a time and
+    ## there is exactly one write per code. to() runs the plan as an asyncio
+    ## task that sleeps between writes; calling it again mid-fade picks up
+    ## from the code the register is at now.
+    def __init__(self,reg,table,tick=0.005):
+        self.reg     = reg
+        self.table   = table
+        self.tick    = tick                         ## Seconds
+        self.task    = None
+    def plan(self,start,dB,duration):               ## [(seconds, code)]
+        end  = Volume.code(self.table,dB)
+        step = 1 if end > start else -1
+        d0   = self.table[max(start,1)-1]           ## Middle of start's step
+        if 0 < start < len(self.table):
+            d0 = (d0 + self.table[start])/2
+        out,last = [],-self.tick
+        for c in range(start+step,end+step,step):
+            edge = self.table[c-1] if step > 0 else self.table[c]
+            t    = duration*(edge-d0)/(dB-d0) if dB != d0 else 0
+            t    = math.ceil(max(0,min(t,duration))/self.tick)*self.tick
+            last = max(t,last + self.tick)
+            out.append((last,c))
+        return out
+    async def fade(self,dB,duration):
+        import asyncio
+        loop  = asyncio.get_running_loop()
+        begin = loop.time()
+        start = await b.run(Register.read,self.reg)
+        for t,c in self.plan(start,dB,duration):
+            await asyncio.sleep(begin + t - loop.time())
+            await b.run(Register.write,self.reg,c)
+    def to(self,dB,duration):                       ## Start (or redirect) fade
+        import asyncio
+        if self.task:
+            self.task.cancel()
+        self.task = asyncio.ensure_future(self.fade(dB,duration))
+        return self.task
+headphoneRamp  = Ramp(0x07,Volume.hpTable)
+speakerRamp    = Ramp(0x08,Volume.spTable)
+
+class Service:                                      ## Event-driven settings
+    ## Settings (profile: a Profile name; mute, equalize, movie: bools; dBh,
+    ## dBs: volume in dB; eqLevels: six band levels) are handed to set()
+    ## from asyncio tasks or post() from other threads. The loop sleeps on an
+    ## event until something changes, gives other changes `window` seconds
+    ## to arrive, then applies all of them inside one Register.batch(), so a
+    ## mute + volume + EQ change is a single bus transaction. Values that
+    ## are already set cost nothing.
+    ## Register work is done through the bus arbiter's run(), so the loop
+    ## keeps going while the display holds the bus, and it never overlaps
+    ## a fade step. Unknown settings and profiles are refused by set() and
+    ## post(); a batch that still fails on the chip (a read-back that never
+    ## matched, say) is logged and dropped, and the loop keeps serving.
+    ## Settings posted before run() has started wait in pending for it.
+    keys    = ('profile','mute','equalize','movie','dBh','dBs','eqLevels')
+    def __init__(self,window=0.005):
+        self.window  = window                       ## Coalescing time, seconds
+        self.pending = {}
+        self.changed = None
+        self.loop    = None
+    def check(self,settings):                       ## ValueError if unknown
+        bad = sorted(set(settings) - set(self.keys))
+        if bad:
+            raise ValueError('unknown audio setting: %s' % ', '.join(bad))
+        if 'profile' in settings and settings['profile'] not in Profile.images:
+            raise ValueError('unknown profile %r' % settings['profile'])
+    def set(self,**settings):                       ## From the service's loop
+        self.check(settings)
+        self.pending.update(settings)
+        if self.changed:
+            self.changed.set()
+    def post(self,**settings):                      ## From any other thread
+        self.check(settings)
+        loop = self.loop
+        if loop is None:                            ## run() not started yet
+            self.pending.update(settings)
+            loop,settings = self.loop,{}
+            if loop is None:
+                return
+        loop.call_soon_threadsafe(lambda: self.set(**settings))
+    def apply(self,changes):
+        with Register.batch():
+            if 'profile' in changes:                ## Then settings on top
+                Profile.use(changes['profile'])
+            if 'mute' in changes:
+                Volume.mute(changes['mute'])
+            if 'dBh' in changes:
+                Volume.headphone(changes['dBh'])
+            if 'dBs' in changes:
+                Volume.speaker(changes['dBs'])
+            if 'equalize' in changes:
+                EQ.switch(changes['equalize'])
+            if 'eqLevels' in changes:
+                EQ.levels(changes['eqLevels'])
+            if 'movie' in changes:
+                EQ.freq(changes['movie'])
+    async def run(self):
+        import asyncio
+        self.changed = asyncio.Event()
+        self.loop    = asyncio.get_running_loop()
+        if self.pending:
+            self.changed.set()
+        while True:
+            await self.changed.wait()
+            await asyncio.sleep(self.window)
+            self.changed.clear()
+            changes,self.pending = self.pending,{}
+            try:
+                await b.run(self.apply,changes)
+            except Exception:
+                log.exception('audio settings not applied: %r',changes)
+service = Service()
 
 def mainLoop():                                     ## Separated for convenience
-    while True:
-        mute = inBool1                              ## T: mute on F: mute off
-        equalize = inBool2                          ## T: eq on   F: eq off
-        movie = inBool3                             ## T: f=48kHz F: f=44.1kHz
-        dBh = hpVolIn
-        dBs = spVolIn
-        eqLevels = bytearray([u,v,w,x,y,z])         ## where u:z are input vars
-        if (mute != muted):
-            Volume.mute(mute)
-            muted = mute
-        elif (dBh != dBH):
-            Volume.headphone(dBh)
-        elif (dBs != dBS):
-            Volume.speaker(dBs)
-        elif (equalize != equalized):
-            EQ.switch(equalize)
-            equalized = equalize
-        elif (eqLevels != lastEql):
-            for i,level in enumerate(EQLevels):
-                EQ.level(i,level)
-            lastEql = eqLevels
-        elif (movie != movieMode):
-            EQ.freq(movie)
-            movie = moviemode
-        sleep(0.1)
+    import asyncio                                  ## Only the service needs it
+    asyncio.run(service.run())
 
 def main():
-    for i,val in enumerate(defaults):
-        Register.write(0x0F&i,val)
+    with Register.batch():                          ## One block for all regs
+        for i,val in enumerate(defaults):
+            Register.write(0x0F&i,val)
 ##    mainLoop()
\ No newline at end of file
@@ -0,0 +1,171 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero benchmarks
+# Purpose:     Time the display bring-up, its steps, DCS and lookup table
+#              uploads and the audio setting paths on the simulated bus 3, and
+#              fail when they get slower than the stored baseline.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, json, tempfile, contextlib, io
+here         = os.path.dirname(os.path.abspath(__file__))
+baseline     = os.path.join(here,'bench.json')     ## Stored results
+metrics      = ['wall','xfers','msgs','bytes','bus'] ## ms, count, count, B, ms
+threshold    = {'wall':0.10,'xfers':0.0,'msgs':0.0, ## Allowed growth, fraction
+                'bytes':0.0,'bus':0.01}
+slack        = {'wall':3.0}                        ## ... plus this much, ms
+repeat       = 3                                   ## Runs; the best is kept
+
+## Every scenario runs on simbus's board with its bitbanged bus latency
+## model (realtime: the bus really takes the time it would on the Pi Zero),
+## so wall time is what the board would see, less the Pi's slower CPU.
+## xfers, msgs and bytes (both directions) and the modelled bus time are
+## exact for a given tree; wall time is not, so each scenario keeps the best
+## of `repeat` runs and gets a threshold and a few ms of slack. A scenario
+## that has a prep runs on a fresh board after prep (not timed); one without
+## continues on the board the previous one left, as the bring-up steps do.
+## The cache directory is pointed at an empty one, so no saved bus, D-PHY or
+## bring-up profile of this machine changes the results.
+##
+##   bench.py              run, compare with bench.json, exit 1 on regression
+##   bench.py --save       run and store the results as the new baseline
+##   bench.py --count      no realtime bus sleeps (fast; wall not compared)
+##
+## Wall times are only compared between two realtime runs.
+
+def scenarios():                                   ## [(name,prep,fn)]
+    import asyncio, videodriver, AudioDriver
+    d,A = videodriver,AudioDriver
+    def quiet(fn):                                 ## fn without its prints
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+        return run
+    def reg6():                                    ## Reg.six, as ScreenReg
+        with d.DCS.batch():
+            for k in d.Reg.six:
+                d.DCS.WRITE(k)
+    def early():                                   ## Steps before ScreenReg
+        for name in ('GlobalReg','PHYReg','PPIReg','TXReg','ErrorReg'):
+            getattr(d.step,name)()
+    def service():                                 ## set() to chip, seconds
+        chip = d.b.handle.devices[A.a]
+        code = A.Volume.code(A.Volume.hpTable,-3)
+        async def go():
+            s    = A.Service()
+            task = asyncio.ensure_future(s.run())
+            await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            s.set(dBh=-3)
+            while chip.regs[0x07] != code:
+                await asyncio.sleep(0.0002)
+            took = time.perf_counter() - start
+            task.cancel()
+            return took
+        return asyncio.run(go())
+    out = [('main',lambda: None,quiet(d.main))]
+    for i,name in enumerate(['GlobalReg','PHYReg','PPIReg','TXReg',
+                             'ErrorReg','ScreenReg','LookupTable',
+                             'DSITXReg']):
+        out.append(('step.' + name,None if i else lambda: None,
+                    getattr(d.step,name)))
+    out += [('dcs.reg6',early,reg6),
+            ('lut.upload',d.bringUp,d.step.LookupTable),
+            ('audio.defaults',lambda: None,A.main),
+            ('audio.volume',None,lambda: A.Volume.headphone(-9)),
+            ('audio.mute',None,lambda: A.Volume.mute(True)),
+            ('audio.eq',None,lambda: A.EQ.levels([1,2,3,3,2,1])),
+            ('audio.freq',None,lambda: A.EQ.freq(True)),
+            ('audio.profile',None,lambda: A.Profile.use('voice')),
+            ('audio.service',None,service)]
+    return out
+
+def fresh(realtime):                               ## New simulated board
+    import i2cbus, simbus, videodriver, AudioDriver
+    bus = i2cbus.SMBus(3)
+    bus.dev = simbus.board(3,simbus.Latency(realtime=realtime))
+    videodriver.DCS.forget()
+    AudioDriver.Register.valid = AudioDriver.Register.dirty = 0x0000
+    return bus
+def run(realtime=True):                            ## {name: {metric: value}}
+    import i2cbus
+    i2cbus.backend = 'sim'
+    out = {}
+    bus = None
+    for name,prep,fn in scenarios():
+        if prep or bus is None:
+            bus = fresh(realtime)
+            (prep or (lambda: None))()
+        before = bus.handle.stats.copy()
+        start  = time.perf_counter()
+        took   = fn()
+        wall   = time.perf_counter() - start
+        d      = bus.handle.stats - before
+        out[name] = {'wall':round(1000*(wall if took is None else took),3),
+                     'xfers':d.transactions,'msgs':d.messages,
+                     'bytes':d.bytesOut + d.bytesIn,
+                     'bus':round(1000*d.busTime,3)}
+    return out
+
+def compare(results,base,skip=()):                 ## [(name,metric,base,now)]
+    worse = []
+    for name,now in results.items():
+        for m in metrics:
+            if m in skip or name not in base or m not in base[name]:
+                continue
+            limit = base[name][m]*(1 + threshold[m]) + slack.get(m,0.0)
+            if now[m] > limit + 1e-9:
+                worse.append((name,m,base[name][m],now[m]))
+    return worse
+def report(results,base=None):                     ## Text table
+    out = ['%-18s %10s %6s %6s %7s %9s' % ('scenario','wall ms','xfers',
+                                           'msgs','bytes','bus ms')]
+    for name,r in results.items():
+        line = '%-18s %10.3f %6d %6d %7d %9.3f' % ((name,) + tuple(
+               r[m] for m in metrics))
+        if base and name in base:
+            line += '  (was %.3f ms, %d xfers)' % (base[name]['wall'],
+                                                  base[name]['xfers'])
+        out.append(line)
+    return '\n'.join(out)
+def load(path=baseline):                           ## {realtime,scenarios}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return None
+def save(results,realtime,path=baseline):
+    with open(path + '.tmp','w') as f:
+        json.dump({'realtime':realtime,'scenarios':results},f,indent=1,
+                  sort_keys=True)
+    os.replace(path + '.tmp',path)
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    realtime = '--count' not in args
+    with tempfile.TemporaryDirectory(prefix='dzbench') as cache:
+        os.environ['XDG_CACHE_HOME'] = cache
+        results = run(realtime)
+        for i in range(repeat - 1):
+            for name,r in run(realtime).items():
+                results[name]['wall'] = min(results[name]['wall'],r['wall'])
+    saved    = load()
+    base     = saved['scenarios'] if saved else None
+    print(report(results,base))
+    if '--save' in args:
+        save(results,realtime)
+        print('baseline saved to %s' % baseline)
+        return 0
+    if base is None:
+        print('no baseline; run with --save to store one')
+        return 0
+    same  = realtime and saved['realtime']         ## Wall times comparable
+    worse = compare(results,base,() if same else ('wall',))
+    for name,m,was,now in worse:
+        print('REGRESSION %s %s: %.3f -> %.3f' % (name,m,was,now))
+    return 1 if worse else 0
+if __name__ == '__main__':
+    sys.exit(main())
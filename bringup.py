@@ -0,0 +1,202 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero bring-up image
+# Purpose:     Compile the videodriver bring-up sequence once into a compact
+#              binary image, cache it on disk, and replay it at boot without
+#              importing videodriver or doing any of its timing arithmetic.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, struct, hashlib, time, i2cbus, writeplan, bustune
+magic        = b'DZBI'                             ## Double Zero bring-up image
+version      = 1                                   ## Bump when format changes
+here         = os.path.dirname(os.path.abspath(__file__))
+sources      = ['videodriver.py','writeplan.py','pllsolve.py',
+                'pllmodes.py','regmap.py']         ## Inputs to the image key
+cache        = os.path.join(os.environ.get('XDG_CACHE_HOME',
+               os.path.expanduser('~/.cache')),'doublezero','bringup.img')
+XFER,DELAY,UNTIL,CHECKED = 1,2,3,4                 ## Opcodes
+
+## Image layout, little endian:
+##   header   '4sB20sI'  magic, version, key (sha1), number of ops
+##   XFER     'BB'       op, messages; per message 'BBB' i2c addr, flags,
+##                       length, then the data bytes if it is a write
+##   DELAY    'BI'       op, microseconds
+##   UNTIL    'BHIIIB'   op, register, mask, value, timeout us, length
+##   CHECKED  XFER then the UNTIL fields: run the transfer with a read of the
+##            register on the end, and poll only if it did not match.
+## The key is a hash of the driver sources and the message size limit, so
+## editing any timing parameter (or any Reg table), or a new bustune.py
+## profile, invalidates the cached image automatically.
+
+def key():                                         ## sha1 of the image inputs
+    h = hashlib.sha1(magic + struct.pack('<BH',version,writeplan.limit))
+    for name in sources:
+        with open(os.path.join(here,name),'rb') as f:
+            h.update(f.read())
+    return h.digest()
+
+def compile(driver=None):                          ## Record videodriver.bringUp
+    if driver is None:
+        import videodriver as driver
+    return record(driver.bringUp,driver)
+def record(fn,driver):                             ## Ops fn() sends via driver
+    ## driver is videodriver, or a copy of it for another configuration (see
+    ## reconfig.py); its bus and waits are swapped for recorders during fn().
+    ops = []
+    class Recorder:                                ## Bus that only records
+        def write_byte_data(self,addr,reg,val):
+            ops.append((XFER,[(addr,0,bytes([reg,val]))]))
+        def write_i2c_block_data(self,addr,reg,data):
+            ops.append((XFER,[(addr,0,bytes([reg])+bytes(data))]))
+        def i2c_rdwr(self,*msgs):
+            ops.append((XFER,[(m.addr,m.flags,bytes(list(m))) for m in msgs]))
+    class Record(driver.Wait):                     ## Waits that only record
+        def delay(self,seconds):
+            ops.append((DELAY,int(round(seconds*1000000))))
+        def until(self,reg,mask,value,timeout,length=2):
+            ops.append((UNTIL,reg,mask,value,int(timeout*1000000),length))
+            return True
+        def after(self,plan,reg,mask,value,timeout,length=2,got=None):
+            msgs = [(plan.addr,0,bytes(m)) for m,n in plan.messages()]
+            plan.runs = []
+            ops.append((CHECKED,msgs,reg,mask,value,int(timeout*1000000),
+                        length))
+            return True
+    bus,wait = driver.b,driver.wait
+    driver.b,driver.wait = Recorder(),Record()
+    try:
+        fn()
+    finally:
+        driver.b,driver.wait = bus,wait
+    return ops
+
+def pack(ops,k):                                   ## ops -> image bytes
+    out = [struct.pack('<4sB20sI',magic,version,k,len(ops))]
+    def msgs(m):
+        out.append(struct.pack('<BB',op[0],len(m)))
+        for addr,flags,data in m:
+            out.append(struct.pack('<BBB',addr,flags,len(data)))
+            if not flags & 0x01:
+                out.append(data)
+    for op in ops:
+        if op[0] == XFER:
+            msgs(op[1])
+        elif op[0] == DELAY:
+            out.append(struct.pack('<BI',*op))
+        elif op[0] == UNTIL:
+            out.append(struct.pack('<BHIIIB',*op))
+        else:
+            msgs(op[1])
+            out.append(struct.pack('<HIIIB',*op[2:]))
+    return b''.join(out)
+def unpack(data):                                  ## image bytes -> k, ops
+    m,v,k,n = struct.unpack_from('<4sB20sI',data)
+    if m != magic or v != version:
+        raise ValueError('not a version %d bring-up image' % version)
+    p,ops = 29,[]
+    def msgs():
+        nonlocal p
+        out = []
+        for i in range(data[p+1]):
+            addr,flags,length = struct.unpack_from('<BBB',data,p+2)
+            p += 3
+            if flags & 0x01:
+                out.append((addr,flags,length))
+            else:
+                out.append((addr,flags,data[p+2:p+2+length]))
+                p += length
+        p += 2
+        return out
+    for i in range(n):
+        if data[p] == XFER:
+            ops.append((XFER,msgs()))
+        elif data[p] == DELAY:
+            ops.append(struct.unpack_from('<BI',data,p))
+            p += 5
+        elif data[p] == UNTIL:
+            ops.append(struct.unpack_from('<BHIIIB',data,p))
+            p += 16
+        else:
+            m = msgs()
+            ops.append((CHECKED,m) + struct.unpack_from('<HIIIB',data,p))
+            p += 15
+    return k,ops
+
+def load(path=cache):                              ## Cached ops, rebuilt if old
+    k = key()
+    try:
+        with open(path,'rb') as f:
+            old,ops = unpack(f.read())
+        if old == k:
+            return ops
+    except (OSError,ValueError,struct.error):
+        pass
+    ops = compile()
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    with open(path + '.tmp','wb') as f:
+        f.write(pack(ops,k))
+    os.replace(path + '.tmp',path)
+    return ops
+
+def until(bus,reg,mask,value,timeout,length):      ## As videodriver Wait.until
+    end = time.monotonic_ns() + 1000*timeout
+    try:
+        while True:
+            data = writeplan.Plan().read(reg,length).submit(bus)[0]
+            if (writeplan.value(data) & mask) == value:
+                return True
+            if time.monotonic_ns() >= end:
+                return False
+            time.sleep(min(500000,max(0,end - time.monotonic_ns()))/1e9)
+    except OSError:
+        time.sleep(max(0,end - time.monotonic_ns())/1000000000)
+        return False
+def run(ops,bus):                                  ## Replay an image on a bus
+    driver = sys.modules.get('videodriver')        ## Its DCS register shadow
+    if driver:                                     ## won't match after this
+        driver.DCS.forget()
+    for op in ops:
+        if op[0] == DELAY:
+            time.sleep(op[1]/1000000)
+            continue
+        if op[0] == UNTIL:
+            until(bus,*op[1:])
+            continue
+        msgs = []
+        for addr,flags,data in op[1]:
+            if flags & 0x01:
+                msgs.append(i2cbus.read(addr,data))
+            else:
+                msgs.append(i2cbus.write(addr,data))
+        if op[0] == XFER:
+            bus.i2c_rdwr(*msgs)
+            continue
+        reg,mask,value,timeout,length = op[2:]
+        addr = op[1][-1][0]
+        msgs.append(i2cbus.write(addr,[reg>>8,reg&0xFF]))
+        msgs.append(i2cbus.read(addr,length))
+        try:
+            bus.i2c_rdwr(*msgs)
+            if (writeplan.value(bytes(list(msgs[-1]))) & mask) == value:
+                continue
+        except OSError:
+            pass
+        until(bus,reg,mask,value,timeout,length)
+
+def main():
+    bus = i2cbus.SMBus(3)
+    bustune.tune(bus)
+    if 'compile' in sys.argv[1:]:
+        try:
+            os.remove(cache)
+        except OSError:
+            pass
+    ops = load()
+    if 'compile' not in sys.argv[1:]:
+        run(ops,bus)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero bus tuning
+# Purpose:     Measure throughput and errors of bus 3 for each message size,
+#              and set writeplan.limit to the largest size that is reliable.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, json, i2cbus, writeplan
+a            = 0x0e                                ## TC358778XBG
+region       = (0x0210,48)                         ## PPI timing, 0x0210-0x023F
+sizes        = [8,16,24,32,48]                     ## Data bytes per message
+rounds       = 8                                   ## Per size
+reliable     = 0.01                                ## Failed messages allowed
+profile      = os.path.join(os.environ.get('XDG_CACHE_HOME',
+               os.path.expanduser('~/.cache')),'doublezero','bus3.json')
+
+## The probe writes the PPI timing registers back with the values they
+## already hold, one message of each size per transfer so a failure can be
+## put down to its size, and reads them back. These are plain counters that
+## PPIReg sets anyway, so the probe is harmless before or after bring-up. A
+## message counts as failed if it had to be retried or raised, and a round
+## whose read back differs counts as one more. A size is reliable when at
+## most `reliable` of its messages failed. Sizes are whole 32-bit
+## registers, so the limit (data + 2 address bytes) is one writeplan uses
+## as is.
+
+def probe(bus,sizes=sizes,rounds=rounds):          ## {size: [B/s,fails,msgs]}
+    reg,length = region
+    out = {}
+    with i2cbus.hold(bus):                         ## Nobody else in between
+        try:
+            want = writeplan.Plan(a).read(reg,length).submit(bus)[0]
+        except OSError:
+            return out
+        for size in sizes:
+            fails,sent,spent = 0,0,0.0
+            for i in range(rounds):
+                for off in range(0,length,size):
+                    retried = getattr(bus,'retried',0)
+                    plan    = writeplan.Plan(a,size+2)
+                    plan.write(reg+off,want[off:off+size])
+                    start   = time.perf_counter()
+                    try:
+                        plan.submit(bus)
+                        fails += getattr(bus,'retried',0) != retried
+                    except OSError:
+                        fails += 1
+                    spent += time.perf_counter() - start
+                    sent  += 1
+                try:
+                    fails += writeplan.Plan(a).read(reg,length).submit(bus)[0] \
+                             != want
+                except OSError:
+                    pass                           ## Not this size's fault
+            out[size] = [rounds*length/spent,fails,sent]
+    return out
+def choose(results):                               ## Largest reliable limit
+    ## If no size is reliable, the one that failed least often.
+    if not results:
+        return None
+    good = [size for size,(rate,fails,n) in results.items()
+            if fails <= reliable*n]
+    if not good:
+        good = [min(results,key=lambda s: (results[s][1]/results[s][2],-s))]
+    return max(good) + 2
+
+def save(results,path=profile):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    with open(path + '.tmp','w') as f:
+        json.dump({'time':time.time(),'limit':choose(results),
+                   'sizes':results},f)
+    os.replace(path + '.tmp',path)
+def load(path=profile):                            ## Saved limit, or None
+    try:
+        with open(path) as f:
+            return json.load(f)['limit']
+    except (OSError,ValueError,KeyError):
+        return None
+def tune(bus,path=profile,fresh=False):            ## Set writeplan.limit
+    ## Uses the saved profile unless fresh is set or there is none; if the
+    ## probe cannot reach the chip, the limit is left alone.
+    limit = None if fresh else load(path)
+    if limit is None:
+        results = probe(bus)
+        limit   = choose(results)
+        if results:
+            save(results,path)
+    if limit:
+        writeplan.limit = limit
+    return writeplan.limit
+
+def main():
+    ## bustune.py      probe bus 3 again, save the profile and print it
+    bus     = i2cbus.SMBus(3)
+    results = probe(bus)
+    if not results:
+        print('TC358778XBG not answering on bus 3')
+        return
+    save(results)
+    for size,(rate,fails,n) in sorted(results.items()):
+        print('%3d B/msg %8.0f B/s %3d/%d messages failed' %
+              (size,rate,fails,n))
+    print('limit',choose(results))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero buttons
+# Purpose:     Interrupt-driven input from the TCA6416A I/O expander: wait on
+#              its INT line, read both ports in one transfer, and deliver
+#              debounced button events to asyncio subscribers.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, select, threading, i2cbus
+a            = 0x20                                ## TCA6416A, ADDR low
+b            = i2cbus.SMBus(3)
+intGpio      = 17                                  ## BCM pin on expander INT
+names        = {0:'button1',1:'button2',2:'button3'} ## P00-P02, active low
+settle       = 0.020                               ## Debounce lockout, seconds
+
+## Nothing polls. A thread sleeps in poll() on the INT line until the
+## expander pulls it low (any input changed), reads both input ports in one
+## URGENT transfer (which also releases INT), and hands the events to the
+## subscribers' loops with call_soon_threadsafe: a press reaches a
+## subscriber about as fast as the bus can read two bytes, a few ms. A pin
+## that changes is reported at once and then ignored for `settle` seconds
+## while it bounces; when that runs out the ports are read again, so a
+## press shorter than `settle` still gets its release. While nothing
+## changes, nothing wakes up.
+##
+## The line is a GPIO abstraction with two implementations: SysfsLine, the
+## kernel's /sys/class/gpio edge interface, and FileLine, a named pipe that
+## anything (a test, simbus's expander) writes a byte to for each edge.
+## Events are (name,pressed,time): name from `names` (other pins 'P07',
+## 'P13' ...), pressed True when the button is down, time.monotonic().
+
+class SysfsLine:                                   ## GPIO input, sysfs edges
+    events   = select.POLLPRI | select.POLLERR
+    def __init__(self,pin=intGpio,edge='falling',root='/sys/class/gpio'):
+        path = os.path.join(root,'gpio%d' % pin)
+        if not os.path.exists(path):
+            with open(os.path.join(root,'export'),'w') as f:
+                f.write(str(pin))
+        for name,value in (('direction','in'),('edge',edge)):
+            with open(os.path.join(path,name),'w') as f:
+                f.write(value)
+        self.file = open(os.path.join(path,'value'),'rb',buffering=0)
+    def fileno(self):
+        return self.file.fileno()
+    def level(self):                               ## 0 or 1; clears the edge
+        self.file.seek(0)
+        return int(self.file.read(1) or b'1')
+    def close(self):
+        self.file.close()
+class FileLine:                                    ## Stand-in: a named pipe
+    ## Every byte written is an edge; the level always reads back high, so
+    ## each edge is taken as one interrupt. Opened read-write, so the pipe
+    ## never reports a hang-up when no writer has it open.
+    events   = select.POLLIN
+    def __init__(self,path):
+        if not os.path.exists(path):
+            os.mkfifo(path)
+        self.fd  = os.open(path,os.O_RDWR | os.O_NONBLOCK)
+    def fileno(self):
+        return self.fd
+    def level(self):                               ## Drains the edges
+        try:
+            while os.read(self.fd,4096):
+                pass
+        except BlockingIOError:
+            pass
+        return 1
+    def close(self):
+        os.close(self.fd)
+    @staticmethod
+    def edge(path):                                ## Signal one edge on path
+        fd = os.open(path,os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            os.write(fd,b'0')
+        finally:
+            os.close(fd)
+
+class Expander:                                    ## TCA6416A
+    ## Registers come in pairs (input 0x00, output 0x02, polarity 0x04,
+    ## config 0x06; port 0 then port 1), read and written two bytes at a
+    ## time. The buttons' pins are made inputs with inverted polarity, so
+    ## a 1 is a button held down; the other pins are left as they are.
+    def __init__(self,addr=a,pins=None):
+        self.addr    = addr
+        self.mask    = sum(1<<p for p in (pins or names))
+    def setup(self,bus=b):                         ## Returns the pin states
+        r,w = i2cbus.read,i2cbus.write
+        with i2cbus.priority(i2cbus.URGENT):
+            msgs = [w(self.addr,[0x04]),r(self.addr,2),
+                    w(self.addr,[0x06]),r(self.addr,2)]
+            bus.i2c_rdwr(*msgs)
+            invert = int.from_bytes(bytes(msgs[1]),'little') | self.mask
+            config = int.from_bytes(bytes(msgs[3]),'little') | self.mask
+            bus.i2c_rdwr(w(self.addr,[0x04,invert & 0xFF,invert>>8]),
+                         w(self.addr,[0x06,config & 0xFF,config>>8]))
+        return self.read(bus)
+    def read(self,bus=b):                          ## Both input ports
+        msgs = [i2cbus.write(self.addr,[0x00]),i2cbus.read(self.addr,2)]
+        with i2cbus.priority(i2cbus.URGENT):
+            bus.i2c_rdwr(*msgs)
+        return int.from_bytes(bytes(msgs[1]),'little') & self.mask
+
+def name(pin):                                     ## Event name of a pin
+    return names.get(pin,'P%d%d' % (pin//8,pin%8))
+class Buttons:                                     ## The input service
+    def __init__(self,line=None,expander=None,settle=settle):
+        self.line    = line                        ## SysfsLine() at start()
+        self.expander = expander or Expander()
+        self.settle  = settle
+        self.state   = 0                           ## Debounced pin states
+        self.locked  = {}                          ## pin: monotonic() free
+        self.subs    = []                          ## (loop,asyncio.Queue)
+        self.thread  = None
+        self.wake    = None                        ## Pipe that stops thread
+        self.scans   = 0                           ## Port reads made
+    def start(self,bus=b):
+        if self.thread:
+            return
+        self.line    = self.line or SysfsLine()
+        self.state   = self.expander.setup(bus)
+        self.wake    = os.pipe()
+        self.thread  = threading.Thread(target=self.watch,args=(bus,),
+                                        name='buttons',daemon=True)
+        self.thread.start()
+    def stop(self):
+        if self.thread:
+            os.write(self.wake[1],b'x')
+            self.thread.join()
+            for fd in self.wake:
+                os.close(fd)
+            self.thread = None
+    def watch(self,bus):                           ## The thread
+        poller = select.poll()
+        poller.register(self.line,self.line.events)
+        poller.register(self.wake[0],select.POLLIN)
+        while True:
+            wait = None                            ## Idle: sleep until INT
+            if self.locked:
+                wait = max(0,min(self.locked.values()) - time.monotonic())
+                wait = int(1000*wait) + 1
+            ready = dict(poller.poll(wait))
+            if self.wake[0] in ready:
+                return
+            self.line.level()                      ## Acknowledge the edge
+            self.scan(bus)
+            while self.line.level() == 0:          ## Changed again meanwhile
+                self.scan(bus)
+    def scan(self,bus=b):                          ## Read, debounce, send
+        pins = self.expander.read(bus)
+        now  = time.monotonic()
+        self.scans += 1
+        for pin,free in list(self.locked.items()):
+            if now >= free:
+                del self.locked[pin]
+        held = sum(1<<pin for pin in self.locked)
+        for pin in range(16):
+            if (pins ^ self.state) & ~held & (1<<pin):
+                self.state ^= 1<<pin
+                self.locked[pin] = now + self.settle
+                self.send((name(pin),bool(pins & (1<<pin)),now))
+    def send(self,event):
+        for loop,queue in list(self.subs):
+            loop.call_soon_threadsafe(queue.put_nowait,event)
+
+    def subscribe(self):                           ## Queue of events; in loop
+        import asyncio
+        queue = asyncio.Queue()
+        self.subs.append((asyncio.get_running_loop(),queue))
+        return queue
+    def unsubscribe(self,queue):
+        self.subs = [s for s in self.subs if s[1] is not queue]
+    async def events(self):                        ## async for name,down,t
+        queue = self.subscribe()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+    def pressed(self):                             ## Names of buttons down
+        return [name(p) for p in range(16) if self.state & (1<<p)]
+buttons = Buttons()
+
+def main():
+    ## buttons.py [FIFO]   print events; FIFO: a FileLine instead of INT
+    import asyncio
+    if sys.argv[1:]:
+        buttons.line = FileLine(sys.argv[1])
+    async def show():
+        buttons.start()
+        async for name,down,t in buttons.events():
+            print('%.3f %s %s' % (t,name,'down' if down else 'up'))
+    try:
+        asyncio.run(show())
+    except KeyboardInterrupt:
+        buttons.stop()
+if __name__ == '__main__':
+    main()
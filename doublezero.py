@@ -0,0 +1,112 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero command line
+# Purpose:     One entry point for boot scripts: bring up the display and the
+#              audio chip, dump their registers, set the volume and switch
+#              the screen, importing only what each command needs.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import sys, time, i2cbus
+usage        = '''usage: doublezero.py COMMAND
+  init [video|audio]                 bring-up (both by default)
+  dump [video|audio]                 register dump (video by default)
+  set-volume DB [headphone|speaker]  volume in dB (both by default)
+  screen on|off                      display on or off
+  timings                            PLL and DSI clocks of the video mode'''
+
+## Importing a driver module opens nothing (i2cbus opens the bus on its
+## first call), but videodriver still works out all of its timing tables
+## when imported. These objects import their module the first time it is
+## needed, so `init` replays the cached bring-up image (bringup.py) without
+## importing videodriver at all unless the image is stale, and no command
+## pays for a chip it does not talk to.
+
+class VideoDriver:                                 ## TC358778XBG and panel
+    def __init__(self):
+        self.bus     = i2cbus.SMBus(3)
+        self.module  = None
+    def driver(self):                              ## videodriver, on demand
+        if self.module is None:
+            import videodriver
+            self.module = videodriver
+        return self.module
+    def init(self):                                ## Cached bring-up, seconds
+        import bringup, bustune
+        start = time.perf_counter()
+        bustune.tune(self.bus)
+        bringup.run(bringup.load(),self.bus)
+        return time.perf_counter() - start
+    def dump(self):                                ## {first reg: bytes}
+        import readall
+        return readall.snapshot(self.bus)
+    def screen(self,on):
+        d = self.driver()
+        d.screen.on() if on else d.screen.off()
+    def timings(self):                             ## Name: value, Hz or ns
+        d = self.driver()
+        return {'pixel clock Hz':d.pixelClock,'frame rate':d.frameRate,
+                'PLL Hz':d.PLL.pllClock,'byte clock Hz':d.PLL.byteClkFrq,
+                'HS byte clock ns':d.PPI.HSByteClk,'lanes':d.mipiLanes}
+class AudioDriver:                                 ## LM49450
+    def __init__(self):
+        self.module  = None
+    def driver(self):                              ## AudioDriver, on demand
+        if self.module is None:
+            import AudioDriver
+            self.module = AudioDriver
+        return self.module
+    def init(self):                                ## Default registers
+        self.driver().main()
+    def dump(self):                                ## The 16 registers
+        Register = self.driver().Register
+        Register.valid = 0x0000                    ## Read them from the chip
+        Register.load()
+        return {0x00: bytes(Register.shadow)}
+    def volume(self,dB,headphone=True,speaker=True):
+        d = self.driver()
+        with d.Register.batch():
+            if headphone:
+                d.Volume.headphone(dB)
+            if speaker:
+                d.Volume.speaker(dB)
+video = VideoDriver()
+audio = AudioDriver()
+
+def show(snap,fmt):                                ## Hex dump, 16 bytes a row
+    for base in sorted(snap):
+        data = snap[base]
+        for i in range(0,len(data),16):
+            print(fmt % (base+i),data[i:i+16].hex(' '))
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    cmd  = args.pop(0) if args else ''
+    what = args[0] if args else None
+    if cmd == 'init':
+        if what in (None,'video'):
+            print('video up in %.3f s' % video.init())
+        if what in (None,'audio'):
+            audio.init()
+    elif cmd == 'dump':
+        if what == 'audio':
+            show(audio.dump(),'0x%02X')
+        else:
+            show(video.dump(),'0x%04X')
+    elif cmd == 'set-volume' and args:
+        which = args[1] if args[1:] else None
+        audio.volume(float(args[0]),which in (None,'headphone'),
+                     which in (None,'speaker'))
+    elif cmd == 'screen' and what in ('on','off'):
+        video.screen(what == 'on')
+    elif cmd == 'timings':
+        for name,value in video.timings().items():
+            print('%-18s %s' % (name,value))
+    else:
+        print(usage)
+        return 2
+    return 0
+if __name__ == '__main__':
+    sys.exit(main())
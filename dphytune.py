@@ -0,0 +1,182 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero D-PHY tuning
+# Purpose:     Sweep the TC358778XBG lane drive settings (the DPHY class) and
+#              the MIPI bit clock against the DSI error registers, and find
+#              the fastest bit clock this board's link runs without errors.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, json, i2cbus, writeplan, reconfig, modeplan, regmap
+a            = 0x0e                                ## TC358778XBG
+lanes        = ['cl','d0','d1','d2','d3']          ## 0x0100 + 4*i, as DPHY
+ranges       = [range(4),range(4),range(16)]       ## Cap, current, delay
+status       = (0x0414,0x0434,0x0440,0x044C)       ## DSI_INT, ACKERR, RXERR,
+                                                   ## ERR; enabled at reg + 4
+pattern      = [0x00,0x55,0xAA,0x33,0xCC,0x0F,0xF0,0xFF,
+                0x00,0x99,0x66,0xA5,0x5A,0x3C,0xC3,0x01] ## DCS NOP + params
+packets      = 8                                   ## Pattern packets a round
+rounds       = 4                                   ## Rounds per setting
+confirm      = 32                                  ## Rounds to call it stable
+passes       = 3                                   ## Sweeps per bit clock
+step         = 25000000                            ## Bit clock step, Hz
+fine         = 3125000                             ## ... and the finest
+profile      = os.path.join(os.environ.get('XDG_CACHE_HOME',
+               os.path.expanduser('~/.cache')),'doublezero','dphy.json')
+
+## A setting is scored by how many rounds of test pattern it got wrong: a
+## round is `packets` long DCS packets (a NOP with a fixed mix of bit
+## patterns, which the panel ignores), followed by one read of the error
+## status registers whose interrupts Step.ErrorReg enables, counting a round
+## as failed if any enabled bit is set; the bits are then cleared by writing
+## them back. Lane settings go in through the same 0x0100 row as Reg.two.
+##
+## The chip only says that something went wrong, not on which lane, so a
+## lane can only be swept while the others are working. The search therefore
+## starts at the lowest bit clock the video mode can use (modeplan), where
+## any settings work, and goes up `step` at a time (see tune()). At each
+## clock the current settings get `confirm` rounds; if they fail, every lane
+## in use is swept one setting at a time (delay, then capacitor, then
+## current) and put on the value with the fewest failed rounds, in the
+## middle of the longest run of such values so it has as much margin as
+## possible either side, and confirmed again; up to `passes` sweeps. The
+## last clock that confirmed is the board's fastest stable one.
+
+def row(settings):                                 ## Reg.two's 0x0100 row
+    fields = {}
+    for name,s in zip(lanes,settings):
+        fields.update(zip((name+'Cap',name+'Cur',name+'Del'),s))
+    return regmap.tc358778.encoder(0x0100,len(lanes))(**fields)
+def current(driver):                               ## The DPHY class settings
+    return [[getattr(driver.DPHY,name+k) for k in ('Cap','Cur','Del')]
+            for name in lanes[:driver.mipiLanes+1]]
+def masks(driver):                                 ## {status reg: enabled}
+    ena = regmap.confw(driver.Reg.five)            ## DSI_CONFW set/clear
+    return dict((r,ena[r+4][1]) for r in status
+                if r+4 in ena and ena[r+4][1])
+
+def errors(bus,enabled):                           ## Any enabled bit; clears
+    plan = writeplan.Plan(a)
+    for reg in sorted(enabled):
+        plan.read(reg,4)
+    got  = dict(zip(sorted(enabled),plan.submit(bus)))
+    bad  = False
+    for reg,data in got.items():
+        if writeplan.value(data) & 0xFFFF:
+            plan.write(reg,data)
+            bad = bad or bool(writeplan.value(data) & enabled[reg])
+    plan.submit(bus)
+    return bad
+def score(bus,driver,settings,n=rounds):           ## Rounds with errors
+    writeplan.Plan(a).rows(0x01,[row(settings)]).submit(bus)
+    enabled = masks(driver)
+    fifo    = [pattern[i^1] for i in range(len(pattern))]
+    errors(bus,enabled)
+    fails   = 0
+    for i in range(n):
+        with driver.DCS.batch():
+            for k in range(packets):
+                driver.DCS.LONG(fifo)
+        fails += errors(bus,enabled)
+    return fails
+def centre(results,n=rounds):                      ## Middle of the longest
+    low = min(results.values())                    ## run of fewest errors
+    if low >= n:
+        return None                                ## Nothing got through
+    best,run = [],[]
+    for v in sorted(results):
+        run = run + [v] if results[v] == low else []
+        if len(run) > len(best):
+            best = run
+    return best[(len(best)-1)//2]
+def sweep(bus,driver,settings):                    ## Lanes recentred
+    ## A lane whose every value fails is left alone: another lane is what
+    ## is failing, and the next pass gets back to it.
+    done = 0
+    for lane in range(len(settings)):
+        for k in (2,0,1):                          ## Delay, cap, current
+            results = {}
+            for v in ranges[k]:
+                trial = [list(s) for s in settings]
+                trial[lane][k] = v
+                results[v] = score(bus,driver,trial)
+            v = centre(results)
+            if v is None:
+                break
+            settings[lane][k] = v
+        else:
+            done += 1
+    return done
+
+def lowest(driver):                                ## First Hertz to try
+    m = modeplan.check(driver)
+    return (-(-int(m['need']*(1 + modeplan.margin))//2) if m else
+            driver.Hertz)                          ## A PLL gives 2 bits/clock
+def tune(bus=None,log=None):                       ## {Hertz,pll,settings}
+    ## A clock that cannot be made to pass halves the step and tries again
+    ## from the last one that did, down to `fine`: a step can take two
+    ## lanes past their limit at once, and neither can be swept while the
+    ## other fails. Leaves the display at the result, or as it was if
+    ## nothing passed.
+    bus      = bus or i2cbus.SMBus(3)
+    base     = reconfig.display.current or reconfig.state()
+    settings = current(base.driver)
+    found    = None
+    hertz,stride = lowest(base.driver),step
+    while modeplan.bits(hertz) <= modeplan.laneMax:
+        want = reconfig.state(Hertz=hertz)
+        reconfig.display.apply(want,bus)
+        fails = score(bus,want.driver,settings,confirm)
+        for i in range(passes):
+            if not fails or not sweep(bus,want.driver,settings):
+                break
+            fails = score(bus,want.driver,settings,confirm)
+        if not fails:
+            found = {'Hertz':hertz,'pll':want.driver.PLL.pllClock,
+                     'settings':[list(s) for s in settings]}
+            if log:
+                log(found)
+        elif found is None or stride <= fine:
+            break
+        else:
+            stride //= 2
+            hertz     = found['Hertz']
+        hertz += stride
+    reconfig.display.apply(reconfig.state(Hertz=found['Hertz']) if found
+                           else base,bus)
+    writeplan.Plan(a).rows(0x01,[row(found['settings'] if found else
+                                     current(base.driver))]).submit(bus)
+    return found
+
+def save(found,path=profile):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    with open(path + '.tmp','w') as f:
+        json.dump(dict(found,time=time.time()),f)
+    os.replace(path + '.tmp',path)
+def load(path=profile):                            ## Saved result, or None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return None
+def source(found):                                 ## DPHY class lines
+    out = []
+    for name,(cap,cur,delay) in zip(lanes,found['settings']):
+        out.extend(['    %-9s= 0x%X' % (name+k,v) for k,v in
+                    (('Cap',cap),('Cur',cur),('Del',delay))])
+    out.append('Hertz        = %d' % found['Hertz'])
+    return '\n'.join(out)
+
+def main():
+    ## dphytune.py    sweep this board, save the profile, print DPHY values
+    found = tune(log=lambda f: print('%.3f MHz stable' % (f['pll']/1e6)))
+    if found is None:
+        print('no bit clock passed')
+        return
+    save(found)
+    print(source(found))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero display governor
+# Purpose:     Step the TC358778XBG and the A026EAN01.0 panel down to a lower
+#              refresh rate, PLL and byte clock, and then panel idle mode, as
+#              input goes quiet, and back to full rate on the next activity.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import sys, time, copy, logging, i2cbus, bringup, reconfig, modeplan
+FULL,REDUCED,IDLE = 0,1,2                          ## Power levels
+levels       = [('full',None,False),               ## (name, refresh rate or
+                ('reduced',40,False),              ##  None for the stock
+                ('idle',40,True)]                  ##  mode, panel idle mode)
+after        = [0.0,5.0,30.0]                      ## Quiet seconds to enter
+log          = logging.getLogger('doublezero.governor')
+
+## A level is a reconfig State. Full is the stock videodriver mode; a lower
+## refresh rate is modeplan's mode for it at the same lanes and colour
+## depth, so the pixel clock drops with the rate and the PLL (and with it
+## the byte clock and the DSI timing) drops to the lowest that still
+## carries the link with modeplan.margin to spare. The idle level is the
+## same State with the panel's idle mode (8 colour, DCS 0x39) on.
+##
+## The pixel clock comes from the Pi's DPI output, not from the bridge, so a
+## level with another pixel clock needs `source`, a function the governor
+## calls with the new pixel clock right after the bridge has been switched.
+## Without it (it is read by prepare()) such a level keeps the stock mode,
+## so only the panel idle mode saves anything; prepare() logs a warning for
+## each level that falls back, and report() lists them. Every transition
+## between two levels is recorded once, as bringup ops of
+## reconfig.sequence(), when the governor is prepared, so a switch does no
+## planning: reduced -> idle is one DCS packet, full <-> reduced is the PLL
+## change (a frame, 5 ms for lock) and the registers that differ. Going back
+## to full on activity is the switch that is felt, so it is sent at URGENT
+## priority like a resume.
+##
+## Activity is anything a client reports with activity() (or post() from
+## another thread); follow() turns an async iterator, such as
+## buttons.events(), into activity. The governor sleeps until the next
+## `after` threshold or the next activity, nothing else. Each switch is
+## timed; report() gives the switch latencies, and residency the seconds
+## spent at each level.
+
+class Governor:
+    def __init__(self,levels=levels,after=after):
+        self.levels  = levels
+        self.after   = after
+        self.states  = None                        ## State per level
+        self.ops     = {}                          ## (from,to): bringup ops
+        self.level   = FULL
+        self.last    = time.monotonic()            ## Of the last activity
+        self.since   = self.last                   ## Of the last switch
+        self.residency = [0.0]*len(levels)         ## Seconds at each level
+        self.times   = []                          ## (from,to,seconds)
+        self.loop    = None
+        self.changed = None                        ## asyncio.Event
+        self.source  = None                        ## (pixelClock) RGB retime
+        self.stocked = []                          ## Levels kept at stock
+    def config(self,rate):                         ## reconfig.state() config
+        if rate is None:
+            return {}
+        d = reconfig.state().driver
+        m = modeplan.mode(rate,d.colorDepth,d.mipiLanes)
+        if m is None:
+            raise ValueError('no %d Hz mode on %d lanes' % (rate,d.mipiLanes))
+        return modeplan.params(m)
+    def prepare(self):                             ## States, then every switch
+        if self.states is not None:
+            return
+        states = []
+        stock  = reconfig.state().driver.pixelClock
+        for name,rate,idle in self.levels:
+            s = reconfig.state(**self.config(rate))
+            if not modeplan.check(s.driver):
+                raise ValueError('%s: the link is too slow' % name)
+            if self.source is None and s.driver.pixelClock != stock:
+                log.warning('%s: no source to retime the RGB to %d Hz, '
+                            'keeping the stock mode',name,s.driver.pixelClock)
+                self.stocked.append(name)
+                s = reconfig.state()               ## Cannot retime the RGB
+            if idle:
+                s = copy.copy(s)
+                s.flags = (s.flags[0],True,s.flags[2])
+            states.append(s)
+        self.ops = dict(((i,j),bringup.record(lambda: reconfig.sequence(
+                    states[i],states[j]),states[j].driver))
+                        for i in range(len(states))
+                        for j in range(len(states)) if i != j)
+        self.states = states
+        if reconfig.display.current is None:       ## Stock bring-up was run
+            reconfig.display.current = states[FULL]
+
+    def target(self,now=None):                     ## Level for the quiet time
+        quiet = (time.monotonic() if now is None else now) - self.last
+        return max(i for i,t in enumerate(self.after) if quiet >= t)
+    def switch(self,level,bus=None):               ## Seconds it took
+        self.prepare()
+        if level == self.level:
+            return 0.0
+        bus   = bus or i2cbus.SMBus(3)
+        lvl   = i2cbus.URGENT if level == FULL else i2cbus.NORMAL
+        start = time.perf_counter()
+        with i2cbus.priority(lvl):
+            bringup.run(self.ops[self.level,level],bus)
+        clock = self.states[level].driver.pixelClock
+        if clock != self.states[self.level].driver.pixelClock:
+            self.source(clock)
+        took  = time.perf_counter() - start
+        now   = time.monotonic()
+        self.residency[self.level] += now - self.since
+        self.times.append((self.level,level,took))
+        self.level,self.since = level,now
+        reconfig.display.current = self.states[level]
+        return took
+    def tick(self,bus=None):                       ## Seconds to the next check
+        ## Switch to the level the quiet time calls for; None when there is
+        ## no further level to wait for.
+        now = time.monotonic()
+        self.switch(self.target(now),bus)
+        ahead = [self.last + t - now for t in self.after[self.level+1:]]
+        return max(0,min(ahead)) if ahead else None
+
+    def activity(self):                            ## Something happened
+        self.last = time.monotonic()
+        if self.changed and self.level != FULL:
+            self.changed.set()
+    def post(self):                                ## activity() from a thread
+        self.loop.call_soon_threadsafe(self.activity)
+    async def follow(self,events):                 ## Each item is activity
+        async for event in events:
+            self.activity()
+    async def run(self,bus=None):
+        import asyncio
+        self.loop    = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+        await self.loop.run_in_executor(None,self.prepare)
+        while True:
+            ## Activity while tick() runs in the executor is not lost: the
+            ## event is cleared before, not after, and a tick() that saw an
+            ## older self.last is done again at once.
+            self.changed.clear()
+            last = self.last
+            wait = await self.loop.run_in_executor(None,self.tick,bus)
+            if self.last != last:
+                continue
+            try:
+                await asyncio.wait_for(self.changed.wait(),wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def report(self):                              ## Switch latency table
+        names = [l[0] for l in self.levels]
+        out   = ['%-18s %6s %9s %9s %9s' % ('switch','count','mean ms',
+                                            'max ms','waits ms')]
+        for (i,j),ops in sorted(self.ops.items()):
+            took = [t for f,to,t in self.times if (f,to) == (i,j)]
+            xfers,size,delay = reconfig.summary(ops)
+            out.append('%-18s %6d %9s %9s %9.3f' %
+                       (names[i] + ' > ' + names[j],len(took),
+                        '%.3f' % (1000*sum(took)/len(took)) if took else '-',
+                        '%.3f' % (1000*max(took)) if took else '-',
+                        1000*delay))
+        if self.stocked:
+            out.append('stock mode (no source): ' + ', '.join(self.stocked))
+        return '\n'.join(out)
+governor = Governor()
+
+def main():
+    ## governor.py   go through every level and back on the display, timing
+    ##               each switch, and print the latency table
+    logging.basicConfig(format='%(name)s: %(message)s')
+    for level in list(range(1,len(governor.levels))) + [FULL,IDLE,FULL]:
+        governor.switch(level)
+    print(governor.report())
+if __name__ == '__main__':
+    main()
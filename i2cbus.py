@@ -0,0 +1,198 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero i2c bus backends
+# Purpose:     Open the i2c bus shared by the Double Zero chips, either as the
+#              real Linux i2c device or as an in-process simulation (simbus).
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, time, heapq, itertools, threading, contextlib
+backend      = os.environ.get('DOUBLEZERO_BUS','smbus') ## 'smbus' or 'sim'
+opened       = {}                                  ## Bus number -> Arbiter
+URGENT,NORMAL,BULK = 0,1,2                         ## Priorities, first served 0
+local        = threading.local()                   ## .level: thread's priority
+
+def SMBus(bus):                                    ## Drop-in for smbus2.SMBus
+    ## Every driver module asks for its bus here instead of constructing
+    ## smbus2.SMBus itself, so all chips on bus 3 share one handle and the
+    ## whole board can be swapped for the simulator by setting the
+    ## DOUBLEZERO_BUS environment variable (or i2cbus.backend) to 'sim'. The
+    ## handle is wrapped in an Arbiter, so clients on other threads never
+    ## get in between the messages of each other's transactions. Nothing is
+    ## opened until the first call on the bus, so importing a driver module
+    ## touches no hardware.
+    if bus not in opened:
+        opened[bus] = Arbiter(lambda: handle(bus))
+    return opened[bus]
+def handle(bus):                                   ## Open the backend's handle
+    if backend == 'sim':
+        import simbus
+        return simbus.board(bus)
+    import smbus2
+    return smbus2.SMBus(bus)
+
+def close():                                       ## Close every open handle
+    for bus in list(opened):
+        opened.pop(bus).close()
+
+def write(addr,buf):                               ## i2c_msg.write for backend
+    if backend == 'sim':
+        import simbus
+        return simbus.Msg.write(addr,buf)
+    import smbus2
+    return smbus2.i2c_msg.write(addr,bytes(buf))
+def read(addr,length):                             ## i2c_msg.read for backend
+    if backend == 'sim':
+        import simbus
+        return simbus.Msg.read(addr,length)
+    import smbus2
+    return smbus2.i2c_msg.read(addr,length)
+
+def level():                                       ## This thread's priority
+    return getattr(local,'level',NORMAL)
+@contextlib.contextmanager
+def priority(lvl):                                 ## Run the block at lvl
+    old,local.level = level(),lvl
+    try:
+        yield
+    finally:
+        local.level = old
+def hold(bus,lvl=None):                            ## bus.transaction(), if any
+    if isinstance(bus,Arbiter):                    ## (bringup's recorder isn't)
+        return bus.transaction(lvl)
+    return contextlib.nullcontext(bus)
+
+class Arbiter:                                     ## One owner of a bus at once
+    ## Every smbus2 call made through the arbiter is one atomic transaction.
+    ## A client that needs several in a row without anyone else in between
+    ## (a DCS packet and its status poll, a multi-batch Plan) holds the bus
+    ## with transaction(); holds nest within a thread. When the bus is free
+    ## it goes to the waiting client with the lowest priority number, in
+    ## arrival order within a priority, so an URGENT display command waits
+    ## for at most the one transaction already on the wire, never for the
+    ## rest of a BULK upload. A client's priority is its thread's level(),
+    ## set with i2cbus.priority(). asyncio tasks use run(), which holds the
+    ## bus from a worker thread so the event loop is not blocked waiting.
+    ##
+    ## A call that fails (NACK, arbitration loss, short transfer: all OSError
+    ## from the driver) is retried `retries` times, backing off 1, 2, 4 ms
+    ## ... up to `backoff[1]`, before the error is passed on. Every register
+    ## write the drivers make can safely be sent twice. Bytes moved and time
+    ## spent in the driver give the bus's effective rate().
+    retries  = 3
+    backoff  = (0.001,0.016)                       ## First, longest; seconds
+    def __init__(self,opener):
+        self.opener  = opener                      ## () -> handle, on first use
+        self.dev     = None                        ## Handle, once opened
+        self.cond    = threading.Condition()
+        self.owner   = None                        ## Thread holding the bus
+        self.depth   = 0                           ## Its nested holds
+        self.queue   = []                          ## Heap: [lvl,seq,thread]
+        self.seq     = itertools.count()
+        self.peak    = 0                           ## Deepest queue seen
+        self.waits   = {}                          ## lvl: [holds,total s,max s]
+        self.moved   = 0                           ## Bytes, both directions
+        self.busy    = 0.0                         ## Seconds inside handle
+        self.retried = 0                           ## Calls that were retried
+        self.failed  = 0                           ## ... and failed every time
+    @property
+    def handle(self):                              ## smbus2 (or simbus) handle
+        if self.dev is None:
+            with self.cond:
+                if self.dev is None:
+                    self.dev = self.opener()
+        return self.dev
+    def acquire(self,lvl=None):
+        me = threading.get_ident()
+        with self.cond:
+            if self.owner == me:
+                self.depth += 1
+                return
+            lvl   = level() if lvl is None else lvl
+            start = time.monotonic()
+            if self.owner is not None or self.queue:
+                ticket = [lvl,next(self.seq),me]
+                heapq.heappush(self.queue,ticket)
+                self.peak = max(self.peak,len(self.queue))
+                while self.owner is not None or self.queue[0] is not ticket:
+                    self.cond.wait()
+                heapq.heappop(self.queue)
+            self.owner,self.depth = me,1
+            waited = time.monotonic() - start
+            w = self.waits.setdefault(lvl,[0,0.0,0.0])
+            w[0],w[1],w[2] = w[0]+1,w[1]+waited,max(w[2],waited)
+    def release(self):
+        with self.cond:
+            self.depth -= 1
+            if not self.depth:
+                self.owner = None
+                self.cond.notify_all()
+    @contextlib.contextmanager
+    def transaction(self,lvl=None):                ## Hold the bus for a block
+        self.acquire(lvl)
+        try:
+            yield self
+        finally:
+            self.release()
+    async def run(self,fn,*args,lvl=None):         ## fn(*args) holding the bus
+        import asyncio
+        lvl = level() if lvl is None else lvl
+        def held():
+            with self.transaction(lvl):
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None,held)
+    def call(self,size,fn,*args):                  ## fn(*args), with retries
+        with self.transaction():
+            for attempt in range(self.retries + 1):
+                start = time.perf_counter()
+                try:
+                    out = fn(*args)
+                    self.busy  += time.perf_counter() - start
+                    self.moved += size
+                    return out
+                except OSError:
+                    self.busy  += time.perf_counter() - start
+                    if attempt == self.retries:
+                        self.failed += 1
+                        raise
+                    self.retried += not attempt
+                    time.sleep(min(self.backoff[0]*2**attempt,self.backoff[1]))
+    def rate(self):                                ## Effective bytes/second
+        return self.moved/self.busy if self.busy else 0.0
+    def depthNow(self):                            ## Clients waiting right now
+        with self.cond:
+            return len(self.queue)
+    def report(self):                              ## Wait times per priority
+        out = ['queue %d waiting, %d deepest' % (self.depthNow(),self.peak)]
+        for lvl in sorted(self.waits):
+            n,total,most = self.waits[lvl]
+            out.append('level %d %6d holds %9.3f ms mean %9.3f ms max' %
+                       (lvl,n,1000*total/n,1000*most))
+        out.append('%d B in %.3f s, %.0f B/s, %d retried, %d failed' %
+                   (self.moved,self.busy,self.rate(),self.retried,self.failed))
+        return '\n'.join(out)
+
+    def write_byte(self,addr,value):
+        return self.call(1,self.handle.write_byte,addr,value)
+    def read_byte(self,addr):
+        return self.call(1,self.handle.read_byte,addr)
+    def write_byte_data(self,addr,reg,value):
+        return self.call(2,self.handle.write_byte_data,addr,reg,value)
+    def read_byte_data(self,addr,reg):
+        return self.call(2,self.handle.read_byte_data,addr,reg)
+    def write_i2c_block_data(self,addr,reg,data):
+        return self.call(1+len(data),self.handle.write_i2c_block_data,
+                         addr,reg,data)
+    def read_i2c_block_data(self,addr,reg,length):
+        return self.call(1+length,self.handle.read_i2c_block_data,
+                         addr,reg,length)
+    def i2c_rdwr(self,*msgs):
+        return self.call(sum(m.len for m in msgs),self.handle.i2c_rdwr,*msgs)
+    def close(self):
+        if self.dev is not None:
+            self.dev.close()
+    def __getattr__(self,name):                    ## Anything else: the handle
+        return getattr(self.handle,name)
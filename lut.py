@@ -0,0 +1,109 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero colour lookup tables
+# Purpose:     Generate the A026EAN01.0 colour lookup table from a gamma and
+#              colour temperature model, and load it with only the rows that
+#              changed since the last table.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import math, functools
+entries      = 64                                  ## Per channel, 6-bit input
+rowBytes     = 8                                   ## LUT bytes per DCS packet
+neutral      = 6500                                ## Kelvin with all gains 1
+profiles     = {                                   ## Name: table() arguments
+               'day'   : {},
+               'night' : {'kelvin':3400},
+               'dim'   : {'kelvin':2700,'level':0.6},
+               }
+
+## The table is 64 entries of red, then green, then blue. Entry i is looked
+## up with the panel's own 6 to 8 bit expansion of i, x = (i<<2 | i>>4)/255,
+## so the default (gamma 1, 6500 K, level 1) gives back exactly the
+## identity table the driver used to type in by hand. Each channel is
+##     out = round(255 * x**gamma * gain * level)
+## where gain is the colour of a black body at `kelvin` (Tanner Helland's
+## fit) relative to 6500 K, scaled so the strongest channel is 1. gamma may
+## be one value or (r,g,b).
+
+def whitepoint(kelvin):                            ## (r,g,b) gains, max 1
+    def rgb(k):
+        t = k/100
+        r = 255 if t <= 66 else 329.698727446*(t-60)**-0.1332047592
+        g = (99.4708025861*math.log(t) - 161.1195681661 if t <= 66 else
+             288.1221695283*(t-60)**-0.0755148492)
+        b = (255 if t >= 66 else 0 if t <= 19 else
+             138.5177312231*math.log(t-10) - 305.0447927307)
+        return [min(255,max(0,c)) for c in (r,g,b)]
+    gains = [c/n for c,n in zip(rgb(kelvin),rgb(neutral))]
+    return tuple(g/max(gains) for g in gains)
+@functools.lru_cache(maxsize=16)
+def table(gamma=1.0,kelvin=neutral,level=1.0):     ## 192 values, R G B
+    gammas = gamma if isinstance(gamma,tuple) else (gamma,)*3
+    ## 192 values is nothing for plain Python (~0.1 ms), and videodriver
+    ## builds the default table at import, so no numpy here: importing it
+    ## would cost more than a second on the Pi Zero.
+    gains  = [k*level for k in whitepoint(kelvin)]
+    return tuple(min(255,round(255*((i<<2 | i>>4)/255)**g*k))
+                 for g,k in zip(gammas,gains) for i in range(entries))
+def rows(values):                                  ## Reg.nine style DCS rows
+    ## Eight values per packet; the FIFO takes 16-bit words whose low byte
+    ## goes out first, so each pair is swapped.
+    out = []
+    for r in range(0,len(values),rowBytes):
+        row = values[r:r+rowBytes]
+        out.append([row[j^1] for j in range(len(row))])
+    return out
+
+class Loader:                                      ## LUT rows on the panel
+    ## The panel's LUT write has no start position: every upload fills the
+    ## table from the first entry on, in the order sent. So a changed table
+    ## is always sent whole, through Step.LookupTable; only loading the
+    ## table that is already there sends nothing.
+    def __init__(self):
+        self.loaded = None                         ## Rows last sent, or None
+    def load(self,values):                         ## Rows sent
+        import videodriver
+        new  = rows(values)
+        if new == self.loaded:
+            return 0
+        videodriver.step.LookupTable(new)
+        self.loaded = new
+        return len(new)
+loader = Loader()
+def profile(name):                                 ## Switch to a named profile
+    return loader.load(table(**profiles[name]))
+
+def check():                                       ## Loads on simbus's board
+    ## Every profile in turn, then the first again, through one Loader: the
+    ## panel model's table must be what rows(values) puts on the link each
+    ## time, and a repeat must send nothing.
+    import i2cbus, simbus, videodriver
+    i2cbus.backend = 'sim'
+    bus     = i2cbus.SMBus(3)
+    bus.dev = simbus.board(3,simbus.Latency(realtime=False))
+    videodriver.DCS.forget()
+    videodriver.bringUp()
+    panel   = bus.handle.devices[videodriver.a].panel
+    load    = Loader()
+    for name in list(profiles) + [list(profiles)[0]]:
+        values = table(**profiles[name])
+        load.load(values)
+        sent   = bytes(r[j^1] for r in rows(values) for j in range(len(r)))
+        if bytes(panel.lut) != sent or load.load(values):
+            raise AssertionError('LUT on the panel is not %s' % name)
+    return True
+
+def main():
+    ## lut.py           check Loader against the simulated panel
+    ## lut.py PROFILE   load a named profile onto the display
+    import sys
+    if sys.argv[1:]:
+        print(profile(sys.argv[1]),'rows sent')
+    else:
+        print('ok' if check() else 'failed')
+if __name__ == '__main__':
+    main()
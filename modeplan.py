@@ -0,0 +1,141 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero video mode planner
+# Purpose:     Check the MIPI DSI link budget of a video mode, list the modes
+#              the A026EAN01.0 and TC358778XBG can run, and pick the lowest
+#              power one for a refresh rate, as videodriver parameters.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import sys, pllsolve
+panel        = {                                   ## A026EAN01.0 constraints
+               'hActive':800,'vActive':1280,       ## Native resolution only
+               'hFrontPorch':4,'hSyncWidth':68,'hBackPorch':72, ## Porches, px
+               'vFrontPorch':6,'vSyncWidth':1,'vBackPorch':2,   ## and lines
+               'depths':(24,18,16),                ## RGB888, RGB666, RGB565
+               'lanes':(1,2,3,4),                  ## Data lanes it accepts
+               'rates':(30,40,45,48,50,55,60),     ## Refresh rates, Hz
+               }
+laneMax      = 1000000000                          ## TC358778XBG, bit/s/lane
+pixelMax     = 154000000                           ## Parallel input, Hz
+overhead     = 6*4 + 2*2                           ## Link bytes/line, see below
+margin       = 0.05                                ## Headroom over the minimum
+
+## In non-burst video with sync events the bridge sends, per line, the
+## sync start, the horizontal sync, back porch and front porch blanking and
+## the active pixel packet: one 4 byte header each, a 2 byte checksum on the
+## long ones, and the end of transmission packet, all spread over the data
+## lanes. The porches are sent as their RGB byte counts (VOUT.ByteMulti is
+## colorDepth/8), so a line is
+##     htotal*colorDepth/8 + overhead  bytes
+## and must go out in the same time the RGB input takes to deliver it. The
+## lane bit rate is then
+##     need = 8*(htotal*colorDepth/8 + overhead)*vtotal*rate/lanes
+## The lanes are DDR, two bits per PLL clock, so as in videodriver's PLL
+## class (byteClkFrq = pllClock/4, bitClockFrq = pllClock*2) the lane bit
+## rate is bits(pll); it must reach need*(1 + margin), from a PLL pllsolve
+## can make off the pixel clock (pllsolve.above), and stay under laneMax.
+## VOUT's commented-out ByteMulti, PLL.byteClkFrq*mipiLanes/pixelClock, is
+## this link capacity over the pixel rate: report() prints it as headroom.
+
+def totals(p=panel):                               ## htotal px, vtotal lines
+    return (p['hActive'] + p['hFrontPorch'] + p['hSyncWidth'] +
+            p['hBackPorch'],
+            p['vActive'] + p['vFrontPorch'] + p['vSyncWidth'] + p['vBackPorch'])
+def bits(pll):                                     ## Lane bit/s at PLL output
+    return int((pll + 1)*2)                        ## videodriver PLL.pllClock+1
+def need(rate,depth,lanes,p=panel):                ## Lane bit/s a mode needs
+    htotal,vtotal = totals(p)
+    return -(-8*(htotal*depth//8 + overhead)*vtotal*rate//lanes)
+def mode(rate,depth,lanes,p=panel):                ## Mode dict, or None
+    htotal,vtotal = totals(p)
+    pixelClock = htotal*vtotal*rate
+    needed     = need(rate,depth,lanes,p)
+    if pixelClock > pixelMax or needed > laneMax:
+        return None
+    found = pllsolve.above(pixelClock,-(-int(needed*(1 + margin))//2))
+    if found is None:
+        return None
+    pll = pllsolve.pll(pixelClock,*found)
+    if bits(pll) > laneMax:
+        return None
+    return {'rate':rate,'depth':depth,'lanes':lanes,'pixelClock':pixelClock,
+            'need':needed,'pll':pll,'bits':bits(pll),'pllSettings':found,
+            'headroom':bits(pll)*lanes/(pixelClock*depth)}
+def modes(rates=None,depths=None,lanes=None,p=panel): ## Every feasible mode
+    out = []
+    for r in rates or p['rates']:
+        for d in depths or p['depths']:
+            for n in lanes or p['lanes']:
+                m = mode(r,d,n,p)
+                if m:
+                    out.append(m)
+    return out
+def choose(rate,depth=24,p=panel):                 ## Lowest power mode
+    ## Fewest lanes first (each lane is a PHY driver and receiver), then the
+    ## lowest PLL; None if the rate cannot be sustained at this depth.
+    found = modes([rate],[depth],None,p)
+    return min(found,key=lambda m: (m['lanes'],m['pll'])) if found else None
+
+def params(m,p=panel):                             ## videodriver parameters
+    ## For reconfig.variant(**params(m)) or reconfig.state(...), which work
+    ## the PLL, PPI and VOUT classes out again from them. Hertz is a PLL
+    ## output pllsolve can make exactly, so lookup() settles on it.
+    out = dict((k,v) for k,v in p.items() if k[0] in 'hv')
+    out.update(pixelClock=m['pixelClock'],Hertz=m['pll'],
+               mipiLanes=m['lanes'],colorDepth=m['depth'],frameRate=m['rate'])
+    return out
+def check(driver):                                 ## Mode dict of a videodriver
+    ## The link budget of the parameters a driver module was run with; None
+    ## if its PLL does not give the link the bit rate the mode needs. The
+    ## bit rate is worked out as mode() does, and must be the driver's own
+    ## PLL.bitClockFrq. A driver over laneMax is reported, not refused: it
+    ## is what the board runs (dphytune.py finds how far it really goes).
+    p      = dict(panel,**dict((k,getattr(driver,k)) for k in panel
+                               if k[0] in 'hv'))
+    needed = need(driver.frameRate,driver.colorDepth,driver.mipiLanes,p)
+    found  = (driver.PLL.PRD,driver.PLL.FBD,driver.PLL.divisorExp)
+    pll    = pllsolve.pll(driver.pixelClock,*found)
+    if bits(pll) != driver.PLL.bitClockFrq:
+        raise AssertionError('modeplan bit rate %d is not bitClockFrq %d' %
+                             (bits(pll),driver.PLL.bitClockFrq))
+    if needed > bits(pll) or driver.pixelClock > pixelMax:
+        return None
+    return {'rate':driver.frameRate,'depth':driver.colorDepth,
+            'lanes':driver.mipiLanes,'pixelClock':driver.pixelClock,
+            'need':needed,'pll':pll,'bits':bits(pll),'pllSettings':found,
+            'headroom':bits(pll)*driver.mipiLanes/(driver.pixelClock*
+                                                  driver.colorDepth)}
+
+def report(ms):                                    ## Text table of modes
+    out = ['rate depth lanes  pixel MHz  need Mb/s   PLL MHz  lane Mb/s'
+           '  headroom']
+    for m in ms:
+        out.append('%4d %5d %5d %10.3f %10.1f %9.3f %10.1f %9.2f%s' %
+                   (m['rate'],m['depth'],m['lanes'],m['pixelClock']/1e6,
+                    m['need']/1e6,m['pll']/1e6,m['bits']/1e6,m['headroom'],
+                    ' over' if m['bits'] > laneMax else ''))
+    return '\n'.join(out)
+def main():
+    ## modeplan.py            every feasible mode, and videodriver's own
+    ## modeplan.py RATE [BPP] lowest power mode for RATE Hz at BPP bits
+    args = [int(a) for a in sys.argv[1:]]
+    if not args:
+        import videodriver
+        print(report(modes()))
+        m = check(videodriver)
+        print('videodriver:',report([m]).split('\n')[1] if m else
+              'link too slow for its mode')
+        return
+    m = choose(*args[:2])
+    if m is None:
+        print('no mode sustains %d Hz' % args[0])
+        return
+    print(report([m]))
+    for k,v in params(m).items():
+        print('%-12s = %d' % (k,v))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+## Generated by pllsolve.py; (pixelClock, target): (PRD, FBD, FRS)
+modes = {
+    (36504480,404340000): (1,176,1),  ## 30 Hz
+    (48672640,539120000): (2,132,0),  ## 40 Hz
+    (54756720,606510000): (2,132,0),  ## 45 Hz
+    (58407168,646944000): (2,132,0),  ## 48 Hz
+    (60840800,673900000): (2,132,0),  ## 50 Hz
+    (66924880,741290000): (2,132,0),  ## 55 Hz
+    (73008960,808680000): (2,132,0),  ## 60 Hz
+    }
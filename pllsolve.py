@@ -0,0 +1,141 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero PLL solver
+# Purpose:     Exact search of the TC358778XBG PLL divider space, a NumPy
+#              version for whole tables of modes, and the lookup used by
+#              videodriver.PLL.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import math
+## The PLL runs from the RGB pixel clock / 4:
+##     pll = (pixelClock/4) * (FBD+1) / ((PRD+1) * 2**FRS)
+## with FBD 9 bits, PRD 4 bits and FRS 2 bits. FRS picks the output band the
+## PLL is allowed to run in, and the divided input (pixelClock/4)/(PRD+1)
+## must stay between 4 and 40 MHz. Everything below is done on integers
+## (scaled by 4*(PRD+1)*2**FRS), so equal errors compare equal.
+fbdMax       = 511
+prdMax       = 15
+bands        = [(500000000,1000000000),(250000000,500000000),
+                (125000000,250000000),(62500000,125000000)] ## FRS 0-3, Hz
+inMin,inMax  = 4000000,40000000                    ## PLL input after PRD, Hz
+
+def pll(pixelClock,prd,fbd,frs):                   ## PLL output, Hz (floor)
+    return pixelClock*(fbd+1)//(4*(prd+1)<<frs)
+def valid(pixelClock,prd,fbd,frs):
+    den = 4*(prd+1)<<frs
+    lo,hi = bands[frs]
+    return (lo*den <= pixelClock*(fbd+1) < hi*den and
+            inMin*4*(prd+1) <= pixelClock <= inMax*4*(prd+1))
+def solve(pixelClock,target,count=1):              ## Best [(prd,fbd,frs)]
+    ## For every PRD/FRS pair only the two FBD values either side of the
+    ## exact ratio can be closest, so 128 candidates cover the whole space.
+    ## Ties go to the lower PRD (faster phase comparator, less jitter), then
+    ## the lower FRS. Returns the best `count` settings, best first; empty if
+    ## the target cannot be reached at all.
+    from fractions import Fraction                 ## Not needed by lookup()
+    found = []
+    for prd in range(prdMax+1):
+        for frs in range(len(bands)):
+            den = 4*(prd+1)<<frs
+            f   = target*den//pixelClock - 1
+            for fbd in (f,f+1):
+                if 0 <= fbd <= fbdMax and valid(pixelClock,prd,fbd,frs):
+                    err = Fraction(abs(pixelClock*(fbd+1) - target*den),den)
+                    found.append((err,prd,frs,fbd))
+    found.sort()
+    return [(prd,fbd,frs) for err,prd,frs,fbd in found[:count]]
+
+def above(pixelClock,floor):                       ## Lowest PLL >= floor
+    ## For links that need at least some bit rate rather than an exact one:
+    ## the smallest FBD reaching floor for each PRD/FRS pair, then the lowest
+    ## resulting PLL, ties to the lower PRD and FRS as in solve(). None if
+    ## nothing reaches floor.
+    found = []
+    for prd in range(prdMax+1):
+        for frs in range(len(bands)):
+            den = 4*(prd+1)<<frs
+            fbd = max(0,-(-floor*den//pixelClock) - 1)
+            if fbd <= fbdMax and valid(pixelClock,prd,fbd,frs):
+                found.append((pll(pixelClock,prd,fbd,frs),prd,frs,fbd))
+    if not found:
+        return None
+    out,prd,frs,fbd = min(found)
+    return prd,fbd,frs
+
+def table(pixelClocks,targets):                    ## NumPy: many modes at once
+    ## pixelClocks and targets broadcast against each other; returns arrays
+    ## prd, fbd, frs of the same shape (-1 where nothing is reachable). The
+    ## errors of all 128 candidates are put over the common denominator
+    ## lcm(4*(PRD+1)*2**FRS) so the comparison stays exact in int64.
+    import numpy as np
+    p   = np.asarray(pixelClocks,dtype=np.int64)[...,None,None,None]
+    t   = np.asarray(targets,dtype=np.int64)[...,None,None,None]
+    prd = np.arange(prdMax+1,dtype=np.int64)[:,None,None]
+    frs = np.arange(len(bands),dtype=np.int64)[None,:,None]
+    den = (4*(prd+1)) << frs
+    fbd = t*den//p - 1 + np.arange(2,dtype=np.int64)
+    lo  = np.array([b[0] for b in bands],dtype=np.int64)[None,:,None]
+    hi  = np.array([b[1] for b in bands],dtype=np.int64)[None,:,None]
+    num = p*(fbd+1)
+    ok  = ((fbd >= 0) & (fbd <= fbdMax) & (lo*den <= num) & (num < hi*den) &
+           (inMin*4*(prd+1) <= p) & (p <= inMax*4*(prd+1)))
+    lcm = 1
+    for d in range(1,prdMax+2):
+        lcm = lcm*d//math.gcd(lcm,d)
+    lcm = lcm*4 << (len(bands)-1)
+    err = np.abs(num - t*den) * (lcm//den)
+    err = np.where(ok,err,np.iinfo(np.int64).max)
+    flat = err.reshape(err.shape[:-3] + (-1,))
+    best = flat.argmin(axis=-1)                    ## First = lowest PRD, FRS
+    none = np.take_along_axis(flat,best[...,None],-1)[...,0] == \
+           np.iinfo(np.int64).max
+    bp,bf = np.unravel_index(best,err.shape[-3:])[:2]
+    bfbd = np.take_along_axis(fbd.reshape(fbd.shape[:-3] + (-1,)),
+                              best[...,None],-1)[...,0]
+    return (np.where(none,-1,bp),np.where(none,-1,bfbd),np.where(none,-1,bf))
+
+def lookup(pixelClock,target):                     ## O(1) for shipped modes
+    try:
+        import pllmodes
+        return pllmodes.modes[(pixelClock,target)]
+    except (ImportError,KeyError):
+        return best(pixelClock,target)
+def best(pixelClock,target):                       ## solve(), or ValueError
+    found = solve(pixelClock,target)
+    if not found:
+        raise ValueError('PLL cannot make %d Hz from a %d Hz pixel clock' %
+                         (target,pixelClock))
+    return found[0]
+
+def modeTable(pixelClock,target,rates,frameRate):  ## pllmodes.py source text
+    ## Pixel clock and PLL target both scale with the refresh rate, so each
+    ## rate is the panel's base mode run proportionally slower or faster.
+    clocks  = [pixelClock*r//frameRate for r in rates]
+    targets = [target*r//frameRate for r in rates]
+    ## A rate the PLL cannot reach is an error either way, as in best(): -1
+    ## from table() must never end up in pllmodes.py for lookup() to return.
+    try:
+        prd,fbd,frs = [x.tolist() for x in table(clocks,targets)]
+    except ImportError:
+        prd,fbd,frs = zip(*[best(c,t) for c,t in zip(clocks,targets)])
+    bad = [r for r,p in zip(rates,prd) if p < 0]
+    if bad:
+        raise ValueError('PLL cannot make the %s Hz mode%s' %
+                         (', '.join(map(str,bad)),'s' if len(bad) > 1 else ''))
+    out = ['## Generated by pllsolve.py; (pixelClock, target): (PRD, FBD, FRS)',
+           'modes = {']
+    for r,c,t,p,f,s in zip(rates,clocks,targets,prd,fbd,frs):
+        out.append('    (%d,%d): (%d,%d,%d),  ## %d Hz' % (c,t,p,f,s,r))
+    out.append('    }')
+    return '\n'.join(out) + '\n'
+if __name__ == '__main__':
+    import sys, os
+    os.environ.setdefault('DOUBLEZERO_BUS','sim')  ## Don't open bus 3
+    import videodriver
+    rates = [int(r) for r in sys.argv[1:]] or [30,40,45,48,50,55,60]
+    sys.stdout.write(modeTable(videodriver.pixelClock,videodriver.Hertz,
+                               rates,videodriver.frameRate))
@@ -0,0 +1,187 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero display power states
+# Purpose:     Suspend the TC358778XBG and the A026EAN01.0 panel, and resume
+#              them from the applied register image instead of running the
+#              whole videodriver bring-up again.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, types, struct, hashlib, i2cbus, writeplan, bringup
+import reconfig, regmap
+cache        = os.path.join(os.environ.get('XDG_CACHE_HOME',
+               os.path.expanduser('~/.cache')),'doublezero','resume.img')
+ON,ASLEEP,CUT= 'on','asleep','cut'                 ## Power states
+blank        = types.SimpleNamespace(panel={},page=0x00,
+               flags=(True,False,False))           ## Panel just out of reset
+word         = reconfig.word                       ## 16-bit value -> reg bytes
+
+## Two ways back from a suspend:
+##   warm  The bridge kept its power, so its registers are all still there.
+##         Suspend put the panel to sleep, stopped the video input at a frame
+##         end and switched the PLL off. Resume switches the PLL on, waits
+##         5 ms for lock, restarts video and sends sleep-out: two transfers,
+##         5 ms and one DCS packet. The panel was left "on", so it shows the
+##         picture as soon as it is out of sleep.
+##   cold  The Pi cut the bridge's power, so everything is back at reset and
+##         the panel was reset with it (its reset line is a bridge GPIO).
+##         Resume writes the image back in bring-up order: global registers
+##         with the PLL clock and video input off and the panel held in
+##         reset, 5 ms for lock, then clock, reset release, PHY, PPI +
+##         STARTPPI, DSI_START, the Reg.five DSI_CONFW commands, video
+##         timing; 20 ms for the panel to come out of reset; its settings
+##         from the image, sleep-out, 0.1 s, display on; video on.
+##         ScreenReg's first wake and the vendor 0x26 toggle and their waits
+##         are not needed again.
+## Both are recorded as bringup ops when the image is captured, so resume
+## does no planning at all; the cold ops are also saved to disk, so a new
+## process can resume with `power.py resume`.
+
+def registers(plan,s,lo,hi,skip=()):              ## Image regs in [lo, hi)
+    for reg in sorted(set(r - r % writeplan.width(r) for r in s.written
+                          if lo <= r < hi)):
+        if reg not in skip:
+            plan.write(reg,s.regs[reg:reg+writeplan.width(reg)])
+
+def field(s,reg,**fields):                         ## s's reg, fields replaced
+    return word(regmap.tc358778.set(reg,s.word(reg),**fields))
+
+def sleep(s):                                      ## Warm suspend of state s
+    d    = s.driver
+    d.screen.sleep()
+    d.wait.delay(0.1)                              ## Sleep-in, as sleep-out
+    plan = writeplan.Plan(d.a)
+    plan.write(0x0032,field(s,0x0032,FrmStop=1)).submit(d.b)
+    d.wait.delay(1.0/d.frameRate)                  ## FrmStop: to frame end
+    plan.write(0x0004,field(s,0x0004,PP_EN=0))
+    plan.write(0x0032,field(s,0x0032,FrmStop=1,RstPtr=1))
+    plan.write(0x0018,field(s,0x0018,CKEN=0,PLL_EN=0))
+    plan.submit(d.b)
+def wake(s):                                       ## Warm resume
+    d    = s.driver
+    plan = writeplan.Plan(d.a)
+    plan.write(0x0018,field(s,0x0018,CKEN=0)).submit(d.b)
+    d.wait.delay(0.005)                            ## PLL lock, as GlobalReg
+    plan.write(0x0018,s.regs[0x0018:0x001A])
+    plan.write(0x0032,s.regs[0x0032:0x0034])
+    plan.write(0x0004,s.regs[0x0004:0x0006])
+    plan.submit(d.b)
+    d.screen.wake()
+def boot(s):                                       ## Cold resume
+    d    = s.driver
+    plan = writeplan.Plan(d.a)
+    registers(plan,s,0x0002,0x0100,(0x0004,0x0008,0x0014,0x0018))
+    plan.write(0x0004,field(s,0x0004,PP_EN=0))     #1. Global registers,
+    plan.write(0x0008,field(s,0x0008,TxStart=0))   ## with video input off,
+    plan.write(0x0014,field(s,0x0014,GPIOOUT=0))   ## panel in reset and
+    plan.write(0x0018,field(s,0x0018,CKEN=0))      ## the PLL clock off
+    plan.submit(d.b)
+    d.wait.delay(0.005)                            ## PLL lock, as GlobalReg
+    plan.write(0x0018,s.regs[0x0018:0x001A])       #2. Clock on, panel reset
+    plan.write(0x0014,s.regs[0x0014:0x0016])       ## released, DSI layers
+    registers(plan,s,0x0100,0x0204)
+    registers(plan,s,0x0206,0x0400)
+    plan.write(0x0204,s.regs[0x0204:0x0208])       ## STARTPPI
+    registers(plan,s,0x0504,0x0600)                ## DSI_START
+    plan.rows(0x05,d.Reg.five)                     ## DSI_CONFW commands
+    registers(plan,s,0x0620,0x0700)                ## Video timing
+    mask,val = regmap.confw(d.Reg.five)[0x040C]    ## As Step.ErrorReg
+    d.wait.after(plan,0x040C,mask,val,0.1,4)
+    d.wait.delay(0.02)                             #3. Panel out of reset
+    reconfig.panel(blank,s)                        #4. Settings, sleep-out, on
+    plan.write(0x0032,s.regs[0x0032:0x0034])       #5. Video on
+    plan.write(0x0004,s.regs[0x0004:0x0006])
+    plan.write(0x0008,s.regs[0x0008:0x000A])
+    plan.submit(d.b)
+
+class Power:                                       ## Display power state
+    ## capture() takes the image to come back to: the State reconfig last
+    ## applied, or the stock configuration. suspend() and resume() record
+    ## how long each took (resume latency is what matters on wake from a
+    ## pocket). resume() reads PLLCTL0 to tell a warm resume from a cold one
+    ## if suspend() was not told the power would be cut.
+    def __init__(self):
+        self.state   = ON
+        self.image   = None                        ## State to come back to
+        self.ops     = {}                          ## Recorded sleep/wake/boot
+        self.times   = []                          ## (what, seconds)
+    def capture(self,image=None,path=cache):
+        s = image or reconfig.display.current or reconfig.state()
+        self.image = s
+        self.ops   = dict((name,bringup.record(lambda: fn(s),s.driver))
+                          for name,fn in (('sleep',sleep),('wake',wake),
+                                          ('boot',boot)))
+        if path:
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+            with open(path + '.tmp','wb') as f:
+                f.write(bringup.pack(self.ops['boot'],key(s)))
+            os.replace(path + '.tmp',path)
+        return s
+    def suspend(self,cut=False,bus=None):          ## cut: power is going away
+        if self.image is None:
+            self.capture()
+        self.timed('suspend',self.ops['sleep'],bus)
+        self.state = CUT if cut else ASLEEP
+    def resume(self,bus=None):                     ## Seconds it took
+        if self.image is None:
+            self.capture()
+        bus  = bus or i2cbus.SMBus(3)
+        cold = self.state == CUT or self.lost(bus)
+        took = self.timed('cold' if cold else 'warm',
+                          self.ops['boot' if cold else 'wake'],bus)
+        self.state = ON
+        return took
+    def lost(self,bus):                            ## Bridge was reset?
+        try:
+            have = writeplan.Plan(self.image.driver.a).read(0x0016,2).submit(
+                   bus)[0]
+        except OSError:
+            return True
+        return have != self.image.regs[0x0016:0x0018]
+    def timed(self,what,ops,bus):
+        start = time.perf_counter()
+        with i2cbus.priority(i2cbus.URGENT):
+            bringup.run(ops,bus or i2cbus.SMBus(3))
+        took = time.perf_counter() - start
+        self.times.append((what,took))
+        return took
+power = Power()
+def key(s):                                        ## Image key for resume.img
+    ## The applied image, and everything the ops were recorded with: the
+    ## bring-up image inputs (driver, PLL tables, register map, message
+    ## size limit) and this file's resume sequence.
+    h = hashlib.sha1(bringup.key())
+    with open(os.path.abspath(__file__),'rb') as f:
+        h.update(f.read())
+    h.update(s.regs)
+    h.update(repr(sorted(s.panel.items())).encode())
+    return h.digest()
+
+def main():
+    ## power.py capture   save the stock configuration's cold resume ops
+    ## power.py resume    cold resume from the saved ops (bridge power back)
+    ## A saved image whose key is not the stock configuration's (the driver,
+    ## a table or the register map changed since) is captured again first,
+    ## as bringup does with its cache; it is never replayed.
+    cmd = sys.argv[1] if sys.argv[1:] else 'capture'
+    if cmd == 'resume':
+        s = reconfig.state()
+        try:
+            with open(cache,'rb') as f:
+                k,ops = bringup.unpack(f.read())
+        except (OSError,ValueError,struct.error):
+            k = None
+        if k != key(s):
+            print('%s is missing or out of date; capturing it again' % cache)
+            power.capture(s)
+            ops = power.ops['boot']
+        start = time.perf_counter()
+        bringup.run(ops,i2cbus.SMBus(3))
+        print('resumed in %.3f ms' % (1000*(time.perf_counter() - start)))
+    else:
+        power.capture()
+if __name__ == '__main__':
+    main()
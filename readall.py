@@ -1,8 +1,8 @@
 #-------------------------------------------------------------------------------
 # Name:        VideoDriver
-# Purpose:     Set registers of TC358778XBG RBG to MIPI DSI chip and A026EAN01.0
-#              MIPI DSI screen via i2c for the Double Zero peripheral board for
-#              Raspberry Pi. Includes loop for short DCS commands after setup.
+# Purpose:     Snapshot, diff and watch the registers of the TC358778XBG RBG to
+#              MIPI DSI chip on the Double Zero peripheral board for Raspberry
+#              Pi, against the values the video driver programs.
 #
 # Author:      Jonathan Roybal
 #
@@ -12,69 +12,147 @@
 #              https://www.creativecommons.org
 #-------------------------------------------------------------------------------
 
-import smbus2
+import i2cbus
+import writeplan
+import regmap
+import struct
+import sys
 import time
-import binascii
 a    = 0x0e                                        ## Per TC358778XBG specs
-b    = smbus2.SMBus(3)                             ## i2c dev 3 (bitbanged)
+magic    = b'DZSN'                                 ## Double Zero snapshot
+regions  = [                                       ## (first reg, bytes)
+           (0x0000,0x1A),(0x0020,0x14),(0x0050,0x02), ## Global
+           (0x00E0,0x0C),(0x00F8,0x02),            ## Debug, FIFO status
+           (0x0100,0x14),(0x0140,0x14),            ## TX PHY
+           (0x0204,0x3C),                          ## TX PPI
+           (0x0300,0x04),(0x0400,0x1C),(0x0434,0x24), ## DSI control/errors
+           (0x0500,0x1C),                          ## DSI CONFW/start
+           (0x0600,0x30)                           ## DSI command, video
+           ]                                       ## 0x0430 (RDFIFO) pops
+errors   = [0x0300,0x0414,0x0434,0x0440,0x044C]    ## Default watch list
+
+def snapshot(b):                                   ## Whole map, 1 transfer
+    plan = writeplan.Plan(a)
+    for reg,length in regions:
+        plan.read(reg,length)
+    return dict(zip([r for r,n in regions],plan.submit(b)))
+def save(snap,f):                                  ## 'DZSN' time n (reg n data)
+    f.write(struct.pack('<4sdH',magic,time.time(),len(snap)))
+    for reg in sorted(snap):
+        f.write(struct.pack('<HH',reg,len(snap[reg])) + snap[reg])
+def load(f):
+    data = f.read()
+    m,t,n = struct.unpack_from('<4sdH',data)
+    if m != magic:
+        raise ValueError('not a register snapshot')
+    p,snap = 14,{}
+    for i in range(n):
+        reg,length = struct.unpack_from('<HH',data,p)
+        snap[reg] = data[p+4:p+4+length]
+        p += 4 + length
+    return snap
+
+def expected():                                    ## {reg: bytes} + written
+    ## The image reconfig.replay() leaves in the simulator's register model
+    ## from every write of the compiled bring-up (so the Reg tables and the
+    ## Step methods). Only registers the driver writes, or that DSI_CONFW
+    ## changes, are compared.
+    import reconfig
+    chip,written = reconfig.replay()
+    written.difference_update((0x0600,0x0601))     ## DCSCMD_TX self-clears
+    snap = dict((r,bytes(chip.regs[r:r+n])) for r,n in regions)
+    return snap,written
+def diff(have,want,only=None):                     ## [(reg, want, have)]
+    out = []
+    for base in sorted(want):
+        if base not in have:
+            continue
+        w = writeplan.width(base)
+        for i in range(0,len(want[base]) - w + 1,w):
+            reg = base + i
+            if only is not None and not only.intersection(range(reg,reg+w)):
+                continue
+            if want[base][i:i+w] != have[base][i:i+w]:
+                out.append((reg,writeplan.value(want[base][i:i+w]),
+                            writeplan.value(have[base][i:i+w])))
+    return out
+
+def watch(b,regs,interval=0.0,count=0):            ## Timestamped samples
+    ## Every sample of all registers is one transfer; a line is printed when
+    ## any of them changes.
+    plan,last,n = writeplan.Plan(a),None,0
+    start = time.monotonic()
+    while not count or n < count:
+        for reg in regs:
+            plan.read(reg,writeplan.width(reg))
+        now  = [writeplan.value(d) for d in plan.submit(b)]
+        n   += 1
+        if now != last:
+            print('%10.6f' % (time.monotonic() - start),
+                  ' '.join('%04X:%08X' % (r,v) for r,v in zip(regs,now)))
+            last = now
+        if interval:
+            time.sleep(interval)
+
+def show(snap):                                    ## Hex dump, 16 bytes a row
+    for base in sorted(snap):
+        data = snap[base]
+        for i in range(0,len(data),16):
+            print('0x%04X' % (base+i),data[i:i+16].hex(' '))
+def named(snap):                                   ## Fields, per regmap
+    m    = regmap.tc358778
+    regs = dict((m.regs[r][0],r) for r in m.regs)
+    for name,fields in sorted(m.decode(snap).items(),key=lambda i:regs[i[0]]):
+        print('0x%04X %-18s' % (regs[name],name),
+              ' '.join('%s=0x%X' % (n,v) for n,v in fields.items()
+                       if v or n != name or len(fields) == 1))
 
 def main():
-    b.write_byte_data(a,0x00,0x00)
-    I = bytearray([0x00,0x01])
-    str1 = "      0   2   4   6   8   A   C   E   "
-    str2 = "      0   2   4   6   8   A   C   E  "
-    for i in I:
-        for u in range(6):
-            s1 = binascii.hexlify(bytearray(b.read_i2c_block_data(a,i,0x10)))
-            s2 = '0x'+'%03X' % ((16*i)+(u))
-            if (u == 0):
-                s4 = [s2,s1]
-            else:
-                s4.extend([s2,s1])
-        for v in range(5):
-	        block9 = bytearray(b.read_i2c_block_data(a,i,0x10))
-	        blockA = bytearray(b.read_i2c_block_data(a,i,0x10))
-        if (i == 0):
-            s3 = s4
-    J = bytearray([0x02,0x04])
-    for j in J:
-        for w in range(6):
-            s5 = binascii.hexlify(bytearray(b.read_i2c_block_data(a,j,0x10)))
-            s6 = '0x'+'%03X' % ((16*j)+(w))
-            if (w == 0):
-                s8 = [s6,s5]
-            else:
-                s8.extend([s6,s5])
-        for x in range(5):
-	        block9 = bytearray(b.read_i2c_block_data(a,j,0x10))
-	        blockA = bytearray(b.read_i2c_block_data(a,j,0x10))
-        if (j == 2):
-            s7 = s8
-    K = bytearray([0x05,0x06])
-    for k in K:
-        for y in range(6):
-            s9 = binascii.hexlify(bytearray(b.read_i2c_block_data(a,k,0x10)))
-            sa = '0x'+'%03X' % ((16*k)+(y))
-            if (y == 0):
-                sc = [sa,s9]
-            else:
-                sc.extend([sa,s9])
-        for z in range(5):
-	        block9 = bytearray(b.read_i2c_block_data(a,k,0x10))
-	        blockA = bytearray(b.read_i2c_block_data(a,k,0x10))
-        if (k == 5):
-            sb = sc
-    for l in range(6):
-        print s3[2*l],s3[2*l+1],s4[2*l],s4[2*l+1]
-    print str1,str2
-    for m in range(6):
-        print s7[2*m],s7[2*m+1],s8[2*m],s8[2*m+1]
-    print str1,str2
-    for n in range(6):
-        print sb[2*n],sb[2*n+1],sc[2*n],sc[2*n+1]
-#print hex(2*j),binascii.hexlify(block1),binascii.hexlify(block2)
-#print(hex(z))
-    pass
+    ## readall.py                  dump the live registers
+    ## readall.py fields [FILE]    live (or FILE) registers by field name
+    ## readall.py snap FILE        save the live registers to FILE
+    ## readall.py diff [FILE]      live (or FILE) against the driver's values
+    ## readall.py diff FILE FILE   two snapshots against each other
+    ## readall.py watch [REG ...]  sample registers (default DSI errors)
+    args = sys.argv[1:]
+    cmd  = args.pop(0) if args else 'show'
+    if cmd == 'diff' and len(args) == 2:
+        with open(args[0],'rb') as f, open(args[1],'rb') as g:
+            want,have,only = load(f),load(g),None
+    elif cmd == 'diff' and args:
+        with open(args[0],'rb') as f:
+            have = load(f)
+        want,only = expected()
+    elif cmd == 'fields' and args:
+        with open(args[0],'rb') as f:
+            named(load(f))
+        return
+    elif cmd == 'watch':
+        regs = [int(r,16) for r in args] or errors
+        try:
+            watch(i2cbus.SMBus(3),regs)
+        except KeyboardInterrupt:
+            pass
+        return
+    else:
+        snap = snapshot(i2cbus.SMBus(3))
+        if cmd == 'snap':
+            with open(args[0],'wb') as f:
+                save(snap,f)
+        elif cmd == 'diff':
+            want,only = expected()
+            have = snap
+        elif cmd == 'fields':
+            named(snap)
+        else:
+            show(snap)
+        if cmd != 'diff':
+            return
+    for reg,w,h in diff(have,want,only):
+        print('0x%04X  want %08X  have %08X' % (reg,w,h))
+        if reg in regmap.tc358778.regs:            ## Which fields differ
+            for field,fw,fh in regmap.tc358778.compare(reg,w,h):
+                print('        %-14s want %X  have %X' % (field,fw,fh))
 
 if __name__ == '__main__':
     main()
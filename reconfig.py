@@ -0,0 +1,243 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero display reconfiguration
+# Purpose:     Move the TC358778XBG and the A026EAN01.0 panel from one display
+#              configuration to another with only the register writes that
+#              differ, instead of rerunning the whole videodriver bring-up.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, ast, types, i2cbus, writeplan, bringup, simbus
+here         = os.path.dirname(os.path.abspath(__file__))
+states       = {}                                  ## Config key -> State
+code         = None                                ## Parsed videodriver.py
+
+## A configuration is videodriver.py with some of its module parameters
+## (hActive, hFrontPorch, ..., frameRate, pixelClock, Hertz) replaced, plus
+## two shortcuts: rate scales the pixel clock and PLL target with the refresh
+## rate the same way pllmodes.py does, and brightness sets the panel PWM
+## (COMMAND1 0x51). Everything the driver derives from the parameters (PLL,
+## PPI, VOUT, the Reg tables) is recomputed by running the module again.
+
+def variant(rate=None,brightness=None,**params):   ## videodriver for a config
+    global code
+    import videodriver
+    if rate is not None:
+        params.setdefault('pixelClock',
+                          videodriver.pixelClock*rate//videodriver.frameRate)
+        params.setdefault('Hertz',videodriver.Hertz*rate//videodriver.frameRate)
+        params.setdefault('frameRate',rate)
+    if not params and brightness is None:
+        return videodriver
+    if code is None:
+        with open(os.path.join(here,'videodriver.py')) as f:
+            code = ast.parse(f.read())
+    tree  = ast.parse('')
+    found = set()
+    for node in code.body:                         ## name = params['name']
+        if (isinstance(node,ast.Assign) and len(node.targets) == 1 and
+            isinstance(node.targets[0],ast.Name) and
+            node.targets[0].id in params):
+            name  = node.targets[0].id
+            node  = ast.Assign(targets=node.targets,value=ast.parse(
+                    '__config__[%r]' % name,mode='eval').body)
+            found.add(name)
+        tree.body.append(node)
+    if set(params) - found:
+        raise ValueError('not a videodriver parameter: %s' %
+                         ', '.join(sorted(set(params) - found)))
+    ast.fix_missing_locations(tree)
+    driver = types.ModuleType('videodriver')
+    driver.__file__   = videodriver.__file__
+    driver.__config__ = params
+    exec(compile(tree,driver.__file__,'exec'),driver.__dict__)
+    if brightness is not None:                     ## COMMAND1 (page 0) PWM
+        page = None
+        for row in driver.Reg.six:
+            if row[1] == 0xFF:
+                page = row[0]
+            elif page == 0x00 and row[1] == 0x51:
+                row[0] = brightness
+    return driver
+
+def replay(driver=None):                           ## (bridge model, written)
+    ## Plays the recorded bring-up of driver (videodriver by default) into
+    ## a fresh simulated bridge and panel. written is every register byte
+    ## the bring-up sets, or that changed behind it (DSI_CONFW targets, say).
+    if driver is None:
+        import videodriver as driver
+    chip    = simbus.TC358778(simbus.SimBus(latency=simbus.Latency(
+                                                     realtime=False)))
+    blank   = bytes(chip.regs)
+    written = set()
+    for op in bringup.compile(driver):
+        if op[0] not in (bringup.XFER,bringup.CHECKED):
+            continue
+        for addr,flags,data in op[1]:
+            if addr == driver.a and not flags & 0x01 and len(data) > 2:
+                chip.write(data)
+                reg = (data[0]<<8) | data[1]
+                written.update(range(reg,reg+len(data)-2))
+    written.update(i for i in range(len(blank)) if chip.regs[i] != blank[i])
+    return chip,written
+
+class State:                                       ## Result of a configuration
+    ## The register image the bring-up of a configuration leaves in the
+    ## bridge, and the DCS settings it leaves in the panel, worked out by
+    ## replaying the recorded bring-up into the simulator's models.
+    def __init__(self,driver):
+        self.driver  = driver
+        chip,written = replay(driver)
+        self.regs    = bytes(chip.regs)
+        self.written = written                     ## Bytes bring-up sets
+        self.panel   = dict(chip.panel.regs)       ## (page,cmd): params
+        self.page    = chip.panel.page             ## Page left selected
+        self.flags   = (chip.panel.sleeping,chip.panel.idle,chip.panel.on)
+    def word(self,reg):
+        return (self.regs[reg]<<8) | self.regs[reg+1]
+def state(**config):                               ## Cached State of a config
+    key = tuple(sorted(config.items()))
+    if key not in states:
+        states[key] = State(variant(**config))
+    return states[key]
+
+def changes(have,want):                            ## Registers that differ
+    ## By whole register. SYSCTL, the DSI_CONFW command register and the DCS
+    ## command FIFO only hold whatever was last sent through them, so they
+    ## are not part of a configuration.
+    out = []
+    for reg in sorted(set(r - r % writeplan.width(r)
+                          for r in have.written | want.written)):
+        w = writeplan.width(reg)
+        if reg in (0x0002,0x0500) or 0x0600 <= reg < 0x0620:
+            continue
+        if have.regs[reg:reg+w] != want.regs[reg:reg+w]:
+            out.append(reg)
+    return out
+def sequence(have,want):                           ## Send have -> want
+    ## Order matters:
+    ##   1. Anything on the bridge changing: set FrmStop (PP_MISC bit 15) and
+    ##      wait one frame so the panel is left on a whole frame, then clear
+    ##      PP_EN (CONFCTL bit 6) and set RstPtr to stop the video input.
+    ##   2. PLL dividers changing: clear CKEN, write the new dividers with
+    ##      CKEN still clear, give it the same 5 ms to lock as GlobalReg, and
+    ##      only then enable the clock again. PHY/PPI/TX timing (0x01xx to
+    ##      0x05xx) is written while the byte clock is stopped.
+    ##   3. DSI_CONTROL and friends can only be changed through DSI_CONFW, so
+    ##      a set (101) and a clear (110) command is sent per register.
+    ##   4. Panel DCS settings (Reg.six, the RGB porches etc.), page by page.
+    ##   5. PP_MISC and CONFCTL back to their new values, restarting video.
+    ## Nothing is sent for parts that did not change, so a brightness change
+    ## is one DCS packet and a refresh rate change is a frame plus 5 ms.
+    d     = want.driver
+    regs  = changes(have,want)
+    pll   = [r for r in regs if 0x0016 <= r < 0x001A]
+    confw = [r for r in regs if 0x0400 <= r < 0x0500]
+    other = [r for r in regs if r not in pll + confw + [0x0004,0x0032]]
+    plan  = writeplan.Plan(d.a)
+    if regs:                                       #1. Stop at the frame end
+        misc = have.word(0x0032)
+        plan.write(0x0032,word(misc | 0x8000)).submit(d.b)
+        d.wait.delay(1.0/have.driver.frameRate)
+        plan.write(0x0004,word(have.word(0x0004) & ~0x0040))
+        plan.write(0x0032,word(misc | 0xC000))
+    if pll:                                        #2. PLL off, new dividers
+        plan.write(0x0018,word(have.word(0x0018) & ~0x0010))
+        plan.write(0x0016,want.regs[0x0016:0x0018])
+        plan.write(0x0018,word(want.word(0x0018) & ~0x0010))
+    for reg in other:
+        plan.write(reg,want.regs[reg:reg+writeplan.width(reg)])
+    for reg in confw:                              #3. DSI_CONFW set, clear
+        new,old = want.word(reg),have.word(reg)
+        for cmd,bits in ((0x5,new & ~old),(0x6,old & ~new)):
+            if bits:
+                plan.write(0x0500,word(bits) +
+                           word((cmd<<13) | (((reg-0x0400)//4)<<8)))
+    plan.submit(d.b)
+    if pll:                                        ## Relock, clock back on
+        d.wait.delay(0.005)
+        plan.write(0x0018,want.regs[0x0018:0x001A]).submit(d.b)
+    panel(have,want)                               #4. Panel settings
+    if regs:                                       #5. Video back on
+        plan.write(0x0032,want.regs[0x0032:0x0034])
+        plan.write(0x0004,want.regs[0x0004:0x0006])
+        plan.submit(d.b)
+def panel(have,want):                              ## DCS settings have -> want
+    d    = want.driver
+    page = have.page
+    with d.DCS.batch():                            ## Settings: one transfer
+        for (p,cmd),params in want.panel.items():
+            if cmd == 0xFF or have.panel.get((p,cmd)) == params:
+                continue
+            if p != page:
+                d.DCS.WRITE([p,0xFF])
+                page = p
+            if len(params) == 1:
+                d.DCS.WRITE([params[0],cmd])
+            else:                                  ## Link order -> FIFO words
+                data = bytes([cmd]) + params
+                fifo = [data[i^1] if i^1 < len(data) else 0x00
+                        for i in range(len(data) + len(data) % 2)]
+                if len(data) % 2:
+                    d.DCS.send([0x40,0x39],fifo,len(data))
+                else:
+                    d.DCS.LONG(fifo)
+        if page != want.page:
+            d.DCS.WRITE([want.page,0xFF])
+    sleeping,idle,on = want.flags
+    if sleeping != have.flags[0]:
+        if sleeping:
+            d.screen.sleep()
+        else:
+            d.screen.wake()
+            d.wait.delay(0.1)                      ## Panel sleep-out time
+    if idle != have.flags[1]:
+        d.screen.idle() if idle else d.screen.stopIdle()
+    if on != have.flags[2]:
+        d.screen.on() if on else d.screen.off()
+def word(v):                                       ## 16-bit value -> reg bytes
+    return [(v>>8) & 0xFF,v & 0xFF]
+
+class Display:                                     ## Applied display state
+    ## Keeps the State last applied, so the next configuration costs only the
+    ## difference. The first apply is a full bring-up.
+    def __init__(self):
+        self.current = None
+    def plan(self,want,have=None):                 ## Ops for have -> want
+        have = have or self.current
+        if have is None:
+            return bringup.compile(want.driver)
+        return bringup.record(lambda: sequence(have,want),want.driver)
+    def apply(self,want,bus=None):                 ## Send, and remember want
+        ops = self.plan(want)
+        bringup.run(ops,bus or i2cbus.SMBus(3))
+        self.current = want
+        return ops
+display = Display()
+def configure(**config):                           ## display.apply(state(...))
+    return display.apply(state(**config))
+
+def summary(ops):                                  ## Transfers, bytes, delay s
+    xfers,size,delay = 0,0,0
+    for op in ops:
+        if op[0] == bringup.DELAY:
+            delay += op[1]/1000000
+        elif op[0] != bringup.UNTIL:
+            xfers += 1
+            size  += sum(len(m) if isinstance(m,bytes) else m
+                         for addr,flags,m in op[1])
+    return xfers,size,delay
+def main():
+    ## reconfig.py name=value ...   plan from the stock bring-up to a config,
+    ##                              e.g. rate=50 brightness=128 hBackPorch=60
+    config = dict(a.split('=',1) for a in sys.argv[1:])
+    config = dict((k,int(v,0)) for k,v in config.items())
+    for name,have in (('bring-up',None),('reconfig',state())):
+        xfers,size,delay = summary(display.plan(state(**config),have))
+        print('%-8s %4d transfers %5d bytes %8.3f ms delays' %
+              (name,xfers,size,1000*delay))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero register map
+# Purpose:     Declare the TC358778XBG and LM49450 registers and their bit
+#              fields once, compile them into encoders that build ready-to-send
+#              rows, and decode register snapshots back into named fields.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import struct, writeplan
+SET,CLEAR    = 0x5,0x6                             ## DSI_CONFW Mode
+
+## A register is (address, name, fields), fields being 'name:msb:lsb' or
+## 'name:bit' separated by spaces. Field names are unique per chip, and are
+## the ones the drivers already use for the value (PPI.tClkZero goes in
+## tClkZero), so a driver class hands its settings over by name. Bits no
+## field covers are set with the register's own name: CONFCTL=0x0004 sets
+## everything but PP_EN. A register with no fields is all register name.
+##
+## encoder(first,count) compiles the registers from first on into one
+## function, once: its keyword arguments are the fields and register names
+## of the block (missing ones are 0), and it returns the block as a
+## bytearray in wire order, a Reg.x row ([low address byte, data...]) by
+## default. A value that does not fit its bits raises ValueError, as a
+## byte list did for a value over 255; nothing is masked off silently.
+## The field layout, the byte order (16-bit registers big-endian; 32-bit
+## ones low word first, each word big-endian) and the address byte are all
+## resolved when the encoder is made, so a call is one range check and one
+## expression per register and one struct pack, with no per-field lookups
+## or loops.
+## value(name) compiles the same way to the register's integer value.
+##
+## The other direction is not time critical: split() takes a register's
+## value apart into the same keywords (so encoder(reg)(**split(reg,v)) gives
+## the register back), decode() does it for a whole readall snapshot and
+## diff() lists the fields two snapshots disagree on.
+
+tc358778     = [                                   ## TC358778XBG, 0x0e
+    (0x0000,'CHIPID','ChipID:15:8 RevID:7:0'),
+    (0x0002,'SYSCTL','Sleep:1 SReset:0'),
+    (0x0004,'CONFCTL','PP_EN:6'),
+    (0x0006,'FIFOCTL','FiFoLevel:8:0'),            ## vSyncDelay, bytes
+    (0x0008,'DATAFMT','TxStart:1:0'),              ## DSITXReg sets these last
+    (0x000E,'GPIOEN',''),
+    (0x0010,'GPIODIR',''),
+    (0x0012,'GPIOIN',''),
+    (0x0014,'GPIOOUT',''),                         ## Panel reset on bits 1-2
+    (0x0016,'PLLCTL0','PRD:15:12 FBD:8:0'),
+    (0x0018,'PLLCTL1','FRS:11:10 CKEN:4 RESETB:1 PLL_EN:0'),
+    (0x0022,'WORDCNT',''),
+    (0x0032,'PP_MISC','FrmStop:15 RstPtr:14'),
+    (0x0050,'DSITX_DT','DataType:7:0'),
+    (0x00E0,'DBG_LCNT',''),
+    (0x0100,'CLW_DPHYCONTTX','clCap:9:8 clDel:7:4 clCur:3:0'),
+    (0x0104,'D0W_DPHYCONTTX','d0Cap:9:8 d0Del:7:4 d0Cur:3:0'),
+    (0x0108,'D1W_DPHYCONTTX','d1Cap:9:8 d1Del:7:4 d1Cur:3:0'),
+    (0x010C,'D2W_DPHYCONTTX','d2Cap:9:8 d2Del:7:4 d2Cur:3:0'),
+    (0x0110,'D3W_DPHYCONTTX','d3Cap:9:8 d3Del:7:4 d3Cur:3:0'),
+    (0x0140,'CLW_CNTRL',''),
+    (0x0144,'D0W_CNTRL',''),
+    (0x0148,'D1W_CNTRL',''),
+    (0x014C,'D2W_CNTRL',''),
+    (0x0150,'D3W_CNTRL',''),
+    (0x0204,'STARTCNTRL','StartPPI:0'),
+    (0x0210,'LINEINITCNT','lineInit:15:8'),        ## In 256 byte clocks
+    (0x0214,'LPTXTIMECNT','LPTxTime:10:0'),
+    (0x0218,'TCLK_HEADERCNT','tClkZero:15:8 tClkPrep:6:0'),
+    (0x021C,'TCLK_TRAILCNT','tClkTrail:7:0'),
+    (0x0220,'THS_HEADERCNT','tHSZero:14:8 tHSPrep:6:0'),
+    (0x0224,'TWAKEUP','tWakeUp:15:8'),             ## In 256 byte clocks
+    (0x0228,'TCLK_POSTCNT','tClkPost:10:0'),
+    (0x022C,'THS_TRAILCNT','tHSTrail:7:0'),
+    (0x0230,'HSTXVREGCNT',''),
+    (0x0234,'HSTXVREGEN',''),
+    (0x0238,'TXOPTIONCNTRL','ClkCont:0'),
+    (0x023C,'BTACNTRL1','TXTAGOCNT:26:16 TXTASURECNT:10:0'),
+    (0x040C,'DSI_CONTROL','PrTimeoutEn:13 TaTimeoutEn:12 LrxTimeoutEn:11 '
+                          'HtxTimeoutEn:10 ContentionDis:9 EccDisable:8 '
+                          'HSTxMode:7 CRCDisable:6 HSClkContinue:5 '
+                          'lanes:2:1 EoTPacketDis:0'),
+    (0x0414,'DSI_INT',''),
+    (0x0418,'DSI_INT_ENA',''),
+    (0x0434,'DSI_ACKERR',''),
+    (0x0438,'DSI_ACKERR_INTENA',''),
+    (0x043C,'DSI_ACKERR_HALT',''),
+    (0x0440,'DSI_RXERR',''),
+    (0x0444,'DSI_RXERR_INTENA',''),
+    (0x0448,'DSI_RXERR_HALT',''),
+    (0x044C,'DSI_ERR',''),
+    (0x0450,'DSI_ERR_INTENA',''),
+    (0x0454,'DSI_ERR_HALT',''),
+    (0x0500,'DSI_CONFW','Mode:31:29 Address:28:24 Data:23:0'),
+    (0x0518,'DSI_START','DsiStart:0'),
+    (0x0600,'DCSCMD_ST','Busy:0'),
+    (0x0602,'DCSCMD_TYPE',''),
+    (0x0604,'DCSCMD_WC',''),
+    (0x0620,'DSI_EVENT','eventMode:0'),
+    (0x0622,'DSI_VSW',''),
+    (0x0624,'DSI_VBPR',''),
+    (0x0626,'DSI_VACT',''),
+    (0x0628,'DSI_HSW',''),
+    (0x062A,'DSI_HBPR',''),
+    (0x062C,'DSI_HACT',''),
+    ]
+lm49450      = [                                   ## LM49450, 0x7D
+    (0x00,'MODE','Rate:6:5 EqEn:4 Mute:2'),        ## Rate 2: 44.1 kHz, 0: 48
+    (0x01,'CLOCK',''),                             ## Clock divisor
+    (0x02,'PUMP',''),                              ## Charge pump divisor
+    (0x03,'REG03',''),
+    (0x04,'REG04',''),
+    (0x05,'REG05',''),
+    (0x06,'REG06',''),
+    (0x07,'HP_VOLUME','hpVolume:4:0'),
+    (0x08,'LS_VOLUME','lsVolume:4:0'),
+    (0x09,'EQ_BAND1',''),
+    (0x0A,'EQ_BAND2',''),
+    (0x0B,'EQ_BAND3',''),
+    (0x0C,'EQ_BAND4',''),
+    (0x0D,'EQ_BAND5',''),
+    (0x0E,'EQ_BAND6',''),
+    (0x0F,'REG0F',''),
+    ]
+
+class Map:                                         ## One chip's registers
+    def __init__(self,regs,width):
+        self.width   = width                       ## reg -> bytes
+        self.regs    = {}                          ## reg: (name,fields,other)
+        self.names   = {}                          ## reg or field name: reg
+        self.field   = {}                          ## field: (reg,lsb,mask)
+        self.cache   = {}                          ## Compiled functions
+        for reg,name,spec in regs:
+            fields,used = [],0
+            for f in spec.split():
+                f   = f.split(':')
+                lsb = int(f[-1])
+                mask = (1<<(int(f[1]) - lsb + 1)) - 1
+                fields.append((f[0],lsb,mask))
+                used |= mask<<lsb
+            full = (1<<(8*width(reg))) - 1
+            self.regs[reg] = (name,fields,full & ~used)
+            for n in [name] + [f[0] for f in fields]:
+                if n in self.names:
+                    raise ValueError('%s declared twice' % n)
+                self.names[n] = reg
+            self.field.update((f[0],(reg,f[1],f[2])) for f in fields)
+
+    def block(self,first,count):                   ## Registers from first
+        out,reg = [],first
+        for i in range(count):
+            if reg not in self.regs:
+                raise KeyError('no register 0x%04X in the map' % reg)
+            out.append(reg)
+            reg += self.width(reg)
+        return out
+    def expr(self,reg):                            ## (value, range check, args)
+        ## The check is true when a value does not fit: a field wider than
+        ## its bits, or negative; the register's own name wider than the
+        ## register (its bits under fields are ignored).
+        name,fields,other = self.regs[reg]
+        terms = ['(%s&0x%X)' % (name,other)] if other else []
+        terms += ['%s<<%d' % (n,lsb) for n,lsb,mask in fields]
+        args  = ([name] if other else []) + [f[0] for f in fields]
+        check = (['%s>>%d' % (name,8*self.width(reg))] if other else []) + \
+                ['%s>>%d' % (n,mask.bit_length()) for n,lsb,mask in fields]
+        return '|'.join(terms) or '0',' or '.join(check),args
+    def line(self,reg,check,args):                 ## Raise if out of range
+        return 'if %s: fail(0x%X,%s)' % (
+               check,reg,','.join('%s=%s' % (n,n) for n in args))
+    def fail(self,reg,**values):
+        name,fields,other = self.regs[reg]
+        bits = dict((n,mask.bit_length()) for n,lsb,mask in fields)
+        bits[name] = 8*self.width(reg)
+        for n,v in values.items():
+            if v < 0 or v >> bits[n]:
+                raise ValueError('%s: %s=%r does not fit in %d bits' %
+                                 (name,n,v,bits[n]))
+    def make(self,key,lines,args,env):             ## Compile one function
+        src = 'def f(*,%s):\n%s' % (','.join('%s=0' % n for n in args),
+                                    ''.join('    %s\n' % l for l in lines))
+        exec(compile(src,'<regmap %s>' % (key,),'exec'),env)
+        self.cache[key] = env['f']
+        return env['f']
+
+    def encoder(self,first,count=1,addr=True):     ## f(**fields) -> bytearray
+        key = ('encoder',first,count,addr)
+        if key in self.cache:
+            return self.cache[key]
+        fmt,lines,args,words = '>' + ('B' if addr else ''),[],[],[]
+        if addr:
+            words.append('0x%02X' % (first & 0xFF))
+        for i,reg in enumerate(self.block(first,count)):
+            e,c,a = self.expr(reg)
+            args += a
+            if c:
+                lines.append(self.line(reg,c,a))
+            lines.append('r%d = %s' % (i,e))
+            w    = self.width(reg)
+            fmt += {1:'B',2:'H',4:'HH'}[w]
+            words += (['r%d&0xFFFF' % i,'r%d>>16' % i] if w == 4 else
+                      ['r%d' % i])
+        lines.append('return bytearray(pack(%s))' % ','.join(words))
+        return self.make(key,lines,args,{'pack':struct.Struct(fmt).pack,
+                                         'fail':self.fail})
+    def value(self,name):                          ## f(**fields) -> int
+        key = ('value',name)
+        if key in self.cache:
+            return self.cache[key]
+        reg   = self.names[name]
+        e,c,a = self.expr(reg)
+        lines = ([self.line(reg,c,a)] if c else []) + ['return ' + e]
+        return self.make(key,lines,a,{'fail':self.fail})
+    def pick(self,obj,first,count=1):              ## obj's settings for block
+        ## The block's fields that obj (a driver class, say DPHY) has an
+        ## attribute for, as encoder keywords.
+        out = {}
+        for reg in self.block(first,count):
+            for n in self.expr(reg)[2]:
+                if hasattr(obj,n):
+                    out[n] = getattr(obj,n)
+        return out
+    def mask(self,field):                          ## (reg, bits) of a field
+        reg,lsb,mask = self.field[field]
+        return reg,mask<<lsb
+    def set(self,reg,v,**fields):                  ## v with fields replaced
+        out = self.split(reg,v)
+        out.update(fields)
+        return self.value(self.regs[reg][0])(**out)
+
+    def split(self,reg,v):                         ## Value -> {field: value}
+        name,fields,other = self.regs[reg]
+        out = dict((n,(v>>lsb) & mask) for n,lsb,mask in fields)
+        if other:
+            out[name] = v & other
+        return out
+    def fields(self,reg,data):                     ## Wire bytes -> fields
+        return self.split(reg,writeplan.value(data))
+    def decode(self,snap):                         ## {name: {field: value}}
+        ## snap is readall's {first reg: bytes}; registers not in it, or
+        ## not in the map, are left out.
+        out = {}
+        for base,data in snap.items():
+            for reg in sorted(self.regs):
+                w = self.width(reg)
+                if base <= reg and reg + w <= base + len(data):
+                    out[self.regs[reg][0]] = self.fields(reg,
+                                             data[reg-base:reg-base+w])
+        return out
+    def compare(self,reg,want,have):               ## [(field, want, have)]
+        w,h = self.split(reg,want),self.split(reg,have)
+        return [(n,w[n],h[n]) for n in w if w[n] != h[n]]
+    def diff(self,have,want):                      ## [(reg,field,want,have)]
+        w,h = self.decode(want),self.decode(have)
+        out = []
+        for reg in sorted(self.regs):
+            name = self.regs[reg][0]
+            if name in w and name in h:
+                out += [(name,n,w[name][n],h[name][n]) for n in w[name]
+                        if w[name][n] != h[name][n]]
+        return out
+tc358778     = Map(tc358778,writeplan.width)
+lm49450      = Map(lm49450,lambda reg: 1)
+
+def confw(rows):                                   ## {reg: (mask, value)}
+    ## What a list of Reg.five style DSI_CONFW rows leaves in the DSI control
+    ## registers: per target register, the bits the set (101) and clear (110)
+    ## commands touch and what they end up as. [15:0] of Data reach the
+    ## register.
+    out = {}
+    for row in rows:
+        f    = tc358778.fields(0x0500,row[1:])
+        reg  = 0x0400 + 4*f['Address']
+        bits = f['Data'] & 0xFFFF
+        mask,val = out.get(reg,(0,0))
+        if f['Mode'] == SET:
+            out[reg] = (mask | bits,val | bits)
+        elif f['Mode'] == CLEAR:
+            out[reg] = (mask | bits,val & ~bits)
+    return out
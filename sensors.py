@@ -0,0 +1,265 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero sensors
+# Purpose:     Stream the BMX055 9-DOF motion sensor (accelerometer, gyroscope,
+#              magnetometer) and the MGC3130 GestIC controller on bus 3 into
+#              preallocated NumPy ring buffers, with a pull API and async
+#              iterators of timestamped samples.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import sys, time, asyncio, numpy as np, i2cbus, writeplan
+b            = i2cbus.SMBus(3)                     ## Same bus as the display
+byteTime     = 0.000225                            ## Bus 3 seconds per byte
+
+## Everything here is read at BULK priority, one short transfer at a time
+## and never holding the bus between them, so a display or audio command
+## waits for at most one sensor read (a few ms). Each poll() is two
+## transfers for all of the motion sensor: the FIFO frame counts and the
+## magnetometer in the first, both FIFOs in the second, burst read in whole
+## frames up to the message size bustune settled on (writeplan.limit), as
+## many messages as that takes. The accelerometer and gyroscope FIFOs (32
+## and 100 frames) each hold about a second at the rates set here, so the
+## motion sensor is polled every `every` seconds and the bus pays the
+## address overhead once per burst, not per sample. The GestIC has no FIFO,
+## only its latest message, so it is polled at the rate its samples are
+## wanted.
+##
+## Samples are decoded with NumPy straight from the read buffer into a
+## Ring: no Python object per sample. A FIFO has no timestamps; the newest
+## frame is stamped with the time of the read and the rest spaced back at
+## the output data rate, carried on from the last read so the spacing stays
+## even. load() is the share of bus 3 the configured rates take: about a
+## third with these defaults, most of it the 6 bytes of every gyroscope and
+## accelerometer sample, which the display and audio get between reads.
+
+class Ring:                                        ## Preallocated sample ring
+    ## `size` rows of `width` float32 values plus a float64 timestamp each.
+    ## head counts every row ever pushed, so a reader keeps its own cursor
+    ## and read() tells it how many rows it missed if it fell behind.
+    def __init__(self,size,width):
+        self.data    = np.zeros((size,width),dtype=np.float32)
+        self.time    = np.zeros(size,dtype=np.float64)
+        self.size    = size
+        self.head    = 0
+    def push(self,rows,t0,dt):                     ## rows: (n,width) array
+        skip = max(0,len(rows) - self.size)        ## Would be overwritten
+        rows,t0 = rows[skip:],t0 + dt*skip
+        n,i  = len(rows),(self.head + skip) % self.size
+        k    = min(n,self.size - i)                ## Up to the end, then wrap
+        self.data[i:i+k] = rows[:k]
+        self.data[:n-k]  = rows[k:]
+        self.time[i:i+k] = t0 + dt*np.arange(k)
+        self.time[:n-k]  = t0 + dt*np.arange(k,n)
+        self.head += skip + n
+    def read(self,cursor):                         ## times, data, new cursor
+        ## Copies of the rows after cursor (at most the ring's size).
+        start = max(cursor,self.head - self.size)
+        idx   = np.arange(start,self.head) % self.size
+        return self.time[idx],self.data[idx],self.head
+    def latest(self,n=1):                          ## times, data of last n
+        return self.read(self.head - n)[:2]
+
+class Stream:                                      ## One sensor's output
+    def __init__(self,name,rate,size,width,fifo=False):
+        self.name    = name
+        self.rate    = rate                        ## Samples per second
+        self.fifo    = fifo                        ## Stamped from the ODR
+        self.ring    = Ring(size,width)
+        self.last    = None                        ## Time of the newest sample
+        self.lost    = 0                           ## FIFO overruns seen
+        self.cond    = None                        ## asyncio.Condition, once
+    def add(self,rows,now):                        ## Stamp and push
+        dt = 1/self.rate
+        t0 = now - dt*(len(rows)-1)
+        if self.last is not None:
+            gap = t0 - (self.last + dt)
+            if self.fifo and abs(gap) < 4*dt or gap <= -dt:
+                t0 = self.last + dt                ## Even spacing, monotonic
+        self.ring.push(rows,t0,dt)
+        self.last = t0 + dt*(len(rows)-1)
+    async def samples(self):                       ## async for times, data
+        cursor = self.ring.head
+        while True:
+            if self.cond is None:
+                self.cond = asyncio.Condition()
+            async with self.cond:
+                await self.cond.wait_for(lambda: self.ring.head != cursor)
+            times,data,cursor = self.ring.read(cursor)
+            yield times,data
+
+class Motion:                                      ## BMX055 9-DOF
+    ## Accelerometer (BMA280 core, 0x18), gyroscope (BMG160 core, 0x68) and
+    ## magnetometer (BMM150 core, 0x10). The magnetometer values are raw,
+    ## without the part's trim compensation.
+    accAddr      = 0x18                            ## Accelerometer
+    gyrAddr      = 0x68                            ## Gyroscope
+    magAddr      = 0x10                            ## Magnetometer
+    accRange     = 0x03                            ## +-2 g
+    accBw        = 0x09                            ## 15.63 Hz, ODR 31.25 Hz
+    accRate      = 31.25
+    gyrRange     = 0x00                            ## +-2000 deg/s
+    gyrBw        = 0x07                            ## ODR 100 Hz, 32 Hz filter
+    gyrRate      = 100.0
+    magRate      = 0x00                            ## 10 Hz
+    accScale     = 9.80665/1024                    ## m/s^2 per LSB at +-2 g
+    gyrScale     = 1/16.4                          ## deg/s per LSB at 2000
+    magScale     = 0.3                             ## uT per LSB, roughly
+    def __init__(self,every=0.2,size=4096):
+        self.every   = every                       ## Poll period, seconds
+        self.accel   = Stream('accel',self.accRate,size,3,True)
+        self.gyro    = Stream('gyro',self.gyrRate,size,3,True)
+        self.mag     = Stream('mag',1/every,size//8,3) ## Once a poll
+    def setup(self,bus=b):
+        w = i2cbus.write
+        with i2cbus.priority(i2cbus.BULK):
+            acc,gyr,mag = self.accAddr,self.gyrAddr,self.magAddr
+            bus.i2c_rdwr(w(acc,[0x0F,self.accRange]),
+                         w(acc,[0x10,self.accBw]),
+                         w(acc,[0x11,0x00]),       ## PMU_LPW: normal
+                         w(gyr,[0x0F,self.gyrRange]),
+                         w(gyr,[0x10,self.gyrBw]),
+                         w(mag,[0x4B,0x01]))       ## Magnetometer power on
+            time.sleep(0.003)                      ## BMM150 start-up
+            bus.i2c_rdwr(w(mag,[0x4C,self.magRate<<3]), ## Normal mode
+                         w(acc,[0x3E,0x80]),       ## FIFOs: stream, XYZ
+                         w(gyr,[0x3E,0x80]))       ## (clears them)
+    def poll(self,bus=b):                          ## Read both FIFOs, mag
+        r,w = i2cbus.read,i2cbus.write
+        with i2cbus.priority(i2cbus.BULK):
+            acc,gyr,mag = self.accAddr,self.gyrAddr,self.magAddr
+            msgs = [w(acc,[0x0E]),r(acc,1),w(gyr,[0x0E]),r(gyr,1),
+                    w(mag,[0x42]),r(mag,8)]
+            bus.i2c_rdwr(*msgs)
+            now  = time.monotonic()
+            na,ng = bytes(msgs[1])[0],bytes(msgs[3])[0]
+            size  = max(6,writeplan.limit - writeplan.limit % 6)
+            parts = dict((addr,[r(addr,min(size,6*n - i))
+                                for i in range(0,6*n,size)])
+                         for addr,n in ((acc,na & 0x7F),(gyr,ng & 0x7F)))
+            reads = [m for addr in (acc,gyr) for part in parts[addr]
+                     for m in (w(addr,[0x3F]),part)]
+            for i in range(0,len(reads),writeplan.maxMsgs & ~1):
+                bus.i2c_rdwr(*reads[i:i + (writeplan.maxMsgs & ~1)])
+        self.accel.lost += na>>7
+        self.gyro.lost  += ng>>7
+        for stream,addr,n,scale,shift in (
+                (self.accel,acc,na & 0x7F,self.accScale,4),
+                (self.gyro,gyr,ng & 0x7F,self.gyrScale,0)):
+            if n:
+                data = b''.join(bytes(part) for part in parts[addr])
+                raw  = np.frombuffer(data,dtype='<i2')
+                stream.add((raw.reshape(n,3) >> shift)*scale,now)
+        raw = np.frombuffer(bytes(msgs[5]),dtype='<i2')[:3]
+        self.mag.add((raw >> np.array([3,3,1])).reshape(1,3)*self.magScale,now)
+        return na & 0x7F,ng & 0x7F
+    def load(self):                                ## Share of bus 3 time
+        per  = 2*(2+2) + (2+9)                     ## Statuses, mag
+        data = 6*(self.accel.rate + self.gyro.rate)
+        size = max(6,writeplan.limit - writeplan.limit % 6)
+        return (per/self.every + data*(1 + 3/size))*byteTime ## +3 B a message
+
+class Gesture:                                     ## MGC3130 GestIC
+    ## Position (x, y, z from 0 to 1), the last gesture code, the touch
+    ## flags and the air wheel counter, from SENSOR_DATA_OUTPUT messages.
+    ## Position is NaN while SystemInfo says it is not valid.
+    addr         = 0x42
+    mask         = 0x001E                          ## Gesture, touch, wheel, xyz
+    length       = 26                              ## Bytes read per message
+    def __init__(self,rate=20.0,size=2048):
+        self.every   = 1/rate
+        self.stream  = Stream('gesture',rate,size,6)
+        self.row     = np.zeros((1,6),dtype=np.float32)
+        self.seq     = None
+    def setup(self,bus=b):                         ## Output enable and lock
+        m   = self.mask.to_bytes(4,'little')
+        msg = [0x10,0x00,0x00,0xA2,0xA0,0x00,0x00,0x00] + list(m) + list(m)
+        with i2cbus.priority(i2cbus.BULK):
+            bus.i2c_rdwr(i2cbus.write(self.addr,msg))
+    def poll(self,bus=b):                          ## Latest message, if new
+        msg = i2cbus.read(self.addr,self.length)
+        with i2cbus.priority(i2cbus.BULK):
+            bus.i2c_rdwr(msg)
+        now  = time.monotonic()
+        data = bytes(msg)
+        if data[3] != 0x91 or data[2] == self.seq:
+            return 0
+        self.seq = data[2]
+        mask,info,p = int.from_bytes(data[4:6],'little'),data[7],8
+        row = self.row[0]
+        for bit,size in enumerate((2,4,4,2,6)):
+            if not mask & (1<<bit):
+                continue
+            field = data[p:p+size]
+            p    += size
+            if bit == 1:
+                row[3] = field[0]                  ## Gesture code
+            elif bit == 2:
+                row[4] = int.from_bytes(field[:2],'little')
+            elif bit == 3 and info & 0x02:
+                row[5] = field[0]
+            elif bit == 4:
+                row[:3] = (np.frombuffer(field,dtype='<u2')/65535.0
+                           if info & 0x01 else np.nan)
+        self.stream.add(self.row,now)
+        return 1
+    def load(self):
+        return (1 + self.length)/self.every*byteTime
+class Streamer:                                    ## Polls on a schedule
+    ## poll() reads whichever sensors are due, for callers with their own
+    ## loop. run() is the asyncio task doing the same: the reads happen in
+    ## an executor thread, so the loop (and the audio service on it) keeps
+    ## going, and Stream.samples() iterators are woken after every poll.
+    def __init__(self,motion=None,gesture=None):
+        self.motion  = motion or Motion()
+        self.gesture = gesture or Gesture()
+        self.polls   = 0
+        self.due     = [0.0,0.0]                   ## monotonic() of next polls
+    def streams(self):
+        return [self.motion.accel,self.motion.gyro,self.motion.mag,
+                self.gesture.stream]
+    def load(self):                                ## Share of bus 3 time
+        return self.motion.load() + self.gesture.load()
+    def setup(self,bus=b):
+        self.motion.setup(bus)
+        self.gesture.setup(bus)
+        self.due = [0.0,0.0]
+    def poll(self,bus=b):                          ## Seconds to the next one
+        now = time.monotonic()
+        for i,sensor in enumerate((self.motion,self.gesture)):
+            if now >= self.due[i]:
+                sensor.poll(bus)
+                self.due[i] = max(self.due[i] + sensor.every,now)
+        self.polls += 1
+        return max(0,min(self.due) - time.monotonic())
+    async def run(self,bus=b):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None,self.setup,bus)
+        while True:
+            wait = await loop.run_in_executor(None,self.poll,bus)
+            for s in self.streams():
+                if s.cond is not None:             ## Someone is iterating
+                    async with s.cond:
+                        s.cond.notify_all()
+            await asyncio.sleep(wait)
+streamer = Streamer()
+
+def main():
+    ## sensors.py [SECONDS]   stream for a while and print the rates seen
+    seconds = float(sys.argv[1]) if sys.argv[1:] else 5.0
+    async def go():
+        task = asyncio.ensure_future(streamer.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+    asyncio.run(go())
+    print('bus 3 load %.0f%%' % (100*streamer.load()))
+    for s in streamer.streams():
+        times,data = s.ring.latest(1)
+        print('%-8s %6d samples %7.1f/s lost %d  last %s' %
+              (s.name,s.ring.head,s.ring.head/seconds,s.lost,
+               np.round(data[0],3) if len(data) else '-'))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero simulated i2c bus
+# Purpose:     Register-level stand-in for bus 3 of the Double Zero board, with
+#              the TC358778XBG bridge, the A026EAN01.0 panel behind it, the
+#              LM49450 audio chip, the sensors and the I/O expander, so
+#              bring-up can be profiled without hardware.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import errno, time, random, math
+I2C_M_RD     = 0x0001                              ## Read flag, as linux/i2c.h
+
+class Latency:                                     ## Bus timing model
+    ## Seconds spent on the wire per transaction. The defaults are measured on
+    ## the i2c-gpio bitbanged bus 3 of a Pi Zero: roughly 40 kHz effective SCL
+    ## (9 clocks per byte incl. ACK) plus ioctl and start/stop overhead. Each
+    ## message inside an i2c_rdwr batch costs a repeated start and an address
+    ## byte but no extra ioctl. With realtime set the bus really sleeps for the
+    ## modelled time, so wall clock measurements match the board.
+    def __init__(self,start=0.00018,restart=0.00003,byte=0.000225,
+                 realtime=True):
+        self.start   = start                       ## ioctl + START + STOP
+        self.restart = restart                     ## Repeated START
+        self.byte    = byte                        ## One byte incl. ACK bit
+        self.realtime= realtime                    ## Sleep for modelled time
+class Stats:                                       ## Transaction counters
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        self.transactions = 0                      ## START...STOP sequences
+        self.messages     = 0                      ## Messages incl. restarts
+        self.bytesOut     = 0                      ## Data bytes written
+        self.bytesIn      = 0                      ## Data bytes read
+        self.busTime      = 0.0                    ## Modelled seconds on wire
+        self.device       = {}                     ## addr: [transactions,bytes]
+    def copy(self):
+        s = Stats()
+        s.__dict__.update(self.__dict__)
+        s.device = dict((k,list(v)) for k,v in self.device.items())
+        return s
+    def __sub__(self,other):                       ## Stats between 2 snapshots
+        s = self.copy()
+        for k in ('transactions','messages','bytesOut','bytesIn','busTime'):
+            setattr(s,k,getattr(self,k) - getattr(other,k))
+        for k,v in other.device.items():
+            s.device[k] = [s.device[k][0]-v[0],s.device[k][1]-v[1]]
+        return s
+    def __str__(self):
+        return ('%5d xfers %5d msgs %6d B out %5d B in %9.3f ms bus' %
+                (self.transactions,self.messages,self.bytesOut,self.bytesIn,
+                 1000*self.busTime))
+class Msg:                                         ## Stand-in for smbus2.i2c_msg
+    def __init__(self,addr,flags,data):
+        self.addr  = addr
+        self.flags = flags
+        self.len   = len(data)
+        self.buf   = bytearray(data)
+    def __iter__(self):
+        return iter(self.buf)
+    def __bytes__(self):
+        return bytes(self.buf)
+    @staticmethod
+    def read(addr,length):
+        return Msg(addr,I2C_M_RD,bytearray(length))
+    @staticmethod
+    def write(addr,buf):
+        return Msg(addr,0,buf)
+
+class Panel:                                       ## A026EAN01.0 DCS model
+    ## Keeps the last value written to every (page, command) pair. The panel
+    ## selects a command page by writing its number to 0xFF. The colour
+    ## lookup table is kept by position: each LUT packet is written at the
+    ## end of the last, from 0 again when the bridge starts a new upload.
+    def __init__(self):
+        self.page    = 0x00
+        self.regs    = {}                          ## (page,cmd): bytes
+        self.lut     = bytearray(192)              ## R, G, B; 64 entries each
+        self.lutPos  = 0
+        self.sleeping= True
+        self.on      = False
+        self.idle    = False
+    def packet(self,dataType,payload):
+        if not payload:
+            return
+        cmd,params = payload[0],bytes(payload[1:])
+        if dataType == 0x05:                       ## DCS short, no parameter
+            if   cmd == 0x10: self.sleeping = True
+            elif cmd == 0x11: self.sleeping = False
+            elif cmd == 0x28: self.on       = False
+            elif cmd == 0x29: self.on       = True
+            elif cmd == 0x38: self.idle     = False
+            elif cmd == 0x39: self.idle     = True
+            elif cmd == 0x01: self.__init__()
+            return
+        if cmd == 0xFF:
+            self.page = params[0] if params else 0
+        self.regs[(self.page,cmd)] = params
+    def table(self,payload):                       ## LUT packet, in order
+        self.lut[self.lutPos:self.lutPos+len(payload)] = payload
+        self.lutPos += len(payload)
+class Link:                                        ## D-PHY signal integrity
+    ## One board's five lanes (clock, data 0-3). Each runs clean up to its
+    ## own bit rate, raised by up to `gain` the closer its capacitor,
+    ## current and delay settings (0x0100-0x0113, as DPHY) are to the
+    ## board's best, which the seed picks and nothing can read. A packet
+    ## goes wrong on a lane with a probability rising from about 1e-6
+    ## `spread` below that rate to 1/2 at it; the bridge only reports that
+    ## something went wrong, not on which lane.
+    def __init__(self,seed=0,base=780000000,gain=240000000,spread=8000000):
+        rnd        = random.Random(seed)
+        self.best  = [(rnd.randrange(4),rnd.randrange(4),rnd.randrange(16))
+                      for lane in range(5)]
+        self.base  = [base + rnd.randrange(-40000000,40000000)
+                      for lane in range(5)]
+        self.gain  = gain
+        self.spread= spread
+        self.rnd   = rnd
+    def limit(self,lane,cap,cur,delay):            ## Clean up to, bit/s
+        c,u,d = self.best[lane]
+        off   = abs(cap-c)/3 + abs(cur-u)/3 + 2*abs(delay-d)/15
+        return self.base[lane] + self.gain*(1 - off/4)
+    def fails(self,rate,settings):                 ## One packet, [(cap,cur,
+        for lane,(cap,cur,delay) in enumerate(settings): ## delay)] per lane
+            x = 14*(rate - self.limit(lane,cap,cur,delay))/self.spread
+            if self.rnd.random() < 1/(1 + math.exp(-max(-50,min(50,x)))):
+                return True
+        return False
+class TC358778:                                    ## TC358778XBG register model
+    ## The chip has a 16-bit register address space that auto-increments by
+    ## one per data byte. 16-bit registers hold [bits 15-8][bits 7-0], and the
+    ## 32-bit registers (0x0100-0x05FF) are two such words, low word first.
+    ## Writing 1 to DCSCMD_ST (0x0600) sends the packet described by 0x0602
+    ## (type), 0x0604 (word count) and 0x0610+ (data words, low byte first on
+    ## the link) to the panel; bit 0 reads back as 1 until it has gone out.
+    ## DSI_CONFW (0x0500) set/clear commands are applied to the 0x04xx DSI
+    ## control registers as soon as their last byte arrives. With a Link
+    ## set, a packet that goes wrong on the link sets error bits in DSI_INT,
+    ## DSI_RXERR and DSI_ERR (0x0414, 0x0440, 0x044C), which are cleared by
+    ## writing 1s, as on the chip; pixelClock is the RGB input the PLL runs
+    ## from, which the chip cannot see. Writing 0x8000 to 0x00E0 starts a
+    ## LUT upload (Step.LookupTable): long packets go into the panel's table
+    ## by position until 0x00E0 bit 15 is cleared.
+    chipId   = 0x4401
+    errorRegs= (0x0414,0x0434,0x0440,0x044C)       ## Write 1 to clear
+    def __init__(self,bus):
+        self.bus     = bus
+        self.regs    = bytearray(0x10000)
+        self.regs[0:2] = self.chipId.to_bytes(2,'big')
+        self.ptr     = 0
+        self.panel   = Panel()
+        self.packets = []                          ## (type,dataType,payload)
+        self.busyTil = 0.0
+        self.lpByte  = 0.000008                    ## LP escape mode, per byte
+        self.link    = None                        ## Link, or a perfect one
+        self.pixelClock = 73008960
+    def word(self,reg):
+        return (self.regs[reg]<<8) | self.regs[reg+1]
+    def long(self,reg):
+        return self.word(reg) | (self.word(reg+2)<<16)
+    def busy(self):
+        return self.bus.clock < self.busyTil
+    def write(self,data):
+        if len(data) < 2:                          ## smbus command byte only,
+            self.ptr = data[0]<<8 if data else self.ptr ## 8-bit page address
+            return
+        self.ptr = (data[0]<<8) | data[1]
+        for d in data[2:]:
+            if self.ptr - self.ptr % 4 in self.errorRegs:
+                d = self.regs[self.ptr] & ~d
+            self.regs[self.ptr] = d
+            if self.ptr == 0x0601 and (d & 0x01):
+                self.send()
+            elif self.ptr == 0x0503:
+                self.confw()
+            elif self.ptr == 0x00E1 and self.regs[0x00E0] == 0x80:
+                self.panel.lutPos = 0              ## LUT upload starts
+            self.ptr = (self.ptr + 1) & 0xFFFF
+    def read(self,length):
+        out = bytearray()
+        for i in range(length):
+            if self.ptr == 0x0601:
+                self.regs[0x0601] = (self.regs[0x0601] & 0xFE) | self.busy()
+            out.append(self.regs[self.ptr])
+            self.ptr = (self.ptr + 1) & 0xFFFF
+        return out
+    def confw(self):                               ## DSI_CONFW (0x0500) written
+        ## [31:29] 101 sets, 110 clears the bits in [15:0] of the DSI control
+        ## register at 0x0400 + 4*[28:24].
+        val  = self.long(0x0500)
+        reg  = 0x0400 + 4*((val>>24) & 0x1F)
+        cur  = self.word(reg)
+        if   val>>29 == 0x5: cur |=  (val & 0xFFFF)
+        elif val>>29 == 0x6: cur &= ~(val & 0xFFFF)
+        self.regs[reg:reg+2] = cur.to_bytes(2,'big')
+    def send(self):                                ## DCSCMD_ST 0 -> 1
+        kind     = self.regs[0x0602]               ## 0x10 short, 0x40 long
+        dataType = self.regs[0x0603]
+        raw      = self.regs[0x0610:0x0620]
+        swapped  = bytearray()
+        for i in range(0,len(raw),2):
+            swapped.extend((raw[i+1],raw[i]))
+        if kind == 0x40:
+            payload = bytes(swapped[:self.word(0x0604)])
+        elif dataType == 0x05:
+            payload = bytes(swapped[:1])
+        else:
+            payload = bytes(swapped[:2])
+        self.packets.append((kind,dataType,payload))
+        if self.link and self.link.fails(self.bitRate(),self.phy()):
+            self.error(0x0440,0x0400)              ## Checksum error reported,
+            self.error(0x044C,0x0001)              ## and the panel drops the
+            self.error(0x0414,0x000C)              ## packet
+        elif kind == 0x40 and self.regs[0x00E0] & 0x80:
+            self.panel.table(payload)
+        else:
+            self.panel.packet(dataType,payload)
+        start        = max(self.bus.clock,self.busyTil)
+        self.busyTil = start + self.lpByte*(len(payload) + 6)
+    def bitRate(self):                             ## PLL output, bit/s/lane
+        prd,fbd = self.regs[0x0016]>>4,self.word(0x0016) & 0x01FF
+        frs     = (self.regs[0x0018]>>2) & 0x03
+        return self.pixelClock*(fbd+1)//(4*(prd+1)<<frs)
+    def phy(self):                                 ## (cap,cur,delay) in use
+        lanes = ((self.regs[0x040D]>>1) & 0x03) + 1
+        return [(self.regs[r] & 0x03,self.regs[r+1] & 0x0F,
+                 self.regs[r+1]>>4) for r in range(0x0100,0x0104 + 4*lanes,4)]
+    def error(self,reg,bits):                      ## Set status bits
+        self.regs[reg:reg+2] = (self.word(reg) | bits).to_bytes(2,'big')
+class LM49450:                                     ## LM49450 register model
+    ## Sixteen byte-wide registers; the address auto-increments per byte.
+    def __init__(self,bus):
+        self.bus     = bus
+        self.regs    = bytearray(0x10)
+        self.ptr     = 0
+    def write(self,data):
+        if not data:
+            return
+        self.ptr = data[0] & 0x0F
+        for d in data[1:]:
+            self.regs[self.ptr] = d
+            self.ptr = (self.ptr + 1) & 0x0F
+    def read(self,length):
+        out = bytearray()
+        for i in range(length):
+            out.append(self.regs[self.ptr])
+            self.ptr = (self.ptr + 1) & 0x0F
+        return out
+class TCA6416:                                     ## TCA6416A I/O expander
+    ## Registers in pairs (input, output, polarity, config; port 0 then 1);
+    ## the address toggles within a pair per byte. press() moves a pin
+    ## (buttons pull to ground) and, on any change of an input, pulls INT
+    ## low and calls line(), if set; reading the input port releases INT.
+    def __init__(self,bus):
+        self.bus     = bus
+        self.regs    = bytearray([0xFF,0xFF,0xFF,0xFF,0x00,0x00,0xFF,0xFF])
+        self.ptr     = 0
+        self.pins    = 0xFFFF                      ## Pulled up
+        self.seen    = self.pins                   ## At the last input read
+        self.intr    = False                       ## INT asserted
+        self.line    = None                        ## () on INT going low
+    def press(self,pin,down=True):
+        self.pins = self.pins & ~(1<<pin) if down else self.pins | 1<<pin
+        inputs    = int.from_bytes(self.regs[6:8],'little')
+        if not (self.pins ^ self.seen) & inputs:
+            self.intr = False                      ## Back as it was read
+        elif not self.intr:
+            self.intr = True
+            if self.line:
+                self.line()
+    def write(self,data):
+        if not data:
+            return
+        self.ptr = data[0] & 0x07
+        for d in data[1:]:
+            self.regs[self.ptr] = d
+            self.ptr ^= 1
+    def read(self,length):
+        value = self.pins ^ int.from_bytes(self.regs[4:6],'little')
+        self.regs[0:2] = value.to_bytes(2,'little')
+        out = bytearray()
+        for i in range(length):
+            if self.ptr < 2:
+                self.seen,self.intr = self.pins,False
+            out.append(self.regs[self.ptr])
+            self.ptr ^= 1
+        return out
+class Sensor:                                      ## 8-bit register chip model
+    ## Auto-increments the register address per byte, except on the FIFO
+    ## data register, which bursts whole frames out of the FIFO. Frames are
+    ## made at the output data rate from the bus's now(), up to `depth`;
+    ## past that the oldest are lost and the overrun bit is set.
+    chipId   = (0x00,0x00)                         ## (reg, value)
+    fifoData = 0x3F
+    fifoStat = 0x0E                                ## [7] overrun, [6:0] frames
+    depth    = 32
+    def __init__(self,bus):
+        self.bus     = bus
+        self.regs    = bytearray(0x80)
+        self.regs[self.chipId[0]] = self.chipId[1]
+        self.ptr     = 0
+        self.fifo    = bytearray()
+        self.made    = None                        ## now() of the last frame
+        self.out     = bytearray()                 ## Frame being read out
+    def rate(self):                                ## Output data rate, Hz
+        return 0.0
+    def fill(self):
+        now,hz = self.bus.now(),self.rate()
+        if not hz or self.regs[0x3E]>>6 == 0:     ## Bypass: no FIFO
+            self.made = now
+            return
+        if self.made is None:
+            self.made = now
+        while self.made + 1/hz <= now:
+            self.made += 1/hz
+            self.fifo += self.frame(self.made)
+            if len(self.fifo) > 6*self.depth:
+                del self.fifo[:6]
+                self.regs[self.fifoStat] |= 0x80
+        self.regs[self.fifoStat] = (self.regs[self.fifoStat] & 0x80) | \
+                                   len(self.fifo)//6
+    def frame(self,t):                             ## 6 bytes for time t
+        return bytes(6)
+    def write(self,data):
+        if not data:
+            return
+        self.ptr = data[0] & 0x7F
+        for d in data[1:]:
+            self.regs[self.ptr] = d
+            if self.ptr == 0x3E:                   ## FIFO_CONFIG_1 clears it
+                self.fifo,self.made = bytearray(),self.bus.now()
+                self.regs[self.fifoStat] = 0
+            self.ptr = (self.ptr + 1) & 0x7F
+    def read(self,length):
+        self.fill()
+        out = bytearray()
+        for i in range(length):
+            if self.ptr == self.fifoData:
+                if not self.out:
+                    self.out = self.fifo[:6] or bytearray(6)
+                    del self.fifo[:6]
+                    self.regs[self.fifoStat] = (self.regs[self.fifoStat] &
+                                                0x7F) | len(self.fifo)//6
+                out.append(self.out.pop(0))
+                continue
+            if self.ptr == self.fifoStat:          ## Overrun clears on read
+                out.append(self.regs[self.ptr])
+                self.regs[self.ptr] &= 0x7F
+            else:
+                out.append(self.regs[self.ptr])
+            self.ptr = (self.ptr + 1) & 0x7F
+        return out
+class BMA280(Sensor):                              ## BMX055 accelerometer
+    ## 12-bit left aligned, little endian; a slow wobble around 1 g on Z.
+    chipId   = (0x00,0xFA)
+    def rate(self):                                ## PMU_BW: ODR = 2*bandwidth
+        bw = self.regs[0x10] & 0x1F
+        return 2*7.8125*2**(min(max(bw,0x08),0x0F) - 0x08)
+    def frame(self,t):
+        g   = 1024                                 ## LSB per g at +-2 g
+        out = bytearray()
+        for v in (0.1*math.sin(t),0.1*math.cos(t),1.0):
+            out += (int(v*g)<<4 & 0xFFFF).to_bytes(2,'little')
+        return bytes(out)
+class BMG160(Sensor):                              ## BMX055 gyroscope
+    chipId   = (0x00,0x0F)
+    depth    = 100
+    rates    = [2000,2000,1000,400,200,100,200,100]
+    def rate(self):
+        return self.rates[self.regs[0x10] & 0x07]
+    def frame(self,t):                             ## Turning slowly about Z
+        out = bytearray()
+        for v in (0,0,int(16.4*10*math.sin(0.5*t))):
+            out += (v & 0xFFFF).to_bytes(2,'little')
+        return bytes(out)
+class BMM150(Sensor):                              ## BMX055 magnetometer
+    ## No FIFO: DATAX..RHALL (0x42-0x49) always hold the latest reading.
+    chipId   = (0x40,0x32)
+    fifoData = fifoStat = None
+    def read(self,length):
+        t = self.bus.now()
+        x,y,z = int(200*math.cos(0.2*t)),int(200*math.sin(0.2*t)),-400
+        self.regs[0x42:0x48] = ((x<<3 & 0xFFFF).to_bytes(2,'little') +
+                                (y<<3 & 0xFFFF).to_bytes(2,'little') +
+                                (z<<1 & 0xFFFF).to_bytes(2,'little'))
+        return Sensor.read(self,length)
+class MGC3130:                                     ## GestIC controller model
+    ## Reads return the latest SENSOR_DATA_OUTPUT message (0x91), made every
+    ## 5 ms, with the fields the DataOutputEnableMask (runtime parameter
+    ## 0xA0, set by a SET_RUNTIME_PARAMETER 0xA2 message) enables: DSP
+    ## status, gesture, touch, air wheel, position. Messages not read in
+    ## time are lost, as on the chip.
+    sizes    = [2,4,4,2,6]                         ## Field bytes, mask bits 0-4
+    def __init__(self,bus):
+        self.bus     = bus
+        self.mask    = 0x001F
+        self.seq     = 0
+    def write(self,data):
+        if len(data) >= 16 and data[3] == 0xA2 and data[4:6] == b'\xA0\x00':
+            self.mask = int.from_bytes(data[8:10],'little')
+    def message(self):
+        t       = self.bus.now()
+        stamp   = int(t*200) & 0xFF
+        fields  = [bytes(2),
+                   bytes([2 if int(t) % 4 == 0 else 0,0,0,0]), ## Flick W>E
+                   bytes(4),
+                   bytes([int(t*32) & 0xFF,0]),
+                   b''.join((int(32768 + 30000*v) & 0xFFFF).to_bytes(2,
+                            'little') for v in (math.sin(t),math.cos(t),0))]
+        body    = bytes([self.mask & 0xFF,self.mask>>8,stamp,0x03])
+        for bit,field in enumerate(fields):
+            if self.mask & (1<<bit):
+                body += field
+        self.seq = (self.seq + 1) & 0xFF
+        return bytes([4 + len(body),0x00,self.seq,0x91]) + body
+    def read(self,length):
+        msg = self.message()
+        return bytearray(msg[:length].ljust(length,b'\x00'))
+
+class SimBus:                                      ## smbus2.SMBus work-alike
+    ## Only the calls the Double Zero drivers use are provided. Every call is
+    ## one bus transaction; i2c_rdwr batches are one transaction of several
+    ## messages. Talking to an address nobody answers raises the same OSError
+    ## (EREMOTEIO) smbus2 raises on a NACK. errorRate makes every byte on the
+    ## wire fail with that probability, the same way, so longer messages fail
+    ## more often (as on a marginal bitbanged bus).
+    def __init__(self,bus=3,latency=None,errorRate=0.0):
+        self.bus     = bus
+        self.latency = latency or Latency()
+        self.errorRate = errorRate                 ## Per byte, incl. address
+        self.stats   = Stats()
+        self.clock   = 0.0                         ## Modelled seconds elapsed
+        self.devices = {}
+        self.started = time.monotonic()
+    def attach(self,addr,model):
+        self.devices[addr] = model(self)
+        return self.devices[addr]
+    def close(self):
+        pass
+    def transfer(self,msgs):                       ## msgs: [(addr,flags,buf)]
+        start = time.perf_counter()
+        spent = 0.0
+        self.stats.transactions += 1
+        self.stats.messages     += len(msgs)
+        for i,(addr,flags,buf) in enumerate(msgs):
+            wire = self.latency.byte*(1 + len(buf))
+            wire+= self.latency.restart if i else self.latency.start
+            self.elapse(wire)
+            spent += wire
+            dev = self.devices.get(addr)
+            if dev is None or (self.errorRate and random.random() <
+                               1 - (1 - self.errorRate)**(1 + len(buf))):
+                raise OSError(errno.EREMOTEIO,'Remote I/O error')
+            count = self.stats.device.setdefault(addr,[0,0])
+            count[0] += (i == 0) or addr != msgs[i-1][0]
+            count[1] += len(buf)
+            if flags & I2C_M_RD:
+                buf[:] = dev.read(len(buf))
+                self.stats.bytesIn  += len(buf)
+            else:
+                dev.write(buf)
+                self.stats.bytesOut += len(buf)
+        if self.latency.realtime:                  ## One sleep per transaction
+            time.sleep(max(0,start + spent - time.perf_counter()))
+    def now(self):                                 ## Time, for sensor models
+        ## Wall clock when realtime, so sensors fill their FIFOs while the
+        ## caller sleeps; otherwise the modelled clock (advance it with
+        ## elapse() to let time pass).
+        if self.latency.realtime:
+            return time.monotonic() - self.started
+        return self.clock
+    def elapse(self,seconds):                      ## Advance the modelled clock
+        self.clock         += seconds
+        self.stats.busTime += seconds
+    def write_byte(self,addr,value):
+        self.transfer([(addr,0,bytearray([value]))])
+    def read_byte(self,addr):
+        buf = bytearray(1)
+        self.transfer([(addr,I2C_M_RD,buf)])
+        return buf[0]
+    def write_byte_data(self,addr,reg,value):
+        self.transfer([(addr,0,bytearray([reg,value]))])
+    def read_byte_data(self,addr,reg):
+        buf = bytearray(1)
+        self.transfer([(addr,0,bytearray([reg])),(addr,I2C_M_RD,buf)])
+        return buf[0]
+    def write_i2c_block_data(self,addr,reg,data):
+        self.transfer([(addr,0,bytearray([reg])+bytearray(data))])
+    def read_i2c_block_data(self,addr,reg,length):
+        buf = bytearray(length)
+        self.transfer([(addr,0,bytearray([reg])),(addr,I2C_M_RD,buf)])
+        return list(buf)
+    def i2c_rdwr(self,*msgs):
+        self.transfer([(m.addr,m.flags,m.buf) for m in msgs])
+
+def board(bus=3,latency=None):                     ## The Double Zero bus 3
+    sim = SimBus(bus,latency)
+    if bus == 3:
+        sim.attach(0x0e,TC358778)
+        sim.attach(0x7D,LM49450)
+        sim.attach(0x18,BMA280)
+        sim.attach(0x68,BMG160)
+        sim.attach(0x10,BMM150)
+        sim.attach(0x42,MGC3130)
+        sim.attach(0x20,TCA6416)
+    return sim
+
+def profile(realtime=True):                        ## Per-step cost of main()
+    import i2cbus
+    i2cbus.backend = 'sim'
+    import videodriver
+    bus   = i2cbus.SMBus(3)
+    bus.latency.realtime = realtime                ## False: count, don't wait
+    steps = ['GlobalReg','PHYReg','PPIReg','TXReg','ErrorReg','ScreenReg',
+             'LookupTable','DSITXReg']
+    total = time.perf_counter()
+    for name in steps:
+        before = bus.stats.copy()
+        t = time.perf_counter()
+        getattr(videodriver.step,name)()
+        t = time.perf_counter() - t
+        print('%-12s %s %9.3f ms wall' % (name,bus.stats - before,1000*t))
+    total = time.perf_counter() - total
+    print('%-12s %s %9.3f ms wall' % ('total',bus.stats,1000*total))
+if __name__ == '__main__':
+    import sys
+    profile('--count' not in sys.argv)
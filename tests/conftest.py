@@ -0,0 +1,51 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero test fixtures
+# Purpose:     Run the drivers against the simulated bus 3 (simbus), with a
+#              fresh board for every test.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, tempfile
+os.environ['DOUBLEZERO_BUS'] = 'sim'               ## Before any driver import
+os.environ['XDG_CACHE_HOME'] = tempfile.mkdtemp()  ## Images not in ~/.cache
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest, i2cbus, simbus
+
+@pytest.fixture
+def board():                                       ## Fresh simulated bus 3
+    ## Every driver shares the one bus 3 Arbiter, so swapping its handle puts
+    ## all of them on a board in reset state. Shadows the drivers keep of
+    ## the chips are forgotten with it. The board never sleeps for the
+    ## modelled bus time.
+    bus = i2cbus.SMBus(3)
+    bus.dev = simbus.board(3,simbus.Latency(realtime=False))
+    audio = sys.modules.get('AudioDriver')
+    if audio:
+        audio.Register.shadow[:] = bytes(0x10)
+        audio.Register.valid = audio.Register.dirty = audio.Register.depth = 0
+    video = sys.modules.get('videodriver')
+    if video:
+        video.DCS.forget()
+        video.DCS.paced = False
+    reconfig = sys.modules.get('reconfig')
+    if reconfig:
+        reconfig.display.current = None
+    return bus.dev
+
+def image(chip):                                   ## What the display shows
+    ## The bridge registers bring-up sets, less the DCS command and DSI_CONFW
+    ## registers (the last packet or command sent, not settings), and the
+    ## panel's registers, page, sleep/idle/on flags and colour table.
+    regs = bytearray(chip.regs[:0x0700])
+    regs[0x0500:0x0504] = bytes(4)
+    regs[0x0600:0x0620] = bytes(0x20)
+    return (bytes(regs),dict(chip.panel.regs),chip.panel.page,
+            (chip.panel.sleeping,chip.panel.idle,chip.panel.on),
+            bytes(chip.panel.lut))
+@pytest.fixture
+def snapshot():                                    ## image(), for tests
+    return image
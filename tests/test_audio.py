@@ -0,0 +1,84 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero audio driver tests
+# Purpose:     AudioDriver register shadow and settings batching, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import pytest, AudioDriver
+Register = AudioDriver.Register
+reset    = bytes(AudioDriver.defaults) + b'\x00'   ## As main() leaves the chip
+
+@pytest.fixture
+def chip(board):                                   ## LM49450 set up as main()
+    lm = board.devices[AudioDriver.a]
+    lm.regs[:] = reset
+    return lm
+
+def test_batch_keeps_untouched_registers(chip):
+    ## A batch that changes 0x07 and 0x0B goes out as one block 0x07-0x0B;
+    ## the registers in between are read from the chip, not sent as 0x00.
+    with Register.batch():
+        Register.write(0x07,0x11)
+        Register.write(0x0B,0x05)
+    want = bytearray(reset)
+    want[0x07],want[0x0B] = 0x11,0x05
+    assert bytes(chip.regs) == bytes(want)
+
+def test_write_after_load_sends_only_the_span(chip,board):
+    Register.read(0x00)                            ## Shadow fully known
+    chip.regs[0x08] = 0x1F                         ## Changed behind its back
+    before = board.stats.bytesIn
+    with Register.batch():
+        Register.write(0x00,0x4D)
+        Register.write(0x01,0x0F)
+    assert board.stats.bytesIn == before           ## No second load
+    assert chip.regs[0x08] == 0x1F
+
+def test_checked_batch_reads_back(chip):
+    chip.regs[0x0B] = 0x02
+    with Register.batch(check=True):
+        Register.write(0x09,0x03)
+        Register.write(0x0E,0x01)
+    assert chip.regs[0x09:0x0F] == bytes([0x03,0,0x02,0,0,0x01])
+    assert chip.regs[0x07:0x09] == reset[0x07:0x09]
+
+def test_apply_mixed_keeps_other_registers(chip):
+    ## Volume + EQ levels in one Service batch: 0x07 and 0x09-0x0E change,
+    ## the speaker volume between them and everything else stay put.
+    AudioDriver.Service().apply({'dBh':-3,'eqLevels':[1,2,3,3,2,1]})
+    want = bytearray(reset)
+    want[0x07]      = AudioDriver.Volume.code(AudioDriver.Volume.hpTable,-3)
+    want[0x09:0x0F] = bytes([1,2,3,3,2,1])
+    assert bytes(chip.regs) == bytes(want)
+
+def test_apply_mute_and_movie(chip):
+    AudioDriver.Service().apply({'mute':True,'movie':True})
+    rate,clock,pump = AudioDriver.EQ.clocks[True]
+    fields = AudioDriver.regmap.lm49450.fields(0x00,chip.regs[0x00:0x01])
+    assert (fields['Mute'],fields['Rate']) == (1,rate)
+    assert chip.regs[0x01:0x03] == bytes([clock,pump])
+    assert chip.regs[0x03:] == reset[0x03:]
+
+def test_service_run_batches_posted_settings(chip):
+    import asyncio
+    service = AudioDriver.Service()
+    service.post(dBs=-6,eqLevels=[0,0,4,4,2,0])    ## Before run(): kept
+    async def go():
+        task = asyncio.ensure_future(service.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+    asyncio.run(go())
+    want = bytearray(reset)
+    want[0x08]      = AudioDriver.Volume.code(AudioDriver.Volume.spTable,-6)
+    want[0x09:0x0F] = bytes([0,0,4,4,2,0])
+    assert bytes(chip.regs) == bytes(want)
+
+def test_set_refuses_unknown(board):
+    with pytest.raises(ValueError):
+        AudioDriver.Service().set(volume=3)
+    with pytest.raises(ValueError):
+        AudioDriver.Service().set(profile='nope')
@@ -0,0 +1,42 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero bring-up image tests
+# Purpose:     A replayed bring-up image against the live bring-up, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, i2cbus, simbus, bringup, videodriver
+
+def test_replay_matches_live_bringup(board,snapshot):
+    videodriver.bringUp()
+    live = snapshot(board.devices[videodriver.a])
+    bus  = i2cbus.SMBus(3)
+    bus.dev = simbus.board(3,simbus.Latency(realtime=False))
+    bringup.run(bringup.compile(),bus)
+    assert snapshot(bus.dev.devices[videodriver.a]) == live
+
+def test_replay_costs_no_more_than_live(board):
+    videodriver.bringUp()
+    live = board.stats.transactions
+    bus  = i2cbus.SMBus(3)
+    bus.dev = simbus.board(3,simbus.Latency(realtime=False))
+    bringup.run(bringup.compile(),bus)
+    assert bus.dev.stats.transactions <= live
+
+def test_pack_round_trip(board):
+    ops = bringup.compile()
+    assert bringup.unpack(bringup.pack(ops,bringup.key())) == \
+           (bringup.key(),ops)
+
+def test_cache_is_rebuilt_when_stale(board,tmp_path):
+    path = str(tmp_path/'bringup.img')
+    ops  = bringup.load(path)
+    assert os.path.exists(path)
+    with open(path,'r+b') as f:                    ## Another tree's image
+        f.write(b'\xff'*4)
+    assert bringup.load(path) == ops
+    with open(path,'rb') as f:
+        assert bringup.unpack(f.read())[0] == bringup.key()
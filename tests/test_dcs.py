@@ -0,0 +1,44 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero DCS packet tests
+# Purpose:     videodriver.Dcs batching and its DCSCMD_ST checks, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import videodriver
+DCS = videodriver.DCS
+
+six = [k[::-1] for k in videodriver.Reg.six]       ## [cmd,param] on the link
+
+def send(chip):                                    ## Reg.six, as ScreenReg
+    with DCS.batch():
+        for k in videodriver.Reg.six:
+            DCS.WRITE(k)
+    return [p for p in chip.packets if p[1] == 0x15]
+
+def test_batch_packs_packets(board):
+    chip  = board.devices[videodriver.a]
+    start = board.stats.transactions
+    got   = send(chip)
+    assert [list(p[2]) for p in got] == six
+    assert board.stats.transactions - start < len(videodriver.Reg.six)//4
+    assert not DCS.paced
+
+def test_slow_link_paces_packets(board):
+    ## A link slower than the bus: packets are found still going, sent again
+    ## and from then on one per transfer, and the panel ends up with every
+    ## value in order.
+    chip = board.devices[videodriver.a]
+    chip.lpByte = 0.01
+    got  = send(chip)
+    assert DCS.paced
+    assert [list(p[2]) for p in got][-len(six):] == six
+    want = {}
+    page = 0x00
+    for cmd,param in six:
+        page = param if cmd == 0xFF else page
+        want[(page,cmd)] = bytes([param])
+    assert all(chip.panel.regs[k] == v for k,v in want.items())
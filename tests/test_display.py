@@ -0,0 +1,55 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero display mode tests
+# Purpose:     Mode planning, the colour LUT and the power governor, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import pytest, lut, modeplan, governor, reconfig, videodriver
+
+def test_planned_bit_rate_is_the_drivers(board):
+    m = modeplan.check(videodriver)
+    assert m and m['bits'] == videodriver.PLL.bitClockFrq
+    for rate in (30,40,60):
+        s = reconfig.state(**modeplan.params(modeplan.mode(rate,24,4)))
+        assert modeplan.check(s.driver)['bits'] == s.driver.PLL.bitClockFrq
+
+def test_chosen_modes_carry_the_link():
+    for rate in modeplan.panel['rates']:
+        m = modeplan.choose(rate)
+        assert m['bits'] >= m['need']*(1 + modeplan.margin)
+        assert m['bits'] <= modeplan.laneMax
+
+def test_lut_loads_every_profile(board):
+    assert lut.check()
+
+@pytest.fixture
+def levels(board):                                 ## Prepared, with a source
+    videodriver.bringUp()
+    chip = board.devices[videodriver.a]
+    g    = governor.Governor()
+    g.source = lambda clock: setattr(chip,'pixelClock',clock)
+    g.prepare()
+    return chip,g
+
+def test_governor_levels_and_back(levels,board,snapshot):
+    chip,g = levels
+    want   = snapshot(chip)
+    g.switch(governor.REDUCED,board)
+    assert chip.pixelClock == g.states[governor.REDUCED].driver.pixelClock
+    assert chip.bitRate() < g.states[governor.FULL].driver.PLL.pllClock
+    g.switch(governor.IDLE,board)
+    assert chip.panel.idle
+    g.switch(governor.FULL,board)
+    assert snapshot(chip)[:4] == want[:4]
+    assert not g.stocked
+
+def test_governor_says_when_it_keeps_stock(board,caplog):
+    g = governor.Governor()
+    g.prepare()
+    assert g.stocked == ['reduced','idle']
+    assert 'keeping the stock mode' in caplog.text
+    assert 'stock mode (no source)' in g.report()
@@ -0,0 +1,76 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero display power tests
+# Purpose:     Suspend and warm/cold resume from the captured image, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import sys, pytest, simbus, bringup, reconfig, power, videodriver
+
+@pytest.fixture
+def shown(board,tmp_path):                         ## (chip, Power, image)
+    videodriver.bringUp()
+    chip = board.devices[videodriver.a]
+    p    = power.Power()
+    p.capture(path=str(tmp_path/'resume.img'))
+    return chip,p
+
+def cut(chip):                                     ## Power cut: reset state
+    chip.regs[:] = simbus.TC358778(chip.bus).regs
+    chip.panel.__init__()
+
+def test_suspend_sleeps_the_panel(shown):
+    chip,p = shown
+    p.suspend()
+    assert chip.panel.sleeping
+    assert not chip.regs[0x0019] & 0x11            ## CKEN, PLL_EN off
+
+def test_warm_resume(shown,board,snapshot):
+    chip,p = shown
+    want   = snapshot(chip)
+    p.suspend()
+    assert not p.lost(board)
+    p.resume(board)
+    assert snapshot(chip) == want
+    assert p.times[-1][0] == 'warm'
+
+def test_cold_resume_after_cut(shown,board,snapshot):
+    chip,p = shown
+    want   = snapshot(chip)
+    p.suspend(cut=True)
+    cut(chip)
+    p.resume(board)
+    assert snapshot(chip)[:4] == want[:4]          ## The LUT is not in it
+    assert p.times[-1][0] == 'cold'
+
+def test_lost_power_found_without_cut(shown,board,snapshot):
+    chip,p = shown
+    want   = snapshot(chip)
+    p.suspend()
+    cut(chip)
+    assert p.lost(board)
+    p.resume(board)
+    assert snapshot(chip)[:4] == want[:4]
+
+def test_key_follows_the_image(board):
+    assert power.key(reconfig.state()) == power.key(reconfig.state())
+    assert power.key(reconfig.state()) != power.key(reconfig.state(rate=30))
+
+def test_resume_recaptures_stale_image(board,snapshot,monkeypatch,tmp_path,
+                                       capsys):
+    videodriver.bringUp()
+    chip = board.devices[videodriver.a]
+    want = snapshot(chip)
+    path = str(tmp_path/'resume.img')
+    with open(path,'wb') as f:                     ## Some other tree's image
+        f.write(bringup.pack([],b'\0'*20))
+    monkeypatch.setattr(power,'cache',path)
+    monkeypatch.setattr(power,'power',power.Power())
+    monkeypatch.setattr(sys,'argv',['power.py','resume'])
+    cut(chip)
+    power.main()
+    assert 'capturing it again' in capsys.readouterr().out
+    assert snapshot(chip)[:4] == want[:4]
@@ -0,0 +1,54 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero reconfiguration tests
+# Purpose:     reconfig deltas against the States they aim at, on simbus.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import pytest, bringup, reconfig, videodriver
+configs = [dict(brightness=128),dict(rate=30),dict(rate=50,hBackPorch=60),
+           dict(vBackPorch=5,brightness=3),dict()]
+
+def matches(chip,want):                            ## Chip holds want's image
+    skip = set(range(0x0500,0x0504)) | set(range(0x0600,0x0620)) | {2,3}
+    regs = [r for r in sorted(want.written - skip)
+            if chip.regs[r] != want.regs[r]]
+    return (regs == [] and
+            all(chip.panel.regs.get(k) == v for k,v in want.panel.items()) and
+            chip.panel.page == want.page and
+            (chip.panel.sleeping,chip.panel.idle,chip.panel.on) == want.flags)
+
+@pytest.fixture
+def shown(board):                                  ## Stock mode on the board
+    videodriver.bringUp()
+    reconfig.display.current = reconfig.state()
+    return board.devices[videodriver.a]
+
+def test_deltas_reach_each_state(shown,board):
+    ## One after another, as a user would change them, ending back at stock.
+    assert not matches(shown,reconfig.state(rate=30))
+    assert not matches(shown,reconfig.state(brightness=128))
+    for config in configs:
+        want = reconfig.state(**config)
+        reconfig.display.apply(want,board)
+        assert matches(shown,want),config
+
+def test_delta_is_cheaper_than_bringup(shown):
+    full = reconfig.summary(bringup.compile())[0]
+    for config in configs[:-1]:
+        ops = reconfig.display.plan(reconfig.state(**config))
+        assert reconfig.summary(ops)[0] < full,config
+
+def test_brightness_is_one_packet(shown):
+    ops = reconfig.display.plan(reconfig.state(brightness=128))
+    assert reconfig.summary(ops)[0] == 1
+
+def test_same_state_sends_nothing(shown):
+    assert reconfig.summary(reconfig.display.plan(reconfig.state()))[0] == 0
+
+def test_unknown_parameter_refused():
+    with pytest.raises(ValueError):
+        reconfig.state(hActiv=720)
@@ -0,0 +1,43 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero register map tests
+# Purpose:     regmap encoders and decoders against the bring-up image.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import pytest, writeplan, regmap, reconfig, videodriver
+tc = regmap.tc358778
+
+def test_encoders_rebuild_the_bringup_image(board):
+    ## Every mapped register the bring-up sets, split into fields and
+    ## encoded again, is the same bytes on the wire.
+    s = reconfig.state()
+    for reg in sorted(set(r - r % writeplan.width(r) for r in s.written)):
+        if reg not in tc.regs:
+            continue
+        data = s.regs[reg:reg + writeplan.width(reg)]
+        v    = writeplan.value(data)
+        got  = tc.encoder(reg)(**tc.split(reg,v))[1:]
+        assert bytes(got) == data,hex(reg)
+        assert tc.set(reg,v) == v,hex(reg)
+
+@pytest.mark.parametrize('fields',[dict(FrmStop=2),dict(RstPtr=-1),
+                                   dict(PP_MISC=0x10000)])
+def test_values_that_do_not_fit_raise(fields):
+    with pytest.raises(ValueError):
+        tc.encoder(0x0032)(**fields)
+    with pytest.raises(ValueError):
+        tc.value('PP_MISC')(**fields)
+
+def test_set_replaces_only_named_fields():
+    assert tc.set(0x0032,0x0123,FrmStop=1,RstPtr=1) == 0xC123
+    assert tc.set(0x0018,0xFFFF,CKEN=0,PLL_EN=0) == 0xFFEE
+
+def test_confw_is_what_the_chip_ends_up_with(board):
+    videodriver.bringUp()
+    chip = board.devices[videodriver.a]
+    for reg,(mask,value) in regmap.confw(videodriver.Reg.five).items():
+        assert chip.word(reg) & mask == value,hex(reg)
@@ -0,0 +1,28 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero sensor tests
+# Purpose:     Motion FIFO bursts on simbus, within the tuned message size.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import pytest, writeplan, sensors
+
+@pytest.mark.parametrize('limit',[8,32,200])
+def test_poll_bursts_within_limit(board,monkeypatch,limit):
+    monkeypatch.setattr(writeplan,'limit',limit)
+    sizes = []
+    transfer = board.transfer
+    def record(msgs):                              ## Every message's length
+        sizes.extend(len(buf) for addr,flags,buf in msgs)
+        return transfer(msgs)
+    monkeypatch.setattr(board,'transfer',record)
+    motion = sensors.Motion()
+    motion.setup()
+    board.elapse(0.5)                              ## ~15 accel, 50 gyro frames
+    na,ng = motion.poll()
+    assert na and ng
+    assert motion.accel.ring.head == na and motion.gyro.ring.head == ng
+    assert max(sizes) <= max(limit - limit % 6,8)  ## 8: magnetometer read
@@ -0,0 +1,168 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero tracing
+# Purpose:     Opt-in record of every bus 3 transaction and every driver step,
+#              with latency histograms and Chrome trace (Perfetto) export.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import os, sys, time, json, threading, collections
+events       = collections.deque(maxlen=200000)    ## Newest kept, if it fills
+epoch        = 0.0                                 ## perf_counter() at start()
+patched      = []                                  ## (owner,name,original)
+regBytes     = {0x0e: 2}                           ## Register address bytes
+spans        = [('videodriver','Step',None),       ## (module,class,methods);
+                ('videodriver','Dcs',('send','flush','CMD','WRITE',
+                                      'GENERIC','LONG')), ## None: every
+                ('videodriver','Wait',('until','after')), ## public method
+                ('AudioDriver','Register',('read','write','flush'))]
+
+## Nothing here costs anything until start(): it wraps Arbiter.call, which
+## every smbus2 call on an opened bus goes through, and the methods listed
+## in `spans` of whichever of those modules are already imported. stop()
+## puts the originals back, so a disabled trace is the untouched code.
+## Events are (kind,name,thread,start,seconds,args), kind 'bus' or 'span':
+##   bus   name is the smbus2 call; args are the chip address, register (the
+##         first bytes of the first write, regBytes[addr] of them), message
+##         count, bytes moved and result: 'ok', 'retried' or the error.
+##   span  name is Class.method; args are none.
+## Times are perf_counter() seconds since start(). Spans nest, so the trace
+## viewer shows each Step with its Dcs packets and bus transfers under it.
+
+def start():                                       ## Begin recording
+    global epoch
+    import i2cbus
+    if patched:
+        return
+    epoch = time.perf_counter()
+    wrap(i2cbus.Arbiter,'call',bus)
+    for module,cls,names in spans:
+        owner = getattr(sys.modules.get(module),cls,None)
+        if owner is None:
+            continue
+        for name in names or [n for n in vars(owner) if not n.startswith('_')
+                              and callable(vars(owner)[n])]:
+            wrap(owner,name,span(cls + '.' + name))
+def stop():                                        ## Stop, keep the events
+    while patched:
+        owner,name,fn = patched.pop()
+        setattr(owner,name,fn)
+def clear():
+    events.clear()
+def wrap(owner,name,make):                         ## owner.name = make(it)
+    fn = vars(owner)[name]
+    patched.append((owner,name,fn))
+    setattr(owner,name,make(fn))
+
+def span(name):                                    ## Wrapper timing fn as name
+    def make(fn):
+        def traced(*args,**kwargs):
+            begin = time.perf_counter()
+            try:
+                return fn(*args,**kwargs)
+            finally:
+                events.append(('span',name,threading.get_ident(),begin-epoch,
+                               time.perf_counter()-begin,None))
+        traced.__wrapped__ = fn
+        return traced
+    return make
+def bus(fn):                                       ## Wrapper for Arbiter.call
+    def traced(self,size,call,*args):
+        retried = self.retried
+        begin   = time.perf_counter()
+        result  = 'ok'
+        try:
+            return fn(self,size,call,*args)
+        except OSError as e:
+            result = '%s: %s' % (type(e).__name__,e)
+            raise
+        finally:
+            took = time.perf_counter() - begin
+            if result == 'ok' and self.retried != retried:
+                result = 'retried'
+            addr,reg,msgs = decode(call.__name__,args)
+            events.append(('bus',call.__name__,threading.get_ident(),
+                           begin-epoch,took,(addr,reg,msgs,size,result)))
+    traced.__wrapped__ = fn
+    return traced
+def decode(name,args):                             ## addr, register, messages
+    if name != 'i2c_rdwr':
+        return args[0],args[1] if len(args) > 2 or 'data' in name else None,1
+    addr,reg = args[0].addr,None
+    for m in args:
+        if not m.flags & 0x01:
+            n    = regBytes.get(m.addr,1)
+            data = bytes(list(m))[:n]
+            if len(data) == n:
+                addr,reg = m.addr,int.from_bytes(data,'big')
+            break
+    return addr,reg,len(args)
+
+def stats(kind=None):                              ## {name: sorted seconds}
+    out = {}
+    for k,name,tid,begin,took,args in list(events):
+        if kind is None or k == kind:
+            out.setdefault(name,[]).append(took)
+    for times in out.values():
+        times.sort()
+    return out
+def histogram(times,lo=1e-5,buckets=14):           ## Counts per power of 2
+    ## Bucket 0 is under lo (10 us), bucket i is [lo*2**(i-1), lo*2**i), and
+    ## the last bucket holds everything longer.
+    out = [0]*buckets
+    for t in times:
+        i = 0
+        while i < buckets-1 and t >= lo*2**i:
+            i += 1
+        out[i] += 1
+    return out
+def report(kind=None):                             ## Latency table, text
+    out = ['%-24s %6s %9s %9s %9s %9s  %s' % ('name','count','mean ms',
+           'p50 ms','p99 ms','max ms','histogram (10 us << i)')]
+    for name,times in sorted(stats(kind).items()):
+        n = len(times)
+        out.append('%-24s %6d %9.3f %9.3f %9.3f %9.3f  %s' %
+                   (name,n,1000*sum(times)/n,1000*times[n//2],
+                    1000*times[min(n-1,int(n*0.99))],1000*times[-1],
+                    ' '.join('%d' % c for c in histogram(times))))
+    return '\n'.join(out)
+
+def chrome():                                      ## Chrome trace event dict
+    ## Complete ('X') events in microseconds, one track per thread; load the
+    ## file in chrome://tracing or ui.perfetto.dev.
+    out = []
+    for k,name,tid,begin,took,args in list(events):
+        e = {'name':name,'cat':k,'ph':'X','pid':os.getpid(),'tid':tid,
+             'ts':round(1e6*begin,3),'dur':round(1e6*took,3)}
+        if args:
+            addr,reg,msgs,size,result = args
+            e['args'] = {'addr':'0x%02x' % addr,'msgs':msgs,'bytes':size,
+                         'result':result}
+            if reg is not None:
+                e['args']['reg'] = '0x%04x' % reg
+        out.append(e)
+    return {'traceEvents':out,'displayTimeUnit':'ms'}
+def export(path):                                  ## Write chrome() to path
+    with open(path + '.tmp','w') as f:
+        json.dump(chrome(),f)
+    os.replace(path + '.tmp',path)
+
+def main():
+    ## tracing.py [trace.json]   trace the videodriver bring-up, write the
+    ##                           trace (default bringup.trace.json), print
+    ##                           the latency table
+    path = sys.argv[1] if sys.argv[1:] else 'bringup.trace.json'
+    import videodriver
+    start()
+    try:
+        videodriver.bringUp()
+    finally:
+        stop()
+    export(path)
+    print(report())
+    print('%d events written to %s' % (len(events),path))
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,10 @@
 #              https://www.creativecommons.org
 #-------------------------------------------------------------------------------
 #! /usr/bin/python3
-import smbus2, time, math, binascii, array
+import i2cbus, writeplan, pllsolve, bustune, lut, time, math, binascii, array
+import threading, contextlib, regmap
 a            = 0x0e                                ## i2c address of TC358778XBG
-b            = smbus2.SMBus(3)                     ## use bitbanged i2c device 3
+b            = i2cbus.SMBus(3)                     ## use bitbanged i2c device 3
 hActive      = 800                                 ## Horizontal resolution, px
 hFrontPorch  = 4                                   ## Horiz. front porch, pixels
 hSyncWidth   = 68                                  ## Horiz. sync pulse width px
@@ -32,33 +33,14 @@ class PLL:                                         ## PLL settings
     ## This section is used to calculate the values needed for the MIPI bit
     ## clock, and the PLL feedback and input dividers needed to generate it on
     ## TC358778XBG. We want the divider values which give the smallest possible
-    ## error from the target frequency.
-    pllClock     = Hertz
-    if (pllClock < 1000000000):
-        divisorExp=3-int(math.log((pllClock/62500000),2)) ## w/ pllClock > 62.5MHz
-    else:
-        divisorExp = 0
-    FBDplus1     = (10**8)*(2**divisorExp)*pllClock/(pixelClock/4) ## w/ PRD = 0
-    error        = [abs((FBDplus1-(10**8)*round(FBDplus1/10**8))/FBDplus1)]
-    FBD  =  PRD  = 0
-    for i in range (1,15):
-        FBD1xPRD1= FBDplus1*(i+1)
-        error.append(abs((FBD1xPRD1-(10**8)*round(FBD1xPRD1/10**8))/FBD1xPRD1))
-    errmin   = min(error)
-    for i in range (16):
-        FtoP     = FBDplus1*(i+1)
-        FBDtest  = ((FtoP-(10**8)*round(FtoP/(10**8)))/FtoP)
-        if ((FBDtest == errmin) and ((FtoP/10**8) < 512)):
-            FBD  = int(FtoP/(10**8))
-            PRD  = i
-    pllClock = int((FBD+1)*(pixelClock/4)/((2**divisorExp)*(PRD+1))+1)
+    ## error from the target frequency. pllsolve searches the whole divider
+    ## space exactly; modes listed in pllmodes.py are just looked up.
+    PRD,FBD,divisorExp = pllsolve.lookup(pixelClock,Hertz)
+    pllClock = pllsolve.pll(pixelClock,PRD,FBD,divisorExp) + 1
     byteClkFrq   = int(pllClock/4)
     byteClk      = 0.01*((10**11)/byteClkFrq)      ## 2 bits per DDR clock cycle
     bitClockFrq  = int(pllClock*2)
     bitClock     = 0.01*((10**11)/bitClockFrq)
-    ctl1     = PRD*16 + int(FBD/256)
-    ctl2     = FBD - (256*int(FBD/256))
-    ctl3     = divisorExp*4
     ############################################################################
 class DPHY:                                        ## MIPI-DPHY layer settings
     ## This section adjusts the capacitors and delay used for each physical
@@ -113,13 +95,14 @@ class DSI:                                         ## MIPI-DSI layer settings
     CRCDisable   = 0                               ## Disables CRC check
     HSClkContinue= 0                               ## Enables continuous HSClock
     EoTPacketDis = 0                               ## Disables auto EoT packet
-    d1       = 2*PrTimeoutEn + TaTimeoutEn
-    d2       = 8*LrxTimeoutEn + 4*HtxTimeoutEn + 2*ContentionDis + EccDisable
-    d3       = 8*HSTxMode + 4*CRCDisable + 2*HSClkContinue
-    d4       = 2*(mipiLanes-1) + EoTPacketDis
-    byte1    = 16*d1 + d2
-    byte2    = 16*d3 + d4
     lanes    = mipiLanes - 1
+    control  = regmap.tc358778.value('DSI_CONTROL')(  ## DSI_CONTROL (0x040C)
+               PrTimeoutEn=PrTimeoutEn,TaTimeoutEn=TaTimeoutEn,
+               LrxTimeoutEn=LrxTimeoutEn,HtxTimeoutEn=HtxTimeoutEn,
+               ContentionDis=ContentionDis,EccDisable=EccDisable,
+               HSTxMode=HSTxMode,CRCDisable=CRCDisable,
+               HSClkContinue=HSClkContinue,lanes=lanes,
+               EoTPacketDis=EoTPacketDis)
     ############################################################################
 class VOUT:                                        ## MIPI video layer settings
     ## This section calculates MIPI DSI video output timings for TC358778XBG to
@@ -130,20 +113,13 @@ class VOUT:                                        ## MIPI video layer settings
     if (eventMode == 1):
         vSyncWidth = vBackPorch + vFrontPorch
         hSyncWidth = hBackPorch + hFrontPorch
-    VSW1     = int((vSyncWidth)/256)
-    VSW2     = int((vSyncWidth)) - VSW1*256
-    VBP1     = int(vBackPorch/256)
-    VBP2     = int(vBackPorch)  - VBP1*256
-    VAL1     = int(vActive/256)
-    VAL2     = int(vActive)    - VAL1*256
-    HSW1     = int(hSyncWidth*ByteMulti/256)
-    HSW2     = int(hSyncWidth*ByteMulti)-HSW1*256
-    HBP1     = int(hBackPorch*ByteMulti/256)
-    HBP2     = int(hBackPorch*ByteMulti) - HBP1*256
-    HAL1     = int(hActive*3/256)
-    HAL2     = int(hActive*3) - HAL1*256
-    VSD1     = int(vSyncDelay/256)
-    VSD2     = vSyncDelay - VSD1*256
+    VSW      = int(vSyncWidth)
+    VBP      = int(vBackPorch)
+    VAL      = int(vActive)
+    HSW      = int(hSyncWidth*ByteMulti)
+    HBP      = int(hBackPorch*ByteMulti)
+    HAL      = int(hActive*3)
+    VSD      = vSyncDelay
     ############################################################################
 class Reg:                                         ## Register values to write.
     ## For TC358778XBG, the chip automatically increments the register address
@@ -159,54 +135,43 @@ class Reg:                                         ## Register values to write.
     ## register address. Transfers are limited to 32 bytes at a time for
     ## stability. See info on the register of interest in TC358778XBG specs for
     ## interpretation of the input values.
+    ##
+    ## The rows are built by regmap's compiled encoders, from the fields named
+    ## in regmap.tc358778: each is ready to send, low address byte first, with
+    ## 32-bit registers already in their [bits 15-0][bits 31-16] wire order.
+    tc   = regmap.tc358778
     one  =[
-          [0x02,
-          0x00,0x00,0x00,0x04,VOUT.VSD1,VOUT.VSD2,
-          0x00,0x4c],                              ## 4 16 bit registers
-          [0x0E,       ## Bottom value keeps PLL off until it has time to lock.
-          0x00,0x00,0x00,0xF9,0x00,0x00,0x00,0x06,
-          PLL.ctl1,PLL.ctl2,PLL.ctl3,0x03],        ## 6 16 bit registers
-          [0x50,
-          0x00,0x2E]                               ## 1 16 bit register
-          ]
-    ## Per TC358778XBG specs, for a 32-bit value, we must write in the order
-    ## [bits 15-0][bits 31-16] in order for the data to properly align with
-    ## the chip's internal automatic address incrementing.
+          tc.encoder(0x0002,4)(CONFCTL=0x0004,FiFoLevel=VOUT.VSD,
+                               DATAFMT=0x004C),    ## 4 16 bit registers
+          tc.encoder(0x000E,6)(GPIODIR=0x00F9,GPIOOUT=0x0006,
+                               PRD=PLL.PRD,FBD=PLL.FBD,FRS=PLL.divisorExp,
+                               RESETB=1,PLL_EN=1), ## 6 16 bit registers
+          tc.encoder(0x0050)(DataType=0x2E)        ## 1 16 bit register
+          ]                                        ## CKEN stays clear until
+    clock= tc.encoder(0x0018)(FRS=PLL.divisorExp,  ## the PLL has had time to
+                              CKEN=1,RESETB=1,PLL_EN=1) ## lock (GlobalReg)
     two  =[
-          [0x00,
-          DPHY.clCap,(16*DPHY.clDel+DPHY.clCur),0x00,0x00,
-          DPHY.d0Cap,(16*DPHY.d0Del+DPHY.d0Cur),0x00,0x00,
-          DPHY.d1Cap,(16*DPHY.d1Del+DPHY.d1Cur),0x00,0x00,
-          DPHY.d2Cap,(16*DPHY.d2Del+DPHY.d2Cur),0x00,0x00,
-          DPHY.d3Cap,(16*DPHY.d3Del+DPHY.d3Cur),0x00,0x00],## 5 32 bit registers
-          [0x40,
-          0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,
-          0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,
-          0x00,0x00,0x00,0x00]                     ## 5 32 bit registers
+          tc.encoder(0x0100,5)(**tc.pick(DPHY,0x0100,5)), ## 5 32 bit registers
+          tc.encoder(0x0140,5)()                   ## 5 32 bit registers
           ]
     three=[
-          [0x10,
-          PPI.lineInit,0x00,0x00,0x00,
-          0x00,PPI.LPTxTime,0x00,0x00,
-          PPI.tClkZero,PPI.tClkPrep,0x00,0x00,
-          0x00,PPI.tClkTrail,0x00,0x00,
-          PPI.tHSZero,PPI.tHSPrep,0x00,0x00,
-          PPI.tWakeUp,0x00,0x00,0x00],             ## 6 32 bit registers
-          [0x28,
-          0x00,PPI.tClkPost,0x00,0x00,
-          0x00,PPI.tHSTrail,0x00,0x00,
-          0x00,0x10,0x00,0x00,
-          0x00,0x1F,0x00,0x00,
-          0x00,PPI.ClkCont,0x00,0x00,
-          0x00,0x03,0x00,0x0B]                     ## 6 32 bit registers
+          tc.encoder(0x0210,6)(**tc.pick(PPI,0x0210,6)), ## 6 32 bit registers
+          tc.encoder(0x0228,6)(HSTXVREGCNT=0x10,HSTXVREGEN=0x1F,
+                               TXTAGOCNT=0x0B,TXTASURECNT=0x03,
+                               **tc.pick(PPI,0x0228,6)) ## 6 32 bit registers
           ]
-    four =[[0x18,0x00,0x01,0x00,0x00]]             ## 1 32 bit registers
-    five =[
-          [0x00,DSI.byte1,DSI.byte2,0xA3,0x00],[0x00,0x00,0x0F,0xA6,0x04],
-          [0x00,0X00,0x00,0xAE,0x00],[0x00,0x00,0x00,0xAF,0x00],
-          [0x00,0x2F,0x58,0xB1,0x1A],[0x00,0x2F,0x58,0xB2,0x1A],
-          [0x00,0x03,0xB7,0xB4,0x00],[0x00,0x03,0xB7,0xB5,0x00],
-          [0x00,0x82,0x01,0xC3,0x00]               ## 8 32 bit registers
+    four =[tc.encoder(0x0518)(DsiStart=1)]         ## 1 32 bit registers
+    confw= tc.encoder(0x0500)                      ## DSI_CONFW command
+    five =[                                        ## Address: (reg-0x0400)/4
+          confw(Mode=regmap.SET,Address=0x03,Data=DSI.control), ## DSI_CONTROL
+          confw(Mode=regmap.SET,Address=0x06,Data=0x04000F), ## DSI_INT_ENA
+          confw(Mode=regmap.SET,Address=0x0E,Data=0x000000), ## ACKERR_INTENA
+          confw(Mode=regmap.SET,Address=0x0F,Data=0x000000), ## ACKERR_HALT
+          confw(Mode=regmap.SET,Address=0x11,Data=0x1A2F58), ## RXERR_INTENA
+          confw(Mode=regmap.SET,Address=0x12,Data=0x1A2F58), ## RXERR_HALT
+          confw(Mode=regmap.SET,Address=0x14,Data=0x0003B7), ## ERR_INTENA
+          confw(Mode=regmap.SET,Address=0x15,Data=0x0003B7), ## ERR_HALT
+          confw(Mode=regmap.CLEAR,Address=0x03,Data=0x8201)  ## DSI_CONTROL
           ]                                        ## last clears default bits.
                                                    ## See TC sec on reg 0x0500.
     six  =[                                        ## Screen register settings
@@ -310,76 +275,157 @@ class Reg:                                         ## Register values to write.
           [0x00,0xBC],
           [0x00,0x35]  ## Screen tearing effect on
           ]                               ## Per A026EAN01.0 specs
-    seven=[0x20,
-          0x00,VOUT.eventMode,
-          VOUT.VSW1,VOUT.VSW2,VOUT.VBP1,VOUT.VBP2,
-          VOUT.VAL1,VOUT.VAL2,VOUT.HSW1,VOUT.HSW2,
-          VOUT.HBP1,VOUT.HBP2,VOUT.HAL1,VOUT.HAL2] ## 7 16 bit registers.
+    seven=tc.encoder(0x0620,7)(eventMode=VOUT.eventMode,
+          DSI_VSW=VOUT.VSW,DSI_VBPR=VOUT.VBP,DSI_VACT=VOUT.VAL,
+          DSI_HSW=VOUT.HSW,DSI_HBPR=VOUT.HBP,
+          DSI_HACT=VOUT.HAL)                       ## 7 16 bit registers.
                                                    ## Per TC358778XBG specs
-    nine =[                                        ## color lookup table
-          [0x04,0x00,0x0C,0x08,0x14,0x10,0x1C,0x18],
-          [0x24,0x20,0x2C,0x28,0x34,0x30,0x3C,0x38],
-          [0x45,0x41,0x4D,0x49,0x55,0x51,0x5D,0x59],
-          [0x65,0x61,0x6D,0x69,0x75,0x71,0x7D,0x79],
-          [0x86,0x82,0x8E,0x88,0x96,0x92,0x9E,0x9A],
-          [0xA6,0xA2,0xAE,0xA8,0xB6,0xB2,0xBE,0xBA],
-          [0xC7,0xC3,0xCF,0xC9,0xD7,0xD3,0xDF,0xDB],
-          [0xE7,0xE3,0xEF,0xE9,0xF7,0xF3,0xFF,0xFB], ## 64 bytes - R
-          [0x04,0x00,0x0C,0x08,0x14,0x10,0x1C,0x18],
-          [0x24,0x20,0x2C,0x28,0x34,0x30,0x3C,0x38],
-          [0x45,0x41,0x4D,0x49,0x55,0x51,0x5D,0x59],
-          [0x65,0x61,0x6D,0x69,0x75,0x71,0x7D,0x79],
-          [0x86,0x82,0x8E,0x8A,0x96,0x92,0x9E,0x9A],
-          [0xA6,0xA2,0xAE,0xAA,0xB6,0xB2,0xBE,0xBA],
-          [0xC7,0xC3,0xCF,0xCB,0xD7,0xD3,0xDF,0xDB],
-          [0xE7,0xE3,0xEF,0xEB,0xF7,0xF3,0xFF,0xFB], ## 128 bytes - G
-          [0x04,0x00,0x0C,0x08,0x14,0x10,0x1C,0x18],
-          [0x24,0x20,0x2C,0x28,0x34,0x30,0x3C,0x38],
-          [0x45,0x41,0x4D,0x49,0x55,0x51,0x5D,0x59],
-          [0x65,0x61,0x6D,0x69,0x75,0x71,0x7D,0x79],
-          [0x86,0x82,0x8E,0x8A,0x96,0x92,0x9E,0x9A],
-          [0xA6,0xA2,0xAE,0xAA,0xB6,0xB2,0xBE,0xBA],
-          [0xC7,0xC3,0xCF,0xCB,0xD7,0xD3,0xDF,0xDB],
-          [0xE7,0xE3,0xEF,0xEB,0xF7,0xF3,0xFF,0xFB], ## 192 bytes - B
-          ]                                        ## Per MIPI DSI specs, 18>24b
+    nine = lut.rows(lut.table())                   ## color lookup table, 192 B
+                                                   ## Per MIPI DSI specs, 18>24b
+                                                   ## See lut.py for the model
     ############################################################################
 
+class Wait():                                      ## Status register polling
+    ## Waits for a TC358778XBG status register to reach a value instead of
+    ## sleeping a fixed time. The fixed delay the driver used before becomes
+    ## the timeout: if the register never gets there, or cannot be read, the
+    ## whole delay is still spent, so polling can only make bring-up faster.
+    ## All waiting in this module goes through here (see bringup.py).
+    poll = 0.0005                                  ## Seconds between reads
+    def delay(self,seconds):
+        time.sleep(seconds)
+    def until(self,reg,mask,value,timeout,length=2):
+        end = time.monotonic() + timeout
+        try:
+            while True:
+                data = writeplan.Plan(a).read(reg,length).submit(b)[0]
+                if (writeplan.value(data) & mask) == value:
+                    return True
+                if time.monotonic() >= end:
+                    return False
+                time.sleep(min(self.poll,max(0,end - time.monotonic())))
+        except OSError:
+            time.sleep(max(0,end - time.monotonic()))
+            return False
+    def after(self,plan,reg,mask,value,timeout,length=2,got=None):
+        ## Sends plan with a read of reg on the end of the same transfer, and
+        ## only polls if the register was not there yet. Reads plan already
+        ## had go into got.
+        plan.read(reg,length)
+        try:
+            reads = plan.submit(b)
+            if got is not None:
+                got.extend(reads[:-1])
+            if (writeplan.value(reads[-1]) & mask) == value:
+                return True
+        except OSError:
+            pass
+        return self.until(reg,mask,value,timeout,length)
+wait = Wait()
 class Dcs():                                       ## DSI read/write functions
+    ## Each packet is loaded into the 0x06xx command registers and started:
+    ## type (0x0602), word count (0x0604), data words (0x0610+), then
+    ## DCSCMD_ST (0x0600) = 1. The chip clears bit 0 of DCSCMD_ST once the
+    ## packet is on the link. Packets sent inside batch() are queued and go
+    ## out together when the outermost batch ends:
+    ##  - Registers already holding the right value (the type and word count
+    ##    of a run of WRITEs, say) are not written again, so a short packet
+    ##    is usually just its data word and the start bit.
+    ##  - Up to a full i2c_rdwr transfer of packets is sent at once, and
+    ##    DCSCMD_ST is polled at the end. The chip has one set of command
+    ##    registers, not a FIFO, so this assumes each packet is off the link
+    ##    before the next is loaded: a short packet takes ~0.2 ms in LP
+    ##    mode, while bus 3 needs ~0.7 ms just for the address bytes of the
+    ##    next message. The assumption is checked, not trusted: DCSCMD_ST
+    ##    is also read before each packet after the first, in the same
+    ##    transfer. If one of those finds the previous packet still going,
+    ##    the bus is faster than that. The packets from that one on are
+    ##    sent again, and from then on each packet is its own transfer,
+    ##    polled before the next starts (paced).
+    ##  - A CMD (0x05) packet still ends its transfer and is waited on with
+    ##    its own longer timeout, like before.
+    ##  - At BULK priority (the LUT) every packet is its own transfer, so an
+    ##    urgent client never waits for more than one packet.
+    ## The bus is held per transfer, and batches are per thread.
+    def __init__(self):
+        self.local   = threading.local()           ## .queue, .depth
+        self.shadow  = {}                          ## reg: bytes last written
+        self.bus     = None                        ## Bus the shadow is for
+        self.packets = 0                           ## Packets sent
+        self.spent   = 0.0                         ## Seconds in flush()
+        self.paced   = False                       ## One packet per transfer
+    def forget(self):                              ## Registers changed behind
+        self.shadow = {}                           ## our back (bringup.run)
+    def pending(self):                             ## This thread's queue
+        if not hasattr(self.local,'queue'):
+            self.local.queue,self.local.depth = [],0
+        return self.local.queue
+    def send(self,kind,data,count=None,timeout=0.001):
+        self.pending().append((list(kind),list(data),count,timeout))
+        if not self.local.depth:
+            self.flush()
+    @contextlib.contextmanager
+    def batch(self):                               ## Queue packets until exit
+        self.pending()
+        self.local.depth += 1
+        try:
+            yield
+        finally:
+            self.local.depth -= 1
+            if not self.local.depth:
+                self.flush()
+    def load(self,plan,kind,data,count):           ## Queue 1 packet's writes
+        words = {0x0602:bytes(kind),0x0604:bytes([0x00,count or 0x00])}
+        for i in range(0,len(data),2):
+            words[0x0610+i] = bytes(data[i:i+2])
+        for reg in sorted(words):
+            if self.shadow.get(reg) != words[reg]:
+                plan.write(reg,words[reg])
+                self.shadow[reg] = words[reg]
+        plan.write(0x0600,[0x00,0x01])
+    def flush(self):                               ## Send this thread's queue
+        queue,self.local.queue = self.pending(),[]
+        start = time.perf_counter()
+        one   = self.paced or i2cbus.level() == i2cbus.BULK
+        while queue:
+            with i2cbus.hold(b):
+                if self.bus is not b:              ## (bringup's recorder)
+                    self.forget()
+                    self.bus = b
+                plan,timeout,sent,got = writeplan.Plan(a),0,[],[]
+                while queue:
+                    packet = queue.pop(0)
+                    kind,data,count,t = packet
+                    if sent:                       ## Last one off the link?
+                        plan.read(0x0601,1)
+                    self.load(plan,kind,data,count)
+                    sent.append(packet)
+                    self.packets += 1
+                    timeout = max(timeout,t)
+                    if (one or kind[1] == 0x05 or
+                        len(plan.messages()) > writeplan.maxMsgs - 8):
+                        break
+                if not wait.after(plan,0x0601,0x01,0x00,timeout,1,got):
+                    self.forget()                  ## Unsure what got there
+                late = [i for i,r in enumerate(got) if r[0] & 0x01]
+                if late:                           ## sent[i] was still going
+                    self.forget()
+                    self.paced,one = True,True
+                    self.packets -= len(sent) - late[0]
+                    queue[:0] = sent[late[0]:]
+        self.spent   += time.perf_counter() - start
+    def rate(self):                                ## Packets per second
+        return self.packets/self.spent if self.spent else 0.0
     def CMD(self,l):
-        e = [0x10,0x00]
+        e = [0x00]
         e.extend(l)
-        E = bytearray(e)
-        b.write_i2c_block_data(a,0x06,[0x02,0x10,0x05])
-        b.write_i2c_block_data(a,0x06,E)
-        b.write_i2c_block_data(a,0x06,[0x00,0x00,0x01])
-        time.sleep(0.01)
+        self.send([0x10,0x05],e,timeout=0.01)
     def WRITE(self,k):
-        f = [0x10]
-        f.extend(k)
-        F = bytearray(f)
-        b.write_i2c_block_data(a,0x06,[0x02,0x10,0x15])
-        b.write_i2c_block_data(a,0x06,F)
-        b.write_i2c_block_data(a,0x06,[0x00,0x00,0x01])
-        time.sleep(0.001)
+        self.send([0x10,0x15],k)
     def GENERIC(self,j):
-        g = [0x10]
-        g.extend(j)
-        G = bytearray(g)
-        b.write_i2c_block_data(a,0x06,[0x02,0x10,0x23])
-        b.write_i2c_block_data(a,0x06,G)
-        b.write_i2c_block_data(a,0x06,[0x00,0x00,0x01])
-        time.sleep(0.001)
+        self.send([0x10,0x23],j)
     def LONG(self,i):
-        h =[0x10]
-        h.extend(i)
-        H = bytearray(h)
-        b.write_i2c_block_data(a,0x06,[0x02,0x40,0x39])
-        b.write_i2c_block_data(a,0x06,[0x04,0x00,(len(i))])
-        b.write_i2c_block_data(a,0x06,H)
-        b.write_i2c_block_data(a,0x06,[0x00,0x00,0x01])
-        b.write_i2c_block_data(a,0x06,[0x04,0x00,0x00])
-        b.write_i2c_block_data(a,0x06,[0x12,0x00,0x00,0x00,0x00,0x00,0x00])
-        time.sleep(0.001)
+        self.send([0x40,0x39],i,len(i))
 DCS = Dcs()
 class Screen():                                    ## Common DSI 0param commands
     def on(self):
@@ -400,83 +446,83 @@ class Screen():                                    ## Common DSI 0param commands
         DCS.CMD([0x35])
 screen = Screen()
 class Step():                                      ## Steps. Numbers match Reg.x
+    ## Register steps are planned with writeplan, so adjacent rows go out as
+    ## one auto-increment run and each step is a single combined transfer.
     def GlobalReg(self):                           #1. global registers (0x00xx)
-        for i in Reg.one:
-            I = bytearray(i)
-            b.write_i2c_block_data(a,0x00,I)
-        hsync = bytearray([0x32,0x00,0x00])
-        b.write_i2c_block_data(a,0x00,hsync)       ## Sets hsync active low
-        time.sleep(0.005)
-        b.write_i2c_block_data(a,0x00,[0x18,PLL.ctl3,0x13])
+        plan = writeplan.Plan(a).rows(0x00,Reg.one)
+        plan.write(0x0032,[0x00,0x00])             ## Sets hsync active low
+        plan.submit(b)
+        wait.delay(0.005)
+        b.write_i2c_block_data(a,0x00,Reg.clock)   ## CKEN on
     def PHYReg(self):                              #2. PHY registers (0x01xx)
-        for i in Reg.two:
-            I = bytearray(i)
-            b.write_i2c_block_data(a,0x01,I)
+        writeplan.Plan(a).rows(0x01,Reg.two).submit(b)
     def PPIReg(self):                              #3. PPI registers (0x02xx)
-        for i in Reg.three:
-            I = bytearray(i)
-            b.write_i2c_block_data(a,0x02,I)
+        plan = writeplan.Plan(a).rows(0x02,Reg.three)
     ## Set 0x0204 = 0x00000001 after setting 0x02xx registers.
-        b.write_i2c_block_data(a,0x02,[0x04,0x00,0x01,0x00,0x00])
+        plan.write(0x0204,[0x00,0x01,0x00,0x00])
+        plan.submit(b)
     def TXReg(self):                               #4. TX registers (0x05xx)
-        for i in Reg.four:
-            I = bytearray(i)
-            b.write_i2c_block_data(a,0x05,I)
+        writeplan.Plan(a).rows(0x05,Reg.four).submit(b)
     def ErrorReg(self):                            #5. DSI error handling
-        for j in Reg.five:
-            G = bytearray(j)
-            b.write_i2c_block_data(a,0x05,G)
-            time.sleep(0.1)
+        writeplan.Plan(a).rows(0x05,Reg.five).submit(b)
+    ## Reg.five rows are DSI_CONFW set (101) / clear (110) commands. Wait for
+    ## the ones aimed at DSI_CONTROL (0x040C) to show up there.
+        mask,val = regmap.confw(Reg.five)[0x040C]
+        wait.until(0x040C,mask,val,0.1,4)
         b.write_i2c_block_data(a,0x00,bytearray([0x08,0x00,0x4e]))
     def ScreenReg(self):                           #6. Screen registers (DSI)
-        time.sleep(0.02)
+        wait.delay(0.02)
         screen.wake()
-        time.sleep(0.1)
+        wait.delay(0.1)
         scr1 =[[0xEE,0xFF],[0x08,0x26]]
-        for k in scr1:
-            DCS.WRITE(k)
-        time.sleep(0.001)
         scr2 =[[0x00,0x26],[0x00,0xFF]]
-        for k in scr2:
-            DCS.WRITE(k)
-        time.sleep(0.01)
+        with DCS.batch():
+            for k in scr1 + scr2:
+                DCS.WRITE(k)
+        wait.delay(0.01)                           ## Panel settle before reset
         b.write_i2c_block_data(a,0x00,bytearray([0x14,0x00,0x00]))
-        time.sleep(0.00001)
+        wait.delay(0.00001)
         b.write_i2c_block_data(a,0x00,bytearray([0x14,0x00,0x06]))
-        time.sleep(0.02)
+        wait.delay(0.02)
         screen.wake()
-        time.sleep(0.1)
-        for k in Reg.six:
-            DCS.WRITE(k)
-        RGB=[0x4b,0x3B,vFrontPorch/2,vBackPorch/2,hFrontPorch,hBackPorch]
-        DCS.LONG(RGB)
-        time.sleep(0.1)
+        wait.delay(0.1)
+        RGB=[0x4b,0x3B,vFrontPorch//2,vBackPorch//2,hFrontPorch,hBackPorch]
+        with DCS.batch():                          ## ~100 packets, 3 transfers
+            for k in Reg.six:
+                DCS.WRITE(k)
+            DCS.LONG(RGB)
+        wait.delay(0.1)                            ## Panel applies Reg.six
         screen.wake()
-        time.sleep(0.1)
+        wait.delay(0.1)                            ## Panel sleep-out time
         screen.on()
-        time.sleep(0.1)
+        wait.delay(0.1)                            ## Display-on settle
         DCS.WRITE([0x77,0x3A])
-    def LookupTable(self):                         #7. Color lookup table (DSI)
-        b.write_i2c_block_data(a,0x00,bytearray([0x08,0x00,0x01]))
-        b.write_i2c_block_data(a,0x00,bytearray([0x50,0x00,0x39]))
-        b.write_i2c_block_data(a,0x00,bytearray([0x22,0x03,0xFC]))
-        b.write_i2c_block_data(a,0x00,bytearray([0xE0,0x80,0x00]))
-        for k in Reg.nine:
-            DCS.LONG(k)
-        b.write_i2c_block_data(a,0x00,bytearray([0xE0,0xE0,0x00]))
-        b.write_i2c_block_data(a,0x00,bytearray([0xE0,0x20,0x00]))
-        b.write_i2c_block_data(a,0x00,bytearray([0xE0,0x00,0x00]))
-        b.write_i2c_block_data(a,0x00,bytearray([0x08,0x00,0x4f]))
-        b.write_i2c_block_data(a,0x00,bytearray([0x50,0x00,0x2E]))
-        time.sleep(0.1)
-        DCS.LONG([0x59,0x1D],[0x00,0x80])
+    def LookupTable(self,rows=None):               #7. Color lookup table (DSI)
+        with i2cbus.priority(i2cbus.BULK):         ## Bulk: commands go first
+            plan = writeplan.Plan(a)
+            plan.write(0x0008,[0x00,0x01])
+            plan.write(0x0050,[0x00,0x39])
+            plan.write(0x0022,[0x03,0xFC])
+            plan.write(0x00E0,[0x80,0x00])
+            plan.submit(b)
+            with DCS.batch():                      ## 1 packet/transfer at BULK
+                for k in Reg.nine if rows is None else rows: ## Or lut.Loader's
+                    DCS.LONG(k)
+            plan.write(0x00E0,[0xE0,0x00])
+            plan.write(0x00E0,[0x20,0x00])
+            plan.write(0x00E0,[0x00,0x00])
+            plan.write(0x0008,[0x00,0x4f])
+            plan.write(0x0050,[0x00,0x2E])
+            plan.submit(b)
+            wait.delay(0.1)
+            DCS.LONG([0x59,0x1D,0x00,0x80])
     def DSITXReg(self):                            #8. TX registers (0x06xx)
-        I = bytearray(Reg.seven)
-        b.write_i2c_block_data(a,0x06,I)
-        b.write_i2c_block_data(a,0x00,bytearray([0x04,0x00,0x44]))
-        b.write_i2c_block_data(a,0x00,bytearray([0x08,0x00,0x4f]))
+        plan = writeplan.Plan(a).rows(0x06,[Reg.seven])
+        plan.write(0x0004,[0x00,0x44])
+        plan.write(0x0008,[0x00,0x4f])
+        plan.submit(b)
 step = Step()
-def main():
+def bringUp():                                     ## Full bring-up sequence
     step.GlobalReg()
     step.PHYReg()
     step.PPIReg()
@@ -484,7 +530,11 @@ def main():
     step.ErrorReg()
     step.ScreenReg()
     step.DSITXReg()
-    print "MIPI clock:",0.000001*PLL.pllClock,"MHz"," ","Byte clock:",0.000001*PLL.byteClkFrq,"MHz"," ","HSByteClkP:",PPI.HSByteClk,"ns"
+def main():
+    bustune.tune(b)                                ## Message size for bus 3
+    bringUp()
+    print("MIPI clock:",0.000001*PLL.pllClock,"MHz"," ","Byte clock:",
+          0.000001*PLL.byteClkFrq,"MHz"," ","HSByteClkP:",PPI.HSByteClk,"ns")
     pass
 if __name__ == '__main__':
     main()
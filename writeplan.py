@@ -0,0 +1,88 @@
+#-------------------------------------------------------------------------------
+# Name:        Double Zero write planner
+# Purpose:     Merge TC358778XBG register writes into auto-increment runs and
+#              send them as combined i2c_rdwr transfers.
+# Author:      Jonathan Roybal
+# Created:     18/10/2026
+# Copyright:   (c) Lo-Fi-Fo-Fum Technology LLC, 2018
+# License:     Released under Creative Commons 4.0 nc-by-sa license.
+#              https://www.creativecommons.org
+#-------------------------------------------------------------------------------
+#! /usr/bin/python3
+import i2cbus
+limit        = 32                                  ## Bytes per message, w/ addr
+                                                   ## (bustune.py measures it)
+maxMsgs      = 42                                  ## I2C_RDWR_IOCTL_MAX_MSGS
+
+def width(reg):                                    ## Register width in bytes
+    ## 0x0100-0x05FF are 32-bit registers, everything else is 16-bit. A chunk
+    ## never ends inside a register, so no register is left half written.
+    if 0x0100 <= reg < 0x0600:
+        return 4
+    return 2
+
+def value(data):                                   ## Register bytes -> int
+    ## 16-bit registers read back [bits 15-8][bits 7-0]; 32-bit registers are
+    ## two such words, [bits 15-0][bits 31-16].
+    if len(data) == 1:
+        return data[0]
+    v = 0
+    for i in range(0,len(data)-1,2):
+        v |= ((data[i]<<8) | data[i+1]) << (8*i)
+    return v
+
+class Plan:                                        ## Ordered register accesses
+    ## Writes are kept in the order given. A write that starts exactly where
+    ## the previous one ended is appended to it, since the chip increments the
+    ## register address for every byte received. Runs are then cut into
+    ## messages of at most `limit` bytes (2 address bytes + data) and sent as
+    ## few i2c_rdwr transfers as possible: one START, one STOP, and a repeated
+    ## START per message instead of a full transaction for every row. Reads
+    ## (address write + repeated START read) can be queued in between, so a
+    ## status check rides along in the same transfer as the writes before it.
+    def __init__(self,addr=0x0e,limit=None):
+        self.addr    = addr
+        self.limit   = limit or globals()['limit'] ## Tuned by bustune.py
+        self.runs    = []                          ## [reg, bytearray or length]
+    def write(self,reg,data):                      ## Queue data at 16-bit reg
+        last = self.runs[-1] if self.runs else None
+        if last and not isinstance(last[1],int) and last[0]+len(last[1]) == reg:
+            last[1].extend(data)
+        else:
+            self.runs.append([reg,bytearray(data)])
+        return self
+    def read(self,reg,length):                     ## Queue read of length bytes
+        self.runs.append([reg,length])
+        return self
+    def rows(self,page,rows):                      ## Queue Reg.x style rows
+        for row in rows:                           ## [low addr byte, data...]
+            self.write((page<<8) | row[0],row[1:])
+        return self
+    def messages(self):                            ## [[addr hi,addr lo,data],n]
+        out = []                                   ## n: bytes to read, or None
+        for reg,data in self.runs:
+            if isinstance(data,int):
+                out.append([bytearray([reg>>8,reg&0xFF]),data])
+                continue
+            size = self.limit - 2
+            size = size - size % width(reg)
+            for i in range(0,len(data),size):
+                r = reg + i
+                out.append([bytearray([r>>8,r&0xFF]) + data[i:i+size],None])
+        return out
+    def submit(self,bus):                          ## Send, empty, return reads
+        batches,reads = [[]],[]
+        for data,length in self.messages():
+            msgs = [i2cbus.write(self.addr,data)]
+            if length is not None:
+                msgs.append(i2cbus.read(self.addr,length))
+                reads.append(msgs[1])
+            if len(batches[-1]) + len(msgs) > maxMsgs:
+                batches.append([])
+            batches[-1].extend(msgs)
+        with i2cbus.hold(bus):                     ## Batches back to back
+            for batch in batches:
+                if batch:
+                    bus.i2c_rdwr(*batch)
+        self.runs = []
+        return [bytes(list(m)) for m in reads]